@@ -0,0 +1,181 @@
+# directory -> .tar.zst, as a pipeline of three stages with bounded queues in between
+#
+#   reader thread   reads the files, small ones grouped into batches so tens of thousands of
+#                   tiny frames/sounds don't cost a queue handoff each
+#   tar thread      frames them as tar (pax headers, 512 byte blocks) and cuts the stream into chunks
+#   caller          compresses the chunks (compress.py, zstd threads / seekable frames)
+#
+# a member index (name, size, mtime, type, offset of the data in the tar stream) goes into a skippable
+# frame at the very end, after the seek table if there is one, so listing an archive doesn't need
+# to decompress it. zstd decoders skip it like any other skippable frame.
+#
+#   index frame = 0x184D2A5F, frame size (u32 le), zstd(json), zstd size (u32 le), json size (u32 le), magic
+
+import io, json, os, stat, struct, tarfile
+import zstandard as zstd
+from _pipeline import ChunkReader, readahead
+
+INDEX_SKIPPABLE_MAGIC = 0x184D2A5F
+INDEX_MAGIC = 0x58444942  # "BIDX"
+INDEX_FOOTER_SIZE = 12
+
+SMALL_FILE = 256 << 10   # read in one go and batched
+BATCH_BYTES = 4 << 20
+BATCH_FILES = 512
+CHUNK = 1 << 20          # tar stream chunk handed to the compressor
+QUEUE_DEPTH = 8
+
+def scan(root):
+    # (TarInfo, path) for everything under root, names start with root's own folder name.
+    # one lstat per entry, sorted so the same folder gives the same archive
+    base = os.path.basename(os.path.normpath(root))
+    members = []
+    total = 0
+    stack = [(root, base)]
+    while stack:
+        path, name = stack.pop()
+        st = os.lstat(path)
+        info = tarfile.TarInfo(name)
+        info.mode = stat.S_IMODE(st.st_mode)
+        info.mtime = int(st.st_mtime)
+        if stat.S_ISDIR(st.st_mode):
+            info.type = tarfile.DIRTYPE
+            with os.scandir(path) as it:
+                entries = sorted(it, key=lambda e: e.name, reverse=True)
+            stack.extend((entry.path, f"{name}/{entry.name}") for entry in entries)
+        elif stat.S_ISLNK(st.st_mode):
+            info.type = tarfile.SYMTYPE
+            info.linkname = os.readlink(path)
+        elif stat.S_ISREG(st.st_mode):
+            info.size = st.st_size
+            total += st.st_size
+        else:
+            continue  # sockets, fifos, devices
+        members.append((info, path))
+    return members, total
+
+def _read_members(members, cancelled):
+    # batches of (TarInfo, bytes); a big file is (TarInfo, None) followed by (None, chunk)s
+    batch, batch_bytes = [], 0
+    for info, path in members:
+        if cancelled():
+            return
+        if not info.isreg() or info.size <= SMALL_FILE:
+            data = b""
+            if info.isreg():
+                with open(path, 'rb') as f:
+                    data = f.read(info.size)
+            batch.append((info, data))
+            batch_bytes += len(data)
+            if batch_bytes >= BATCH_BYTES or len(batch) >= BATCH_FILES:
+                yield batch
+                batch, batch_bytes = [], 0
+            continue
+        if batch:
+            yield batch
+            batch, batch_bytes = [], 0
+        yield [(info, None)]
+        with open(path, 'rb') as f:
+            left = info.size
+            while left > 0:
+                chunk = f.read(min(CHUNK, left))
+                if not chunk:
+                    break
+                left -= len(chunk)
+                yield [(None, chunk)]
+    if batch:
+        yield batch
+
+def _tar_chunks(batches, index):
+    # tar framing by hand so offsets are known and big files never sit in memory whole.
+    # a file that changed size since scan() is cut/zero padded to what its header says
+    out = bytearray()
+    offset = 0
+    left = 0  # bytes still owed to the current big member
+
+    def put(data):
+        nonlocal offset
+        out.extend(data)
+        offset += len(data)
+
+    def pad(size):
+        if size % tarfile.BLOCKSIZE:
+            put(bytes(tarfile.BLOCKSIZE - size % tarfile.BLOCKSIZE))
+
+    def finish(info):
+        nonlocal left
+        if left:
+            put(bytes(left))
+            left = 0
+        if info is not None:
+            pad(info.size)
+
+    current = None
+    for batch in batches:
+        for info, data in batch:
+            if info is None:
+                data = data[:left]
+                put(data)
+                left -= len(data)
+                continue
+            finish(current)
+            put(info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape"))
+            index.append((info.name, info.size, info.mtime, info.type.decode(), offset))
+            current = info
+            if data is None:
+                left = info.size
+            else:
+                put(data[:info.size])
+                left = max(info.size - len(data), 0)
+        if len(out) >= CHUNK:
+            yield bytes(out)
+            out.clear()
+    finish(current)
+    put(bytes(2 * tarfile.BLOCKSIZE))
+    if offset % tarfile.RECORDSIZE:
+        put(bytes(tarfile.RECORDSIZE - offset % tarfile.RECORDSIZE))
+    yield bytes(out)
+
+def tar_reader(members, index, cancelled):
+    # the whole read -> tar part as a file object to compress from; `index` fills up as it's read
+    batches = readahead(_read_members(members, cancelled), QUEUE_DEPTH, cancelled)
+    chunks = readahead(_tar_chunks(batches, index), QUEUE_DEPTH, cancelled)
+    return io.BufferedReader(ChunkReader(chunks), CHUNK)
+
+def index_bytes(index):
+    raw = json.dumps(index, separators=(",", ":")).encode("utf-8")
+    packed = zstd.ZstdCompressor(level=9).compress(raw)
+    body = packed + struct.pack("<III", len(packed), len(raw), INDEX_MAGIC)
+    return struct.pack("<II", INDEX_SKIPPABLE_MAGIC, len(body)) + body
+
+def index_frame(f):
+    # (start, zstd size, json size) of the index frame at the end of an open archive, None without one
+    size = f.seek(0, os.SEEK_END)
+    if size < 8 + INDEX_FOOTER_SIZE:
+        return None
+    f.seek(size - INDEX_FOOTER_SIZE)
+    packed_size, raw_size, magic = struct.unpack("<III", f.read(INDEX_FOOTER_SIZE))
+    start = size - INDEX_FOOTER_SIZE - packed_size - 8
+    if magic != INDEX_MAGIC or start < 0:
+        return None
+    f.seek(start)
+    magic, frame_size = struct.unpack("<II", f.read(8))
+    if magic != INDEX_SKIPPABLE_MAGIC or frame_size != packed_size + INDEX_FOOTER_SIZE:
+        return None
+    return start, packed_size, raw_size
+
+def read_index(f):
+    # [name, size, mtime, type, offset] per member, None when the archive has no index
+    found = index_frame(f)
+    if found is None:
+        return None
+    start, packed_size, raw_size = found
+    f.seek(start + 8)
+    return json.loads(zstd.ZstdDecompressor().decompress(f.read(packed_size), max_output_size=raw_size))
+
+def scan_archive(f):
+    # the slow way for .tar.zst files from elsewhere: decompress and walk the tar headers
+    f.seek(0)
+    reader = zstd.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+    with tarfile.open(fileobj=reader, mode="r|") as tar:
+        return [[m.name, m.size, int(m.mtime), m.type.decode(), m.offset_data] for m in tar]
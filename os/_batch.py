@@ -0,0 +1,153 @@
+# headless batch runner - same commands as the launcher window, no Tk root and no sound
+#
+#   python launcher.py --batch nightly.txt
+#   python launcher.py --batch - --json < nightly.txt
+#
+# one command per line, blank lines and lines starting with # are skipped.
+# exit code is 0 when every command succeeded, 1 otherwise.
+
+import json, signal, statistics, sys, threading, time
+import config
+from _shell import CommandShell
+from _stats import StatsRecorder
+
+class HeadlessShell(CommandShell):
+    has_display = False
+
+    def __init__(self, commands, json_output=False, out=None):
+        self.commands = commands
+        self.jobs = None  # everything runs in the foreground, one command after another
+        self.processes = None
+        self.stats = StatsRecorder()
+        self.json_output = json_output
+        self.out = out or sys.stdout
+        self.current_preset_name = config.DEFAULT_PRESET
+        self.colors = config.PRESETS[self.current_preset_name]
+        self.exit_requested = False
+        self.cancel_event = threading.Event()
+        self.errors = 0
+        self._index = None
+        self._lock = threading.Lock()
+
+    # --- the "app" modules talk to ---
+
+    def print_text(self, text, tag='normal'):
+        # modules report most failures by printing with the 'error' tag instead of raising
+        with self._lock:
+            if tag == 'error':
+                self.errors += 1
+            if self.json_output:
+                self._emit({"type": "output", "index": self._index, "tag": tag, "text": text})
+            else:
+                stream = sys.stderr if tag == 'error' else self.out
+                stream.write(text)
+                stream.flush()
+
+    def progress(self, done, total=None, note=None):
+        pass
+
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def clear_output(self):
+        pass
+
+    def apply_preset(self, preset_name):
+        self.current_preset_name = preset_name
+        self.colors = config.PRESETS[preset_name]
+        self.print_text(f"Switched to preset '{preset_name}'.\n", 'info')
+
+    def set_scrollback(self, args):
+        self.print_text("No scrollback in batch mode.\n", 'info')
+        return True
+
+    def wait_for_job(self, job):
+        job.wait()
+
+    def request_exit(self):
+        self.exit_requested = True
+
+    def _emit(self, record):
+        self.out.write(json.dumps(record) + "\n")
+        self.out.flush()
+
+    # --- running ---
+
+    def run_command(self, index, cmd):
+        self._index = index
+        self.errors = 0
+        self.cancel_event.clear()
+        start = time.perf_counter()
+        try:
+            ok = self.execute(cmd)
+        except Exception as e:
+            self.print_text(f"Unhandled error: {e}\n", 'error')
+            ok = False
+        seconds = time.perf_counter() - start
+        ok = bool(ok) and self.errors == 0 and not self.cancelled()
+        result = {"type": "result", "index": index, "command": cmd, "ok": ok, "seconds": seconds}
+        if self.json_output:
+            self._emit(result)
+        else:
+            sys.stderr.write(f"[{'ok' if ok else 'FAIL'}] {seconds:9.3f}s  {cmd}\n")
+            sys.stderr.flush()
+        self._index = None
+        return result
+
+    def run_lines(self, lines, fail_fast=False, repeat=1):
+        results = []
+        cmds = [line.strip() for line in lines]
+        cmds = [cmd for cmd in cmds if cmd and not cmd.startswith("#")]
+        for _ in range(repeat):
+            for index, cmd in enumerate(cmds):
+                result = self.run_command(index, cmd)
+                results.append(result)
+                if self.exit_requested or (fail_fast and not result["ok"]):
+                    return results
+        return results
+
+def summarize(results):
+    per_command = {}
+    for result in results:
+        per_command.setdefault(result["command"], []).append(result["seconds"])
+    summary = []
+    for cmd, times in per_command.items():
+        summary.append({"command": cmd, "runs": len(times), "min": min(times),
+                        "median": statistics.median(times), "max": max(times)})
+    return summary
+
+def main(commands, script, json_output=False, fail_fast=False, repeat=1):
+    if script == "-":
+        lines = sys.stdin.readlines()
+    else:
+        try:
+            with open(script, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except OSError as e:
+            sys.stderr.write(f"Cannot read script: {e}\n")
+            return 2
+
+    shell = HeadlessShell(commands, json_output=json_output)
+
+    # first Ctrl+C asks the running command to stop (modules check app.cancelled()), second one kills us
+    def _interrupt(signum, frame):
+        if shell.cancel_event.is_set():
+            raise KeyboardInterrupt
+        shell.cancel_event.set()
+    signal.signal(signal.SIGINT, _interrupt)
+
+    start = time.perf_counter()
+    results = shell.run_lines(lines, fail_fast=fail_fast, repeat=max(1, repeat))
+    total = time.perf_counter() - start
+    failed = sum(1 for result in results if not result["ok"])
+
+    if json_output:
+        shell._emit({"type": "summary", "commands": len(results), "failed": failed,
+                     "seconds": total, "per_command": summarize(results)})
+    else:
+        if repeat > 1:
+            for row in summarize(results):
+                sys.stderr.write(f"{row['runs']}x  min {row['min']:.3f}s  median {row['median']:.3f}s  "
+                                 f"max {row['max']:.3f}s  {row['command']}\n")
+        sys.stderr.write(f"{len(results)} commands, {failed} failed, {total:.3f}s total\n")
+    return 1 if failed else 0
@@ -0,0 +1,245 @@
+# compression benchmark - did that change to compress.py / decompress.py make things faster or slower?
+#
+#   python _bench_compress.py --save          measure and keep the numbers as the baseline
+#   python _bench_compress.py                 measure again, exit 1 if anything regressed past --tolerance
+#   python _bench_compress.py --quick         small corpus, fewer combinations (a minute instead of many)
+#
+# the corpus is generated from fixed seeds, so every machine gets the same bytes, nothing is
+# downloaded: english-ish text, ascii art frames like ascii_image makes, raw rgb video frames and
+# random (incompressible) data, each at a couple of sizes. every case (kind, size, level, threads,
+# chunk size) runs in a fresh process so its peak RSS is its own. timings are the best of --repeat
+# runs. the baseline is machine specific, compare numbers from the same box only.
+
+import argparse, hashlib, json, multiprocessing, os, platform, resource, sys, time
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORPUS_DIR = os.path.join(HERE, ".bench_corpus")
+BASELINE_PATH = os.path.join(HERE, ".bench_baseline.json")
+BASELINE_VERSION = 1
+KINDS = ("text", "ascii", "video", "random")
+ASCII_CHARS = "@%#*+=-:. "  # same ramp as ascii_image.py
+WORDS = ("the of and to in is was for on that with as by at from his her it an were are which this "
+         "be or has had not but been one they their frame pixel color video sound window command file "
+         "launcher compress level buffer thread").split()
+RATIO_TOLERANCE = 0.005  # ratios are deterministic, anything beyond rounding is a real change
+
+# ---- corpus ----
+
+def _text(rng, size):
+    words = np.array(WORDS)[rng.integers(0, len(WORDS), size // 4)]
+    lines = [" ".join(words[i:i + 12]).capitalize() + "." for i in range(0, len(words), 12)]
+    return "\n".join(lines).encode("ascii")[:size]
+
+def _ascii(rng, size):
+    # a blob moving over a gradient, ramped to characters, 100 columns like ascii_image's default
+    width, height = 100, 40
+    y, x = np.mgrid[0:height, 0:width]
+    ramp = np.frombuffer(ASCII_CHARS.encode("ascii"), np.uint8)
+    frames, total, t = [], 0, 0
+    while total < size:
+        cx, cy = 50 + 35 * np.sin(t / 9), 20 + 12 * np.cos(t / 7)
+        value = (x / width * 120 + 255 * np.exp(-((x - cx) ** 2 / 300 + (y - cy) ** 2 / 60))
+                 + rng.normal(0, 6, (height, width)))
+        index = np.clip(value, 0, 255).astype(np.int64) * (len(ASCII_CHARS) - 1) // 255
+        lines = np.full((height, width + 1), ord("\n"), np.uint8)
+        lines[:, :width] = ramp[index]
+        frame = lines.tobytes() + b"\n"
+        frames.append(frame)
+        total += len(frame)
+        t += 1
+    return b"".join(frames)[:size]
+
+def _video(rng, size):
+    # raw 320x180 rgb24 frames: a panning gradient, a moving box and sensor noise
+    width, height = 320, 180
+    y, x = np.mgrid[0:height, 0:width]
+    frames, total, t = [], 0, 0
+    while total < size:
+        frame = np.empty((height, width, 3), np.uint8)
+        frame[..., 0] = (x + 3 * t) % 256
+        frame[..., 1] = (y * 255 // height)
+        frame[..., 2] = 128
+        bx, by = (5 * t) % (width - 40), (3 * t) % (height - 40)
+        frame[by:by + 40, bx:bx + 40] = (240, 40, 40)
+        noise = rng.integers(-3, 4, frame.shape)
+        frame = np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8).tobytes()
+        frames.append(frame)
+        total += len(frame)
+        t += 1
+    return b"".join(frames)[:size]
+
+def _random(rng, size):
+    return rng.bytes(size)
+
+GENERATORS = {"text": _text, "ascii": _ascii, "video": _video, "random": _random}
+
+def corpus_file(kind, size, directory=CORPUS_DIR):
+    # generated once and kept, the name carries everything that decides the content
+    path = os.path.join(directory, f"{kind}-{size}.bin")
+    if not os.path.isfile(path) or os.path.getsize(path) != size:
+        os.makedirs(directory, exist_ok=True)
+        seed = int.from_bytes(hashlib.blake2b(f"{kind}:{size}".encode(), digest_size=8).digest(), "little")
+        data = GENERATORS[kind](np.random.default_rng(seed), size)
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+    return path
+
+# ---- one case, in its own process ----
+
+def _digest(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _run_case(case, repeat):
+    os.environ["BABABOI_NO_SOUND"] = "1"
+    sys.path.insert(0, HERE)
+    import compress, decompress, _fastio
+    source = case["path"]
+    packed = source + f".{os.getpid()}.zst"
+    unpacked = source + f".{os.getpid()}.out"
+    size = os.path.getsize(source)
+    settings = _fastio.defaults()
+    never = lambda: False
+    compress_times, decompress_times = [], []
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            with open(packed, "wb", buffering=settings["buffer"]) as fout:
+                compress.compress_file(source, fout, case["level"], case["chunk"] or None, size, None, never,
+                                       settings, threads=case["threads"])
+            compress_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            decompress.decompress_file(packed, unpacked, settings)
+            decompress_times.append(time.perf_counter() - start)
+        if _digest(unpacked) != _digest(source):
+            raise RuntimeError("round trip changed the data")
+        compressed = os.path.getsize(packed)
+    finally:
+        for path in (packed, unpacked):
+            if os.path.exists(path):
+                os.remove(path)
+    return {
+        "compress_mbps": size / 1e6 / min(compress_times),
+        "decompress_mbps": size / 1e6 / min(decompress_times),
+        "ratio": compressed / size,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,  # KiB on linux
+    }
+
+def run_cases(cases, repeat):
+    # maxtasksperchild=1: a new process per case, so ru_maxrss is that case's peak only
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    with ctx.Pool(1, maxtasksperchild=1) as pool:
+        for key, case in cases:
+            results[key] = pool.apply(_run_case, (case, repeat))
+            r = results[key]
+            print(f"{key:<40} {r['compress_mbps']:>9.1f} {r['decompress_mbps']:>9.1f} "
+                  f"{r['ratio']:>8.2%} {r['peak_rss_mb']:>8.1f}", flush=True)
+    return results
+
+def build_cases(kinds, sizes, levels, threads, chunks, directory):
+    cases = []
+    for kind in kinds:
+        for size in sizes:
+            path = corpus_file(kind, size, directory)
+            for level in levels:
+                for thread_count in threads:
+                    for chunk in chunks:
+                        key = f"{kind}-{size >> 10}K L{level} T{thread_count} C{chunk >> 10}K"
+                        cases.append((key, {"path": path, "level": level, "threads": thread_count, "chunk": chunk}))
+    return cases
+
+# ---- baseline ----
+
+def compare(results, baseline, tolerance):
+    # human readable regressions, empty when everything is within tolerance
+    problems = []
+    for key, new in results.items():
+        old = baseline.get(key)
+        if old is None:
+            continue
+        for metric in ("compress_mbps", "decompress_mbps"):
+            if new[metric] < old[metric] * (1 - tolerance):
+                problems.append(f"{key}: {metric} {old[metric]:.1f} -> {new[metric]:.1f}")
+        if new["ratio"] > old["ratio"] * (1 + RATIO_TOLERANCE):
+            problems.append(f"{key}: ratio {old['ratio']:.2%} -> {new['ratio']:.2%}")
+        if new["peak_rss_mb"] > old["peak_rss_mb"] * (1 + tolerance):
+            problems.append(f"{key}: peak RSS {old['peak_rss_mb']:.1f} MB -> {new['peak_rss_mb']:.1f} MB")
+    return problems
+
+def machine():
+    return {"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count(),
+            "system": platform.system()}
+
+def _sizes(text):
+    sys.path.insert(0, HERE)
+    from _seekable import parse_size
+    return [parse_size(part) for part in text.split(",") if part]
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="compress/decompress benchmark against a saved baseline")
+    parser.add_argument("--quick", action="store_true", help="1M inputs, levels 1 and 3, default threads only")
+    parser.add_argument("--kinds", default=",".join(KINDS), help=f"comma separated, from {', '.join(KINDS)}")
+    parser.add_argument("--sizes", default="1M,16M", help="input sizes (default 1M,16M)")
+    parser.add_argument("--levels", default="1,3,9", help="zstd levels (default 1,3,9)")
+    parser.add_argument("--threads", default=None,
+                        help="zstd threads / seekable workers (default 0 and the cpu count)")
+    parser.add_argument("--chunks", default="0,1M",
+                        help="seekable frame sizes, 0 = one frame (default 0,1M)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case, the fastest counts")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="allowed slowdown / RSS growth before failing (default 0.15 = 15%%)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--corpus", default=CORPUS_DIR, help="where the generated inputs are kept")
+    options = parser.parse_args(argv)
+    if options.quick:
+        options.sizes, options.levels, options.threads, options.chunks = "1M", "1,3", "0", "0,256K"
+    if options.threads is None:
+        options.threads = f"0,{os.cpu_count() or 1}"
+    return options
+
+def main(argv):
+    options = parse_args(argv)
+    kinds = [kind for kind in options.kinds.split(",") if kind]
+    unknown = set(kinds) - set(KINDS)
+    if unknown:
+        print(f"unknown kinds: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+    cases = build_cases(kinds, _sizes(options.sizes), [int(level) for level in options.levels.split(",")],
+                        [int(count) for count in options.threads.split(",")], _sizes(options.chunks),
+                        options.corpus)
+    print(f"{'case':<40} {'comp MB/s':>9} {'dec MB/s':>9} {'ratio':>8} {'RSS MB':>8}")
+    results = run_cases(cases, max(options.repeat, 1))
+
+    if options.save:
+        with open(options.baseline, "w", encoding="utf-8") as f:
+            json.dump({"version": BASELINE_VERSION, "time": time.time(), "machine": machine(),
+                       "results": results}, f, indent=1, sort_keys=True)
+        print(f"baseline saved to {options.baseline}")
+        return 0
+    try:
+        with open(options.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    except (OSError, ValueError):
+        print(f"no baseline at {options.baseline}, run with --save first")
+        return 0
+    if baseline.get("version") != BASELINE_VERSION:
+        print("baseline is from an older version of this script, run with --save again")
+        return 0
+    if baseline.get("machine") != machine():
+        print("warning: baseline was recorded on a different machine, numbers aren't comparable")
+    problems = compare(results, baseline.get("results", {}), options.tolerance)
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    compared = sum(key in baseline.get("results", {}) for key in results)
+    print(f"{compared} of {len(results)} cases compared, {len(problems)} regression(s)")
+    return 1 if problems else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
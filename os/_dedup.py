@@ -0,0 +1,151 @@
+# dedup store for /compress --dedup - near identical exports (video frames, ascii renders) share
+# most of their bytes, so every file is cut into content defined chunks and each distinct chunk is
+# stored once, zstd compressed, under its hash:
+#
+#   .zstd_store/ab/cdef....zst      one chunk, named by the blake2b of its uncompressed bytes
+#   name.zdd                        zstd compressed json manifest: files and their chunk lists
+#
+# chunk edges come from a gear rolling hash over the last 32 bytes, so inserting or removing bytes
+# only changes the chunks around the edit, the rest of the file still cuts at the same places.
+# the hash is vectorized with numpy: h[i] = sum(gear[data[i - k]] << k for k < 32), built in 5
+# doubling steps instead of a python loop per byte.
+
+import hashlib, json, os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import zstandard as zstd
+
+STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".zstd_store")
+MANIFEST_VERSION = 1
+MIN_CHUNK = 16 << 10
+MAX_CHUNK = 256 << 10
+CUT_BELOW = 1 << 16   # h < 2^16 on a 32 bit hash: a cut every 64 KiB on average after MIN_CHUNK
+WINDOW = 32
+READ_SIZE = 8 << 20
+WORKERS = os.cpu_count() or 2
+
+# fixed seed, cut points have to come out the same on every run and machine
+_GEAR = np.random.default_rng(0x5EED).integers(0, 1 << 32, 256, dtype=np.uint32)
+
+def _gear_hash(data):
+    h = _GEAR[np.frombuffer(data, np.uint8)]
+    span = 1
+    while span < WINDOW:
+        h[span:] += h[:-span] << np.uint32(span)
+        span *= 2
+    return h
+
+def cut_points(data, final):
+    # chunk ends in data (which starts at a chunk edge). without `final` the bytes after the last
+    # cut are left for the next call, they might still be part of a bigger chunk
+    n = len(data)
+    candidates = np.flatnonzero(_gear_hash(data) < CUT_BELOW) + 1
+    cuts = []
+    last = 0
+    while last < n:
+        i = np.searchsorted(candidates, last + MIN_CHUNK)
+        end = min(int(candidates[i]) if i < len(candidates) else n + 1, last + MAX_CHUNK)
+        if end > n:
+            if final:
+                cuts.append(n)
+            break
+        cuts.append(end)
+        last = end
+    return cuts
+
+def chunks(f):
+    carry = b""
+    while True:
+        block = f.read(READ_SIZE)
+        data = carry + block
+        last = 0
+        for end in cut_points(data, final=not block):
+            yield data[last:end]
+            last = end
+        carry = data[last:]
+        if not block:
+            return
+
+def digest(chunk):
+    return hashlib.blake2b(chunk, digest_size=20).hexdigest()
+
+class ChunkStore:
+    def __init__(self, path=STORE_DIR, level=3):
+        self.path = path
+        self.level = level
+        self._known = set()  # digests seen present this session, saves a stat per repeated chunk
+
+    def _chunk_path(self, key):
+        return os.path.join(self.path, key[:2], key[2:] + ".zst")
+
+    def put(self, chunk):
+        # (digest, bytes written to the store, 0 when it was there already)
+        key = digest(chunk)
+        path = self._chunk_path(key)
+        if key in self._known or os.path.exists(path):
+            self._known.add(key)
+            return key, 0
+        data = zstd.ZstdCompressor(level=self.level).compress(chunk)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{id(chunk)}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)  # another run storing the same chunk just writes the same bytes
+        self._known.add(key)
+        return key, len(data)
+
+    def get(self, key, size):
+        try:
+            with open(self._chunk_path(key), 'rb') as f:
+                chunk = zstd.ZstdDecompressor().decompress(f.read(), max_output_size=size)
+        except FileNotFoundError:
+            raise LookupError(f"chunk {key} is missing from {self.path}") from None
+        if len(chunk) != size or digest(chunk) != key:
+            raise ValueError(f"chunk {key} in {self.path} is damaged")
+        return chunk
+
+def store_file(store, f, pool, cancelled):
+    # [[digest, size], ...] for the file and the bytes it added to the store. hashing and zstd both
+    # let go of the GIL, so chunks are stored on the pool with a few per thread in flight
+    refs, added = [], 0
+    pending = deque()
+
+    def collect():
+        nonlocal added
+        size, future = pending.popleft()
+        key, written = future.result()
+        refs.append([key, size])
+        added += written
+
+    for chunk in chunks(f):
+        if cancelled():
+            return None, added
+        pending.append((len(chunk), pool.submit(store.put, chunk)))
+        if len(pending) >= 2 * WORKERS:
+            collect()
+    while pending:
+        collect()
+    return refs, added
+
+def thread_pool():
+    return ThreadPoolExecutor(max_workers=WORKERS)
+
+def write_manifest(path, store_path, files):
+    # store path relative to the manifest, so both can move together
+    data = {"version": MANIFEST_VERSION,
+            "store": os.path.relpath(store_path, os.path.dirname(os.path.abspath(path))),
+            "files": files}
+    raw = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(zstd.ZstdCompressor(level=9).compress(raw))
+    os.replace(tmp, path)  # a failed run never leaves half a manifest (or eats the old one)
+
+def read_manifest(path):
+    with open(path, 'rb') as f:
+        data = json.loads(zstd.ZstdDecompressor().decompress(f.read()))
+    if data.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"unknown manifest version {data.get('version')}")
+    store = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(path)), data["store"]))
+    return ChunkStore(store), data["files"]
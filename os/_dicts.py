@@ -0,0 +1,110 @@
+# zstd dictionaries for lots of small files (ascii_image text, config dumps). without one every
+# small frame starts from zero and the ratio is mostly header; a dictionary trained on similar
+# files gives zstd that history up front.
+#
+# trained dictionaries live in .zstd_dicts/<dict id>.dict. every frame compressed with one carries
+# its id in the header, so /decompress finds the right dictionary on its own.
+#
+# a dictionary is digested (precompute_compress) once per level and kept for later commands in the
+# same worker process; a batch reuses one compressor for all its files.
+
+import os, struct, threading
+import zstandard as zstd
+from _seekable import SKIPPABLE_MAGIC_BASE, ZSTD_MAGIC
+
+DICT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".zstd_dicts")
+DEFAULT_DICT_SIZE = 112 << 10    # zstd cli default
+MAX_SAMPLE_FILE = 1 << 20        # dictionaries only help small files, bigger samples just slow training
+MAX_SAMPLE_BYTES = 64 << 20
+
+_lock = threading.Lock()
+_prepared = {}  # (dict id, level or None) -> ZstdCompressionDict
+
+def _path(dict_id):
+    return os.path.join(DICT_DIR, f"{dict_id}.dict")
+
+def collect_samples(paths):
+    samples, total = [], 0
+    for path in paths:
+        try:
+            if os.path.getsize(path) > MAX_SAMPLE_FILE:
+                continue
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            continue
+        if data:
+            samples.append(data)
+            total += len(data)
+            if total >= MAX_SAMPLE_BYTES:
+                break
+    return samples
+
+def train(samples, size=DEFAULT_DICT_SIZE, level=3):
+    # trains and stores a dictionary, returns its id. zstd wants a fair amount of samples
+    # (roughly 100x the dictionary size) and raises ZstdError when it gets too little
+    size = min(size, max(sum(map(len, samples)) // 10, 1024))
+    trained = zstd.train_dictionary(size, samples, level=level, threads=-1)
+    dict_id = trained.dict_id()
+    os.makedirs(DICT_DIR, exist_ok=True)
+    tmp = _path(dict_id) + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(trained.as_bytes())
+    os.replace(tmp, _path(dict_id))
+    return dict_id
+
+def _read(dict_id):
+    try:
+        with open(_path(dict_id), 'rb') as f:
+            return zstd.ZstdCompressionDict(f.read())
+    except FileNotFoundError:
+        raise LookupError(f"Dictionary {dict_id} isn't in {DICT_DIR}") from None
+
+def prepared(dict_id, level=None):
+    # the dictionary digested for one compression level (None = for decompressing, zstd digests it on
+    # first use and keeps that). digesting is the expensive part and a digested dictionary can be
+    # shared between threads, contexts can't
+    key = (dict_id, level)
+    with _lock:
+        dictionary = _prepared.get(key)
+        if dictionary is None:
+            dictionary = _read(dict_id)
+            if level is not None:
+                dictionary.precompute_compress(level=level)
+            _prepared[key] = dictionary
+        return dictionary
+
+def compressor(dict_id, level, **params):
+    return zstd.ZstdCompressor(level=level, dict_data=prepared(dict_id, level), **params)
+
+def decompressor(dict_id=0):
+    return zstd.ZstdDecompressor(dict_data=prepared(dict_id) if dict_id else None)
+
+def frame_dict_id(f):
+    # dictionary id from the first zstd frame header at the current position of a buffered binary
+    # file, 0 when none was used (or there's no frame). skippable frames in front of it are stepped
+    # over as far as peek() reaches - an empty --seekable file is nothing but its seek table.
+    # peek() leaves the position alone, so pipes work too
+    head = f.peek(18)
+    offset = 0
+    while len(head) >= offset + 8:
+        magic, size = struct.unpack_from("<II", head, offset)
+        if magic & 0xFFFFFFF0 != SKIPPABLE_MAGIC_BASE:
+            break
+        offset += 8 + size
+    if len(head) < offset + 4 or struct.unpack_from("<I", head, offset)[0] != ZSTD_MAGIC:
+        return 0
+    try:
+        return zstd.get_frame_parameters(head[offset:offset + 18]).dict_id  # 18 = max frame header size
+    except zstd.ZstdError:
+        return 0
+
+def decompressor_for(f):
+    return decompressor(frame_dict_id(f))
+
+def cached():
+    # (id, size) of every stored dictionary
+    if not os.path.isdir(DICT_DIR):
+        return []
+    return sorted((int(name[:-5]), os.path.getsize(os.path.join(DICT_DIR, name)))
+                  for name in os.listdir(DICT_DIR) if name.endswith(".dict") and name[:-5].isdigit())
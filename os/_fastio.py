@@ -0,0 +1,127 @@
+# file I/O for compress/decompress that stays out of zstd's way on fast disks
+#
+#   mmap   the input is mapped and handed to zstd as memoryview slices, no copy into python bytes
+#   read   readinto() a buffer that gets reused, so there's no fresh 1 MiB bytes object per chunk
+#   auto   mmap for inputs of MMAP_MIN and up, read below that (mapping small files costs more
+#          than it saves)
+#
+# outputs whose size is known up front get their blocks reserved with posix_fallocate, which keeps
+# the file in one piece on disk and means no allocation while writing. with pread/pwrite several
+# threads can read and write their own parts of the same files (parallel frame decompression).
+
+import contextlib, mmap, os
+from _seekable import parse_size
+
+BACKENDS = ("auto", "mmap", "read")
+DEFAULT_BUFFER = 1 << 20
+MIN_BUFFER = 4 << 10
+MAX_BUFFER = 1 << 30
+MMAP_MIN = 16 << 20
+
+def parse_option(name, value, settings):
+    # --io=auto|mmap|read and --buffer=SIZE into settings = {"io": ..., "buffer": ...}.
+    # False when the option isn't one of these, ValueError when the value is bad
+    if name == "--io":
+        if value not in BACKENDS:
+            raise ValueError(f"--io has to be one of {', '.join(BACKENDS)}")
+        settings["io"] = value
+        return True
+    if name == "--buffer":
+        try:
+            size = parse_size(value)
+        except ValueError:
+            size = 0
+        if not MIN_BUFFER <= size <= MAX_BUFFER:
+            raise ValueError(f"--buffer has to be between {MIN_BUFFER >> 10}K and {MAX_BUFFER >> 20}M")
+        settings["buffer"] = size
+        return True
+    return False
+
+def defaults():
+    return {"io": "auto", "buffer": DEFAULT_BUFFER}
+
+def use_mmap(backend, size):
+    return size > 0 and (backend == "mmap" or (backend == "auto" and size >= MMAP_MIN))
+
+def _advise_sequential(f):
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except OSError:
+            pass
+
+def read_chunks(f, size, reuse):
+    if not reuse:
+        yield from iter(lambda: f.read(size), b'')
+        return
+    buf = bytearray(size)
+    view = memoryview(buf)
+    while True:
+        n = f.readinto(buf)
+        if not n:
+            return
+        yield view[:n]
+
+def _close_map(m):
+    try:
+        m.close()
+    except BufferError:
+        pass  # a slice is still alive somewhere, the map goes away with it
+
+@contextlib.contextmanager
+def mapped(f, backend):
+    # the open file as something zstd can read from: the mmap itself, or the file
+    size = os.fstat(f.fileno()).st_size
+    if not use_mmap(backend, size):
+        _advise_sequential(f)
+        yield f
+        return
+    m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if hasattr(mmap, "MADV_SEQUENTIAL"):
+        m.madvise(mmap.MADV_SEQUENTIAL)
+    try:
+        yield m
+    finally:
+        _close_map(m)
+
+@contextlib.contextmanager
+def input_chunks(path, backend, size, reuse=True):
+    # chunks of `size` bytes of the file. reuse=True hands out the same buffer every time (read
+    # backend), so a chunk is only good until the next one; pass False when chunks are kept around
+    with open(path, 'rb', buffering=0) as f:
+        with mapped(f, backend) as source:
+            if source is f:
+                yield read_chunks(f, size, reuse)
+                return
+            view = memoryview(source)
+            try:
+                yield (view[i:i + size] for i in range(0, len(view), size))
+            finally:
+                view.release()
+
+def write_all(f, view):
+    # unbuffered writes can come back short
+    while view:
+        view = view[f.write(view):]
+
+def positional():
+    # pread/pwrite, what lets several threads fill their own part of one file (not on windows)
+    return hasattr(os, "pread") and hasattr(os, "pwrite")
+
+def write_at(fd, offset, view):
+    # positional writes can come back short too
+    view = memoryview(view)
+    while view:
+        n = os.pwrite(fd, view, offset)
+        view = view[n:]
+        offset += n
+
+def preallocate(f, size):
+    # reserve the output's blocks, True when it worked (the file may then have to be truncated)
+    if size <= 0 or not hasattr(os, "posix_fallocate"):
+        return False
+    try:
+        os.posix_fallocate(f.fileno(), 0, size)
+        return True
+    except OSError:
+        return False  # filesystem without it
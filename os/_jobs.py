@@ -0,0 +1,204 @@
+# background jobs for the launcher - commands run on a worker pool so the Tk window never freezes
+# tkinter is NOT thread safe, so anything a job wants to show goes through a queue that the
+# Tk main loop drains with after()
+
+import queue, threading, time, traceback
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+class Job:
+    def __init__(self, job_id, command, args):
+        self.id = job_id
+        self.command = command
+        self.args = list(args)
+        self.state = QUEUED
+        self.error = None
+        self.progress_done = None
+        self.progress_total = None
+        self.progress_note = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.future = None
+        self.cancel_event = threading.Event()
+        self._callbacks = []
+
+    @property
+    def active(self):
+        return self.state in (QUEUED, RUNNING)
+
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def describe_progress(self):
+        if self.progress_done is None:
+            return ""
+        if self.progress_total:
+            text = f"{self.progress_done / self.progress_total:6.1%}"
+        else:
+            text = f"{self.progress_done}"
+        if self.progress_note:
+            text += f" {self.progress_note}"
+        return text
+
+    def wait(self, timeout=None):
+        # blocking wait, only for non-Tk callers (the Tk side uses JobScheduler.when_done)
+        if self.future is not None:
+            try:
+                self.future.result(timeout)
+            except Exception:
+                pass
+        return self.state
+
+class JobApp:
+    # what a module's runarg(app, args) gets when it runs as a job:
+    # print_text is marshalled to the Tk thread, plus progress() and cancelled() for long commands
+    def __init__(self, scheduler, job, app):
+        self._scheduler = scheduler
+        self._job = job
+        self._app = app
+        self.errors = 0
+
+    def print_text(self, text, tag='normal'):
+        if tag == 'error':
+            self.errors += 1
+        # the launcher's print_text only queues into its output buffer, no Tk calls, so call it directly
+        self._app.print_text(text, tag)
+
+    def progress(self, done, total=None, note=None):
+        self._job.progress_done = done
+        self._job.progress_total = total
+        self._job.progress_note = note
+
+    def cancelled(self):
+        return self._job.cancelled()
+
+    def __getattr__(self, name):
+        # colors, current_preset_name, ... are read-only lookups, fine from any thread
+        return getattr(self._app, name)
+
+class JobScheduler:
+    def __init__(self, app, max_workers=4, poll_ms=50, notify_after=1.0):
+        self.app = app
+        self.poll_ms = poll_ms
+        self.notify_after = notify_after
+        self.jobs = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._ui_queue = queue.SimpleQueue()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.app.after(self.poll_ms, self._pump)
+
+    # --- Tk side ---
+
+    def post(self, func, *args):
+        # safe to call from any thread, func(*args) runs on the Tk main loop
+        self._ui_queue.put((func, args))
+
+    def _pump(self):
+        try:
+            while True:
+                func, args = self._ui_queue.get_nowait()
+                try:
+                    func(*args)
+                except Exception:
+                    traceback.print_exc()
+        except queue.Empty:
+            pass
+        self.app.after(self.poll_ms, self._pump)
+
+    def when_done(self, job, callback):
+        # callback(job) on the Tk thread once the job is finished (right away if it already is)
+        with self._lock:
+            if job.active:
+                job._callbacks.append(callback)
+                return
+        callback(job)
+
+    # --- jobs ---
+
+    def submit(self, command, args, func):
+        # func(job_app) does the actual work, it runs on a worker thread
+        with self._lock:
+            job = Job(self._next_id, command, args)
+            self._next_id += 1
+            self.jobs[job.id] = job
+        job_app = JobApp(self, job, self.app)
+        job.future = self._executor.submit(self._run, job, job_app, func)
+        return job
+
+    def _run(self, job, job_app, func):
+        if job.cancelled():
+            self._finish(job, CANCELLED)
+            return
+        job.state = RUNNING
+        job.started = time.time()
+        try:
+            ok = func(job_app)
+        except Exception as e:
+            job.error = e
+            traceback.print_exc()
+            self._finish(job, FAILED)
+            return
+        if job.cancelled():
+            self._finish(job, CANCELLED)
+        else:
+            # func returns False when it already reported the error itself
+            self._finish(job, FAILED if ok is False else DONE)
+
+    def _finish(self, job, state):
+        with self._lock:
+            job.state = state
+            job.finished = time.time()
+            callbacks, job._callbacks = job._callbacks, []
+        self.post(self._announce, job)
+        for callback in callbacks:
+            self.post(callback, job)
+
+    def _announce(self, job):
+        if job.state == FAILED:
+            if job.error is None:
+                return
+            self.app.print_text(f"[{job.id}] {job.command} failed: {job.error}\n", 'error')
+        elif job.state == CANCELLED:
+            self.app.print_text(f"[{job.id}] {job.command} cancelled\n", 'info')
+        elif job.elapsed() >= self.notify_after:
+            self.app.print_text(f"[{job.id}] {job.command} done ({job.elapsed():.1f}s)\n", 'info')
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None or not job.active:
+            return False
+        job.cancel_event.set()
+        # still queued -> it never starts, running -> the module checks app.cancelled()
+        if job.future is not None and job.future.cancel():
+            self._finish(job, CANCELLED)
+        return True
+
+    def active(self):
+        return [job for job in self.jobs.values() if job.active]
+
+    def prune(self, keep=50):
+        # finished jobs are kept around for /jobs, just not forever
+        with self._lock:
+            finished = [job_id for job_id, job in self.jobs.items() if not job.active]
+            for job_id in finished[:-keep]:
+                del self.jobs[job_id]
+
+    def shutdown(self):
+        for job in self.active():
+            job.cancel_event.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,104 @@
+# output buffer for the launcher's Text widget
+# print_text used to do state toggle + insert + see(END) for every single call, now text is queued
+# and written in one batch per frame, and old lines are thrown away so scrollback can't grow forever
+
+import threading
+from collections import deque
+import tkinter as tk
+
+class OutputBuffer:
+    def __init__(self, widget, max_lines=5000, fps=30):
+        self.widget = widget
+        self.max_lines = max_lines
+        self.interval = max(1, int(1000 / fps))
+        self._pending = deque()
+        self._pending_lines = 0
+        self._lock = threading.Lock()
+        self._clear_requested = False
+        self.widget.after(self.interval, self._tick)
+
+    def write(self, text, tag='normal'):
+        # safe from any thread, nothing touches Tk here
+        if not text:
+            return
+        with self._lock:
+            self._pending.append((text, tag))
+            self._pending_lines += text.count("\n")
+            if self._pending_lines > self.max_lines:
+                self._trim_pending()
+
+    def clear(self):
+        with self._lock:
+            self._pending = deque()
+            self._pending_lines = 0
+            self._clear_requested = True
+        self.flush()
+
+    def set_max_lines(self, max_lines):
+        self.max_lines = max(1, int(max_lines))
+        self.flush()
+
+    def _trim_pending(self):
+        # more lines waiting than scrollback can hold - the oldest would be trimmed right after
+        # being inserted anyway, so don't hand them to Tk at all (this is what makes /open on a big log cheap)
+        excess = self._pending_lines - self.max_lines
+        while excess > 0 and self._pending:
+            text, tag = self._pending[0]
+            lines = text.count("\n")
+            if lines <= excess:
+                self._pending.popleft()
+                self._pending_lines -= lines
+                excess -= lines
+                continue
+            # cut inside this chunk right after the excess-th newline
+            cut = -1
+            for _ in range(excess):
+                cut = text.index("\n", cut + 1)
+            self._pending[0] = (text[cut + 1:], tag)
+            self._pending_lines -= excess
+            excess = 0
+
+    def _tick(self):
+        try:
+            self.flush()
+        finally:
+            self.widget.after(self.interval, self._tick)
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, deque()
+            self._pending_lines = 0
+            clear, self._clear_requested = self._clear_requested, False
+        if not pending and not clear:
+            return
+
+        # glue neighbouring chunks with the same tag together -> one insert per colour run
+        runs = []
+        for text, tag in pending:
+            if runs and runs[-1][1] == tag:
+                runs[-1][0].append(text)
+            else:
+                runs.append(([text], tag))
+
+        widget = self.widget
+        widget.config(state='normal')
+        if clear:
+            widget.delete('1.0', tk.END)
+        if runs:
+            args = []
+            for texts, tag in runs:
+                args.extend(("".join(texts), tag))
+            widget.insert(tk.END, *args)
+        self._trim_widget()
+        widget.config(state='disabled')
+        widget.see(tk.END)
+
+    def _trim_widget(self):
+        # trim in bulk with some slack so we don't delete a couple of lines on every frame
+        lines = int(self.widget.index('end-1c').split('.')[0])
+        slack = max(self.max_lines // 10, 1)
+        if lines > self.max_lines + slack:
+            self.widget.delete('1.0', f'{lines - self.max_lines + 1}.0')
+
+    def line_count(self):
+        return int(self.widget.index('end-1c').split('.')[0])
@@ -0,0 +1,203 @@
+# pipelines - `/decompress notes.txt.zst | /open` streams chunks from one command into the next
+# instead of going through a file on disk
+#
+# a command joins a pipeline with a module level generator
+#   def stream(app, args, chunks):   # chunks = iterator over the previous stage's bytes/str, None for the first stage
+#       yield ...
+# commands that only have runarg()/run() still work: the upstream data is spooled to a temp file
+# whose path replaces a "-" argument (or becomes the first argument, named with the module's
+# PIPE_SUFFIX if it has one), and what they print with the 'normal' tag is their output.
+#
+# every stage but the last runs on its own thread with at most PIPE_DEPTH chunks queued behind it,
+# so memory stays at a few chunks no matter how big the data is.
+
+import codecs, io, os, queue, tempfile, threading, traceback
+from _sound import nuh_uh
+
+PIPE_DEPTH = 4
+
+def split_unquoted(cmd, sep="|"):
+    # cmd cut at every sep outside '...' / "..." quotes, the way a shell would see it: `/echo "a|b"`
+    # is one command. a quote only opens at the start of a word (or after = / :), so the ' in
+    # don't is just a letter. the quotes stay in, arguments are still split and unquoted by the commands
+    parts, current, quote = [], [], None
+    for ch in cmd:
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in "'\"" and (not current or current[-1].isspace() or current[-1] in "=:"):
+            quote = ch
+        elif ch == sep:
+            parts.append("".join(current))
+            current = []
+            continue
+        current.append(ch)
+    parts.append("".join(current))
+    return parts
+
+def is_pipeline(cmd):
+    return len(split_unquoted(cmd)) > 1
+
+def split_stages(cmd, prefix):
+    # "/a x | /b y" -> [("a", ["x"]), ("b", ["y"])]
+    stages = []
+    for part in split_unquoted(cmd):
+        part = part.strip()
+        if not part.startswith(prefix) or not part[len(prefix):].split():
+            raise ValueError(f"every stage needs a command, like {prefix}decompress file.zst | {prefix}open")
+        words = part[len(prefix):].split()
+        stages.append((words[0].lower(), words[1:]))
+    return stages
+
+class ChunkReader(io.RawIOBase):
+    # file-like view over a chunk iterator, for code that wants .read() (zstd, PIL, ...)
+    def __init__(self, chunks):
+        self._chunks = iter(chunks) if chunks is not None else iter(())
+        self._view = memoryview(b"")
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._view:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                return 0
+            self._view = memoryview(chunk.encode("utf-8") if isinstance(chunk, str) else chunk).cast("B")
+        n = min(len(b), len(self._view))
+        b[:n] = self._view[:n]
+        self._view = self._view[n:]
+        return n
+
+    def close(self):
+        # stops the producer too when the reader is dropped early
+        close = getattr(self._chunks, "close", None)
+        if close:
+            close()
+        super().close()
+
+class _Capture:
+    # the app a runarg-only stage sees: 'normal' output goes down the pipe, info/errors to the launcher
+    def __init__(self, app):
+        self._app = app
+        self.chunks = []
+
+    def print_text(self, text, tag='normal'):
+        if tag == 'normal':
+            self.chunks.append(text)
+        else:
+            self._app.print_text(text, tag)
+
+    def __getattr__(self, name):
+        return getattr(self._app, name)
+
+def _path_stage(app, module, args, chunks):
+    path = None
+    try:
+        if chunks is not None:
+            fd, path = tempfile.mkstemp(prefix="bababoi-pipe-", suffix=getattr(module, "PIPE_SUFFIX", ""))
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+            args = [path if arg == "-" else arg for arg in args] if "-" in args else [path] + args
+        capture = _Capture(app)
+        if hasattr(module, 'runarg'):
+            module.runarg(capture, args)
+        else:
+            module.run(capture)
+        yield from capture.chunks
+    finally:
+        if path is not None:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def readahead(chunks, depth, cancelled):
+    # runs the upstream stage on its own thread so both sides work at the same time
+    q = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        item = ("end", None)
+        try:
+            for chunk in chunks:
+                if not put(("chunk", chunk)) or cancelled():
+                    break
+        except BaseException as e:
+            item = ("error", e)
+        finally:
+            # the generator lives on this thread, so its cleanup (temp files, open handles) runs here too
+            close = getattr(chunks, "close", None)
+            if close:
+                close()
+        put(item)
+
+    producer = threading.Thread(target=produce, name="pipe-stage", daemon=True)
+    producer.start()
+    try:
+        while True:
+            kind, value = q.get()
+            if kind == "chunk":
+                yield value
+            elif kind == "error":
+                raise value
+            else:
+                return
+    finally:
+        stop.set()
+        producer.join()
+
+def run(app, registry, stages):
+    cancelled = getattr(app, 'cancelled', lambda: False)
+    chunks = None
+    try:
+        for index, (command, args) in enumerate(stages):
+            module = registry.load(command)
+            if hasattr(module, 'stream'):
+                chunks = module.stream(app, args, chunks)
+            elif hasattr(module, 'runarg') or hasattr(module, 'run'):
+                chunks = _path_stage(app, module, args, chunks)
+            else:
+                app.print_text(f"'{command}' can't be part of a pipeline.\n", 'error')
+                nuh_uh()
+                return False
+            if index < len(stages) - 1:
+                chunks = readahead(chunks, PIPE_DEPTH, cancelled)
+
+        # bytes from the last stage get shown as text, without splitting a multibyte character
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        for chunk in chunks:
+            if cancelled():
+                app.print_text("Pipeline cancelled.\n", 'info')
+                return False
+            text = chunk if isinstance(chunk, str) else decoder.decode(chunk)
+            if text:
+                app.print_text(text)
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            app.print_text(tail)
+        return True
+    except ImportError as e:
+        app.print_text(f"Import error: {e}\n", 'error')
+        nuh_uh()
+        return False
+    except Exception as e:
+        app.print_text(f"Pipeline failed: {e}\n", 'error')
+        traceback.print_exc()
+        nuh_uh()
+        return False
+    finally:
+        close = getattr(chunks, "close", None)
+        if close:
+            close()
@@ -0,0 +1,622 @@
+# process model behind /taskmanager, no tkinter in here
+# a ProcessSampler thread does all the psutil work and publishes read-only snapshots,
+# the window only renders the latest one, through a ProcessView that keeps the filter index
+# up to date per pid instead of rebuilding it every tick
+
+import collections, csv, heapq, math, os, re, threading, time, types
+import numpy as np
+import psutil
+
+ProcInfo = collections.namedtuple("ProcInfo", [
+    "pid", "ppid", "name", "user", "status", "cpu", "rss", "threads",
+    "read_bytes", "write_bytes", "read_rate", "write_rate", "create_time",
+])
+
+Snapshot = collections.namedtuple("Snapshot", [
+    "version", "time", "procs", "cpu_total", "mem_percent", "cost",
+])
+
+KillReport = collections.namedtuple("KillReport", ["terminated", "killed", "gone", "denied", "survivors"])
+
+def _safe(fn, default=None):
+    try:
+        return fn()
+    except (psutil.AccessDenied, NotImplementedError, AttributeError):
+        return default
+
+# --- history ---
+
+HISTORY_LEN = 120     # samples kept per process (2 minutes at the default 1 s interval)
+MAX_TRACKED = 8192    # processes with history at once, 8192 * 4 metrics * 120 * 4 bytes = 15 MB max
+FIRST_TRACKED = 256   # slots to start with (480 KB), doubled when a busy box needs more
+METRICS = ("cpu", "rss", "read_rate", "write_rate")
+SYSTEM_METRICS = ("cpu_total", "mem_percent", "read_rate", "write_rate")
+SPARK = "▁▂▃▄▅▆▇█"
+
+class History:
+    # one float32 block [slot, metric, sample] for every tracked pid plus one for the whole system,
+    # written as a ring. a pid gets a slot when it shows up and loses it some time after it exits.
+    # the block starts at `first` slots and doubles when they're all taken, never past `capacity`,
+    # so it stays about as big as the process list and the per-tick work with it
+    def __init__(self, length=HISTORY_LEN, capacity=MAX_TRACKED, first=FIRST_TRACKED):
+        self.length = length
+        self.capacity = capacity
+        first = min(first, capacity)
+        self.data = np.full((first, len(METRICS), length), np.nan, dtype=np.float32)
+        self.system = np.full((len(SYSTEM_METRICS), length), np.nan, dtype=np.float32)
+        self.times = np.full(length, np.nan)
+        self.pos = -1           # ring index of the newest sample
+        self.count = 0          # samples written so far
+        self.slots = {}         # pid -> row in data
+        self.names = {}         # pid -> name, for the export
+        self.dead = {}          # pid -> sample count when it disappeared
+        self._free = list(range(first - 1, -1, -1))
+        self._lock = threading.Lock()
+
+    def _slot(self, pid):
+        slot = self.slots.get(pid)
+        if slot is not None:
+            self.dead.pop(pid, None)  # pid came back (reuse), just keep going
+            return slot
+        if not self._free and len(self.data) < self.capacity:
+            self._grow()
+        if not self._free:
+            if not self.dead:
+                return None  # every slot is a live process, this one goes without history
+            # make room: the process that died first goes first
+            self._evict(min(self.dead, key=self.dead.get))
+        slot = self._free.pop()
+        self.data[slot] = np.nan
+        self.slots[pid] = slot
+        return slot
+
+    def _grow(self):
+        old = len(self.data)
+        new = min(old * 2, self.capacity)
+        data = np.full((new,) + self.data.shape[1:], np.nan, dtype=np.float32)
+        data[:old] = self.data
+        self.data = data
+        self._free = list(range(new - 1, old - 1, -1)) + self._free
+
+    def _evict(self, pid):
+        self._free.append(self.slots.pop(pid))
+        self.names.pop(pid, None)
+        self.dead.pop(pid, None)
+
+    def record(self, snapshot):
+        procs = snapshot.procs
+        with self._lock:
+            self.pos = (self.pos + 1) % self.length
+            self.count += 1
+            pos = self.pos
+            self.times[pos] = snapshot.time
+            # everyone without a fresh value (dead, or no slot) gets a gap in this column
+            self.data[:, :, pos] = np.nan
+
+            for pid in self.slots.keys() - procs.keys() - self.dead.keys():
+                self.dead[pid] = self.count
+            # dead ones stay until their last sample scrolled out of the ring
+            for pid in [pid for pid, died in self.dead.items() if self.count - died >= self.length]:
+                self._evict(pid)
+
+            rows, values = [], []
+            for pid, p in procs.items():
+                slot = self._slot(pid)
+                if slot is None:
+                    continue
+                self.names[pid] = p.name
+                rows.append(slot)
+                values.append((p.cpu, p.rss,
+                               np.nan if p.read_rate is None else p.read_rate,
+                               np.nan if p.write_rate is None else p.write_rate))
+            if rows:
+                self.data[rows, :, pos] = values
+            read = sum(p.read_rate for p in procs.values() if p.read_rate)
+            write = sum(p.write_rate for p in procs.values() if p.write_rate)
+            self.system[:, pos] = (snapshot.cpu_total, snapshot.mem_percent, read, write)
+
+    def _order(self, width=None):
+        # ring indexes of the last `width` samples, oldest first
+        n = min(self.count, self.length, width or self.length)
+        return (self.pos - np.arange(n)[::-1]) % self.length
+
+    def series(self, pid, metric="cpu", width=None):
+        with self._lock:
+            slot = self.slots.get(pid)
+            if slot is None or self.count == 0:
+                return np.empty(0, dtype=np.float32)
+            return self.data[slot, METRICS.index(metric), self._order(width)].copy()
+
+    def sparkline(self, pid, metric="cpu", width=16):
+        values = self.series(pid, metric, width)
+        if not len(values) or np.isnan(values).all():
+            return ""
+        if metric == "cpu":
+            low, high = 0.0, max(100.0, float(np.nanmax(values)))
+        else:
+            low, high = float(np.nanmin(values)), float(np.nanmax(values))
+        span = (high - low) or 1.0
+        out = []
+        for value in values:
+            if math.isnan(value):
+                out.append(" ")
+            else:
+                out.append(SPARK[min(len(SPARK) - 1, int((value - low) / span * len(SPARK)))])
+        return "".join(out)
+
+    def export(self, path):
+        # .npz = the raw arrays (compact, np.load gives them back), anything else = one csv row per pid per sample
+        with self._lock:
+            order = self._order()
+            pids = sorted(self.slots)
+            times = self.times[order]
+            if path.lower().endswith(".npz"):
+                np.savez_compressed(
+                    path, times=times, pids=np.array(pids, dtype=np.int64),
+                    names=np.array([self.names.get(pid, "") for pid in pids]),
+                    metrics=np.array(METRICS), data=self.data[[self.slots[pid] for pid in pids]][:, :, order],
+                    system_metrics=np.array(SYSTEM_METRICS), system=self.system[:, order])
+                return len(pids)
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(("time", "pid", "name") + METRICS + ("mem_percent",))
+                for column, stamp in zip(order, times):
+                    cpu, mem, read, write = self.system[:, column]
+                    writer.writerow([f"{stamp:.3f}", "system", "", f"{cpu:.6g}", "", f"{read:.6g}", f"{write:.6g}",
+                                     f"{mem:.6g}"])
+                    for pid in pids:
+                        values = self.data[self.slots[pid], :, column]
+                        if not np.isnan(values).all():
+                            writer.writerow([f"{stamp:.3f}", pid, self.names.get(pid, "")] +
+                                            ["" if math.isnan(v) else f"{v:.6g}" for v in values])
+            return len(pids)
+
+class ProcessSampler:
+    def __init__(self, interval=1.0):
+        self._interval = interval  # seconds, 0 = only when wake() is called
+        self.snapshot = None      # replaced (never mutated) on every tick
+        self.history = History()  # filled on this thread, read by the window and the export
+        self._procs = {}          # pid -> psutil.Process, kept so cpu_percent has a previous sample
+        self._io = {}             # pid -> (time, read_bytes, write_bytes) for the rates
+        self._users = {}          # uid -> name, pwd lookups aren't free
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._version = 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="process-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def wake(self):
+        # sample now instead of waiting for the next tick
+        self._wake.set()
+
+    @property
+    def interval(self):
+        return self._interval
+
+    @interval.setter
+    def interval(self, seconds):
+        # with 0 the loop waits for wake() without a timeout, so a new interval has to wake it
+        if seconds != self._interval:
+            self._interval = seconds
+            self.wake()
+
+    def _loop(self):
+        # the very first cpu_percent() of a process is always 0.0, so prime everything once
+        # and publish the first real numbers shortly after instead of a column of zeros
+        self.sample()
+        self._stop.wait(min(self.interval or 0.5, 0.5))
+        while not self._stop.is_set():
+            # cleared before sampling, a wake() that comes in meanwhile isn't lost
+            self._wake.clear()
+            try:
+                snapshot = self.sample()
+                self.history.record(snapshot)
+                self.snapshot = snapshot
+            except Exception as e:
+                print(f"Process sampler: {e}")
+            if self.interval > 0:
+                self._wake.wait(self.interval)
+            else:
+                self._wake.wait()
+
+    def _user(self, proc):
+        uids = _safe(proc.uids)
+        if uids is None:
+            return _safe(proc.username, "?")
+        name = self._users.get(uids.real)
+        if name is None:
+            name = self._users[uids.real] = _safe(proc.username, str(uids.real))
+        return name
+
+    def sample(self):
+        began = time.perf_counter()
+        now = time.monotonic()
+        procs = {}
+        alive = {}
+        for pid in psutil.pids():
+            proc = self._procs.get(pid)
+            try:
+                if proc is None:
+                    proc = psutil.Process(pid)
+                # one read of /proc/<pid>/stat & co for all the fields below instead of one each
+                with proc.oneshot():
+                    io = _safe(proc.io_counters)
+                    read_bytes = io.read_bytes if io else None
+                    write_bytes = io.write_bytes if io else None
+                    read_rate = write_rate = None
+                    last = self._io.get(pid)
+                    if io and last and now > last[0]:
+                        read_rate = max(read_bytes - last[1], 0) / (now - last[0])
+                        write_rate = max(write_bytes - last[2], 0) / (now - last[0])
+                    if io:
+                        self._io[pid] = (now, read_bytes, write_bytes)
+                    mem = _safe(proc.memory_info)
+                    procs[pid] = ProcInfo(
+                        pid=pid,
+                        ppid=_safe(proc.ppid, 0),
+                        name=_safe(proc.name, "?"),
+                        user=self._user(proc),
+                        status=_safe(proc.status, "?"),
+                        cpu=_safe(proc.cpu_percent, 0.0),
+                        rss=mem.rss if mem else 0,
+                        threads=_safe(proc.num_threads, 0),
+                        read_bytes=read_bytes,
+                        write_bytes=write_bytes,
+                        read_rate=read_rate,
+                        write_rate=write_rate,
+                        create_time=_safe(proc.create_time, 0.0),
+                    )
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                continue
+            alive[pid] = proc
+        # pid reuse inside one tick is rare enough to ignore, dead pids just drop out here
+        self._procs = alive
+        self._io = {pid: io for pid, io in self._io.items() if pid in alive}
+        self._version += 1
+        return Snapshot(
+            version=self._version,
+            time=time.time(),
+            procs=types.MappingProxyType(procs),
+            cpu_total=psutil.cpu_percent(interval=None),
+            mem_percent=psutil.virtual_memory().percent,
+            cost=time.perf_counter() - began,
+        )
+
+class _Node:
+    __slots__ = ("pid", "parent", "children", "cpu", "rss", "agg_cpu", "agg_rss")
+
+    def __init__(self, pid, cpu, rss):
+        self.pid = pid
+        self.parent = None      # parent _Node, None for roots (and orphans whose parent is gone)
+        self.children = set()   # child pids
+        self.cpu = cpu
+        self.rss = rss
+        self.agg_cpu = cpu      # this process + everything below it
+        self.agg_rss = rss
+
+class ProcessTree:
+    # parent/child links with per subtree cpu/rss totals. every snapshot only pushes the
+    # differences (new, gone, reparented processes and changed numbers) up the ancestor chain,
+    # nothing gets summed from scratch
+    REBUILD_EVERY = 600  # ticks, clears float drift from adding/subtracting cpu for hours
+
+    def __init__(self):
+        self.nodes = {}
+        self._ppid = {}  # pid -> ppid as last reported, the parent might not exist (yet)
+        self._ticks = 0
+
+    def _bubble(self, node, cpu, rss):
+        # add to every ancestor of node (not node itself)
+        parent = node.parent
+        steps = len(self.nodes)
+        while parent is not None and steps:
+            parent.agg_cpu += cpu
+            parent.agg_rss += rss
+            parent = parent.parent
+            steps -= 1
+
+    def _link(self, node, ppid):
+        parent = self.nodes.get(ppid) if ppid != node.pid else None
+        # a parent that is its own descendant would make a loop (pid reuse), treat it as a root
+        ancestor = parent
+        while ancestor is not None:
+            if ancestor is node:
+                parent = None
+                break
+            ancestor = ancestor.parent
+        node.parent = parent
+        if parent is not None:
+            parent.children.add(node.pid)
+
+    def _unlink(self, node):
+        if node.parent is not None:
+            node.parent.children.discard(node.pid)
+            node.parent = None
+
+    def update(self, snapshot):
+        procs = snapshot.procs
+        nodes = self.nodes
+        self._ticks += 1
+        if self._ticks % self.REBUILD_EVERY == 0:
+            self.nodes, self._ppid = {}, {}
+            nodes = self.nodes
+
+        # gone: its whole subtree leaves the ancestors' totals, the children become roots
+        for pid in nodes.keys() - procs.keys():
+            node = nodes.pop(pid)
+            del self._ppid[pid]
+            self._bubble(node, -node.agg_cpu, -node.agg_rss)
+            self._unlink(node)
+            for child in node.children:
+                if child in nodes:
+                    nodes[child].parent = None
+
+        added = [pid for pid in procs if pid not in nodes]
+        for pid in added:
+            p = procs[pid]
+            nodes[pid] = _Node(pid, p.cpu, p.rss)
+
+        for pid, p in procs.items():
+            node = nodes[pid]
+            old_ppid = self._ppid.get(pid)
+            relink = pid in added or p.ppid != old_ppid or (node.parent is None and p.ppid in nodes)
+            if relink:
+                # moved (or new, or its parent just showed up): take the subtree along
+                self._bubble(node, -node.agg_cpu, -node.agg_rss)
+                self._unlink(node)
+                self._link(node, p.ppid)
+                self._ppid[pid] = p.ppid
+                self._bubble(node, node.agg_cpu, node.agg_rss)
+            # new children of a node that arrived this tick are picked up when they link to it
+            dcpu = p.cpu - node.cpu
+            drss = p.rss - node.rss
+            if dcpu or drss:
+                node.cpu, node.rss = p.cpu, p.rss
+                node.agg_cpu += dcpu
+                node.agg_rss += drss
+                self._bubble(node, dcpu, drss)
+
+    def roots(self):
+        return [pid for pid, node in self.nodes.items() if node.parent is None]
+
+    def subtree(self, pid):
+        # pid and everything below it, children before their parents
+        order = []
+        stack = [(pid, False)]
+        while stack:
+            current, expanded = stack.pop()
+            node = self.nodes.get(current)
+            if node is None:
+                continue
+            if expanded:
+                order.append(current)
+            else:
+                stack.append((current, True))
+                stack.extend((child, False) for child in node.children)
+        return order
+
+    def ancestors(self, pid):
+        node = self.nodes.get(pid)
+        parent = node.parent if node else None
+        while parent is not None:
+            yield parent.pid
+            parent = parent.parent
+
+SORT_KEYS = {
+    "pid": lambda p: p.pid,
+    "name": lambda p: p.name.lower(),
+    "cpu": lambda p: p.cpu,
+    "mem": lambda p: p.rss,
+}
+
+# tree mode sorts siblings by the totals of their subtrees
+TREE_SORT_KEYS = {
+    "pid": lambda node: node.pid,
+    "cpu": lambda node: node.agg_cpu,
+    "mem": lambda node: node.agg_rss,
+}
+
+class ProcessView:
+    # what the table shows: filtered, sorted (or just the top N) pids of the latest snapshot.
+    # scrolling never comes through here, only new snapshots and sort/filter changes do
+    def __init__(self):
+        self.snapshot = None
+        self.rows = []          # pids in display order
+        self.sort_key = "cpu"
+        self.descending = True
+        self.top_n = None       # None = everything, N = heap-select the N biggest instead of sorting it all
+        self.tree = ProcessTree()
+        self.tree_mode = False
+        self.collapsed = set()  # pids whose children are hidden in tree mode
+        self.depth = {}         # pid -> indent level of the rows in tree mode
+        self.search = {}        # pid -> "pid name user", lowercased once when the process shows up
+        self._names = {}        # pid -> name the search line was built from
+        self._filter = ""
+        self._match = None      # callable(search string) -> bool, None = no filter
+        self._matched = None    # set of pids passing the filter, None = no filter
+
+    def update(self, snapshot):
+        procs = snapshot.procs
+        names = self._names
+        # set difference on the pids is C speed, only new and exec'd processes get a new search line
+        removed = names.keys() - procs.keys()
+        fresh = [pid for pid, p in procs.items() if names.get(pid) != p.name]
+        for pid in removed:
+            del names[pid]
+            del self.search[pid]
+        for pid in fresh:
+            p = procs[pid]
+            names[pid] = p.name
+            self.search[pid] = f"{pid} {p.name} {p.user}".lower()
+        if self._matched is not None:
+            # only new/renamed processes need a look, the rest kept their answer
+            self._matched.difference_update(removed)
+            for pid in fresh:
+                if self._match(self.search[pid]):
+                    self._matched.add(pid)
+                else:
+                    self._matched.discard(pid)
+        # kept current in list mode too, so switching to the tree is instant
+        self.tree.update(snapshot)
+        self.collapsed.intersection_update(procs.keys())
+        self.snapshot = snapshot
+        self._order()
+
+    def set_sort(self, key, descending=None):
+        if descending is None:
+            # clicking the same column again flips it
+            descending = not self.descending if key == self.sort_key else key in ("cpu", "mem")
+        self.sort_key = key
+        self.descending = descending
+        self._order()
+
+    def set_tree(self, on):
+        self.tree_mode = on
+        self._order()
+
+    def toggle(self, pid):
+        # collapse/expand in tree mode
+        if pid in self.collapsed:
+            self.collapsed.discard(pid)
+        elif self.tree.nodes.get(pid) is not None and self.tree.nodes[pid].children:
+            self.collapsed.add(pid)
+        self._order()
+
+    def set_top(self, n):
+        self.top_n = n or None
+        self._order()
+
+    def set_filter(self, text):
+        # plain text = case insensitive substring, "re:..." = regex. raises re.error for a bad regex
+        text = text.strip()
+        if not text:
+            self._filter, self._match, self._matched = "", None, None
+        elif text.lower().startswith("re:"):
+            match = re.compile(text[3:], re.IGNORECASE).search
+            self._filter, self._match = text, match
+            self._matched = {pid for pid, line in self.search.items() if match(line)}
+        else:
+            needle = text.lower()
+            previous = self._filter.lower()
+            # typing more characters only narrows it down, so re-check just the previous matches
+            narrowing = (self._matched is not None and not previous.startswith("re:") and previous in needle)
+            pool = self._matched if narrowing else self.search.keys()
+            self._filter, self._match = text, (lambda line: needle in line)
+            self._matched = {pid for pid in pool if needle in self.search[pid]}
+        self._order()
+
+    def total(self):
+        return len(self.snapshot.procs) if self.snapshot else 0
+
+    def _order(self):
+        if self.snapshot is None:
+            return
+        if self.tree_mode:
+            self.rows = self._tree_rows()
+            return
+        procs = self.snapshot.procs
+        pids = self._matched if self._matched is not None else procs.keys()
+        key = SORT_KEYS[self.sort_key]
+
+        def sort_key(pid):
+            return key(procs[pid])
+
+        if self.top_n:
+            pick = heapq.nlargest if self.descending else heapq.nsmallest
+            self.rows = pick(self.top_n, pids, key=sort_key)
+        else:
+            self.rows = sorted(pids, key=sort_key, reverse=self.descending)
+
+    def _tree_rows(self):
+        nodes = self.tree.nodes
+        procs = self.snapshot.procs
+        shown = None
+        if self._matched is not None:
+            # matches plus the path down to them
+            shown = set(self._matched)
+            for pid in self._matched:
+                shown.update(self.tree.ancestors(pid))
+        if self.sort_key in TREE_SORT_KEYS:
+            node_key = TREE_SORT_KEYS[self.sort_key]
+            key = lambda pid: node_key(nodes[pid])
+        else:
+            key = lambda pid: procs[pid].name.lower()
+
+        def ordered(pids):
+            if shown is not None:
+                pids = [pid for pid in pids if pid in shown]
+            return sorted(pids, key=key, reverse=self.descending)
+
+        rows = []
+        depth = {}
+        stack = [(pid, 0) for pid in reversed(ordered(self.tree.roots()))]
+        while stack:
+            pid, level = stack.pop()
+            rows.append(pid)
+            depth[pid] = level
+            if pid not in self.collapsed:
+                stack.extend((child, level + 1) for child in reversed(ordered(nodes[pid].children)))
+        self.depth = depth
+        return rows
+
+# --- killing ---
+
+def match_processes(snapshot, pattern):
+    # "ffmpeg" = exact name (case insensitive), "re:ffm.*" = regex on the name, "user:bob" = everything bob runs.
+    # raises re.error for a bad regex
+    pattern = pattern.strip()
+    procs = snapshot.procs.values()
+    if pattern.lower().startswith("user:"):
+        user = pattern[5:].strip().lower()
+        return [p.pid for p in procs if p.user.lower() == user]
+    if pattern.lower().startswith("re:"):
+        search = re.compile(pattern[3:], re.IGNORECASE).search
+        return [p.pid for p in procs if search(p.name)]
+    name = pattern.lower()
+    return [p.pid for p in procs if p.name.lower() == name]
+
+def terminate(pids, timeout=3.0):
+    # SIGTERM everything first, then one wait_procs over the whole set, then SIGKILL what's left.
+    # blocking for up to `timeout` + 1 s, run it off the Tk thread
+    me = os.getpid()
+    procs, gone, denied = [], [], []
+    for pid in pids:
+        if pid == me:
+            denied.append(pid)  # not killing the launcher from its own task manager
+            continue
+        try:
+            proc = psutil.Process(pid)
+            proc.terminate()
+            procs.append(proc)
+        except psutil.NoSuchProcess:
+            gone.append(pid)
+        except psutil.AccessDenied:
+            denied.append(pid)
+    terminated, alive = psutil.wait_procs(procs, timeout=timeout)
+    killed = []
+    for proc in alive:
+        try:
+            proc.kill()
+            killed.append(proc)
+        except psutil.NoSuchProcess:
+            terminated.append(proc)
+        except psutil.AccessDenied:
+            denied.append(proc.pid)
+    # SIGKILL can't be ignored, this wait is only for the kernel to reap them
+    killed, survivors = psutil.wait_procs(killed, timeout=1.0)
+    return KillReport(
+        terminated=[proc.pid for proc in terminated],
+        killed=[proc.pid for proc in killed],
+        gone=gone,
+        denied=denied,
+        survivors=[proc.pid for proc in survivors],
+    )
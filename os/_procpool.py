@@ -0,0 +1,190 @@
+# process pool for CPU-heavy commands (the ones with EXECUTION = "process" at the top)
+# a job thread in the launcher hands the command to a warm worker process, the worker streams
+# print_text/progress/sounds back over a pipe, and a crashing worker can't take the shell down
+
+import itertools, multiprocessing, os, sys, threading, time, traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from _reload import ModuleCache
+
+class ProcessRunner:
+    def __init__(self, max_workers=2, directory=None):
+        self.max_workers = max_workers
+        self.directory = directory or os.path.dirname(os.path.abspath(__file__))
+        # spawn everywhere: forking a process that has Tk and a bunch of threads going is asking for trouble
+        self._ctx = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._pool = None
+        self._manager = None
+        self._events = None
+        self._reader = None
+        self._routes = {}
+        self._ids = itertools.count(1)
+
+    def _ensure_pool(self):
+        with self._lock:
+            if self._pool is None:
+                if self._events is None:
+                    self._events = self._ctx.Queue()
+                    self._reader = threading.Thread(target=self._read_events, name="procpool-events", daemon=True)
+                    self._reader.start()
+                if self._manager is None:
+                    # Manager events can be passed to already running workers, plain ones can't
+                    self._manager = self._ctx.Manager()
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self._ctx,
+                                                 initializer=_init_worker,
+                                                 initargs=(self._events, self.directory))
+            return self._pool
+
+    def _reset_pool(self, pool):
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _read_events(self):
+        while True:
+            key, kind, payload = self._events.get()
+            if kind == "sound":
+                import _sound
+                _sound.play(payload)
+                continue
+            route = self._routes.get(key)
+            if route is None:
+                continue
+            app, finished = route[0], route[1]
+            try:
+                if kind == "text":
+                    app.print_text(*payload)
+                elif kind == "progress":
+                    progress = getattr(app, 'progress', None)
+                    if progress:
+                        progress(*payload)
+                elif kind == "done":
+                    route.append(payload)
+                    finished.set()
+            except Exception:
+                traceback.print_exc()
+
+    def run(self, app, module_name, args):
+        # blocking - call it from a job thread. returns (ok, cpu_seconds, rss_growth) of the worker
+        pool = self._ensure_pool()
+        key = next(self._ids)
+        finished = threading.Event()
+        route = [app, finished]
+        self._routes[key] = route
+        cancel_event = self._manager.Event()
+        cancelled = getattr(app, 'cancelled', lambda: False)
+        try:
+            future = pool.submit(_run_in_worker, key, module_name, list(args), cancel_event)
+            while not finished.wait(0.2):
+                if cancelled() and not cancel_event.is_set():
+                    cancel_event.set()
+                if future.done() and future.exception() is not None:
+                    raise future.exception()
+            return route[2]
+        except BrokenProcessPool:
+            app.print_text(f"'{module_name}' crashed its worker process, the pool was restarted.\n", 'error')
+            import _sound
+            _sound.nuh_uh()
+            self._reset_pool(pool)
+            return False, None, None
+        finally:
+            self._routes.pop(key, None)
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+            manager, self._manager = self._manager, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        if manager is not None:
+            manager.shutdown()
+
+# --- worker side ---
+
+_events = None
+_modules = None
+
+class _WorkerApp:
+    # what runarg(app, args) sees inside the worker
+    def __init__(self, key, cancel_event):
+        self._key = key
+        self._cancel_event = cancel_event
+        self._last_progress = 0.0
+
+    def print_text(self, text, tag='normal'):
+        _events.put((self._key, "text", (text, tag)))
+
+    def progress(self, done, total=None, note=None):
+        # don't flood the pipe, ~10 updates a second is plenty for /jobs
+        now = time.monotonic()
+        if now - self._last_progress >= 0.1 or (total and done >= total):
+            self._last_progress = now
+            _events.put((self._key, "progress", (done, total, note)))
+
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+class _ForwardedSound:
+    enabled = True
+
+    def play(self, name):
+        _events.put((None, "sound", name))
+
+    def close(self):
+        pass
+
+def _init_worker(events, directory):
+    global _events, _modules
+    _events = events
+    # same mtime check as the launcher, so an edited script is picked up by warm workers too
+    _modules = ModuleCache(directory)
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    # sounds get played by the launcher, workers never open the audio device
+    import _sound
+    _sound.set_service(_ForwardedSound())
+
+def _run_in_worker(key, module_name, args, cancel_event):
+    from _sound import nuh_uh
+    # a worker runs one command at a time, so its own peak is this command's alone
+    # (in the launcher process concurrent jobs share one, see _stats.py)
+    try:
+        import psutil
+        from _stats import _rss_and_peak
+        proc = psutil.Process()
+        rss_before, peak_before = _rss_and_peak(proc)
+    except ImportError:
+        proc = None
+    cpu_before = time.process_time()
+    app = _WorkerApp(key, cancel_event)
+    ok = True
+    try:
+        # imported once per worker, every later run of the same command is warm (until the file changes)
+        module = _modules.load(module_name)
+        if hasattr(module, 'runarg'):
+            module.runarg(app, args)
+        elif hasattr(module, 'run'):
+            module.run(app)
+        else:
+            app.print_text(f"No `run()` or `runarg()` in '{module_name}'.\n", 'error')
+            nuh_uh()
+            ok = False
+    except ImportError as e:
+        app.print_text(f"Import error: {e}\n", 'error')
+        nuh_uh()
+        ok = False
+    except Exception as e:
+        app.print_text(f"Error running command '{module_name}': {e}\n", 'error')
+        traceback.print_exc()
+        nuh_uh()
+        ok = False
+    cpu = time.process_time() - cpu_before
+    rss = None
+    if proc is not None:
+        rss_after, peak_after = _rss_and_peak(proc)
+        rss = max(peak_after - peak_before, rss_after - rss_before, 0)
+    # last message for this key - everything it printed is already ahead of it in the queue
+    _events.put((key, "done", (ok, cpu, rss)))
+    return ok
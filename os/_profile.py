@@ -0,0 +1,240 @@
+# startup profiler - where does cold start time go?
+#
+#   python launcher.py --profile-startup               profile this run, /profile imports shows it
+#   python launcher.py --profile-startup --profile-exit   quit after first paint (what /profile startup runs)
+#
+# records nested spans for every module import (so cv2 -> numpy shows up as cv2's child) and for the
+# launcher phases, then writes a text report and a Chrome trace (load it in chrome://tracing or Perfetto)
+
+import contextlib, json, os, sys, threading, time
+
+REPORT_NAME = "startup_profile.txt"
+TRACE_NAME = "startup_profile.json"
+SORT_KEYS = ("cumulative", "self", "start")
+
+class Span:
+    __slots__ = ("name", "category", "start", "end", "depth", "thread", "children")
+
+    def __init__(self, name, category, start, depth, thread):
+        self.name = name
+        self.category = category
+        self.start = start
+        self.end = None
+        self.depth = depth
+        self.thread = thread
+        self.children = 0.0  # time spent in direct child spans
+
+    @property
+    def duration(self):
+        return (self.end or time.perf_counter()) - self.start
+
+    @property
+    def self_time(self):
+        return max(self.duration - self.children, 0.0)
+
+class StartupProfiler:
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.spans = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._finder = None
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def begin(self, name, category):
+        stack = self._stack()
+        span = Span(name, category, time.perf_counter(), len(stack), threading.get_ident())
+        stack.append(span)
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def end(self, span):
+        span.end = time.perf_counter()
+        stack = self._stack()
+        if stack and stack[-1] is span:
+            stack.pop()
+        if stack:
+            stack[-1].children += span.duration
+
+    @contextlib.contextmanager
+    def span(self, name, category="phase"):
+        span = self.begin(name, category)
+        try:
+            yield span
+        finally:
+            self.end(span)
+
+    def mark(self, name):
+        # zero length marker, e.g. "first paint"
+        span = self.begin(name, "mark")
+        self.end(span)
+
+    # --- import hook ---
+
+    def install(self):
+        if self._finder is None:
+            self._finder = _TimingFinder(self)
+            sys.meta_path.insert(0, self._finder)
+
+    def uninstall(self):
+        if self._finder is not None and self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+        self._finder = None
+
+    # --- output ---
+
+    def rows(self, sort="cumulative"):
+        with self._lock:
+            spans = [span for span in self.spans if span.end is not None]
+        if sort == "self":
+            spans.sort(key=lambda s: s.self_time, reverse=True)
+        elif sort == "start":
+            spans.sort(key=lambda s: s.start)
+        else:
+            spans.sort(key=lambda s: s.duration, reverse=True)
+        return spans
+
+    def total(self):
+        with self._lock:
+            ends = [span.end for span in self.spans if span.end is not None]
+        return (max(ends) - self.origin) if ends else 0.0
+
+    def format_report(self, sort="cumulative", limit=None):
+        spans = self.rows(sort)
+        if limit:
+            spans = spans[:limit]
+        lines = [f"startup: {self.total() * 1000:.1f} ms total, sorted by {sort}",
+                 f"{'start':>10} {'cumul':>10} {'self':>10}  kind    name"]
+        for span in spans:
+            indent = "  " * span.depth if sort == "start" else ""
+            lines.append(f"{(span.start - self.origin) * 1000:8.1f}ms {span.duration * 1000:8.1f}ms "
+                         f"{span.self_time * 1000:8.1f}ms  {span.category:<7} {indent}{span.name}")
+        return "\n".join(lines) + "\n"
+
+    def chrome_trace(self):
+        pid = os.getpid()
+        events = []
+        for span in self.rows("start"):
+            events.append({
+                "name": span.name,
+                "cat": span.category,
+                "ph": "i" if span.category == "mark" else "X",
+                "ts": (span.start - self.origin) * 1e6,
+                "dur": span.duration * 1e6,
+                "pid": pid,
+                "tid": span.thread,
+                "s": "g",
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save(self, directory, sort="cumulative"):
+        report_path = os.path.join(directory, REPORT_NAME)
+        trace_path = os.path.join(directory, TRACE_NAME)
+        with open(report_path, "w", encoding="utf-8") as f:
+            f.write(self.format_report(sort))
+        with open(trace_path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+        return report_path, trace_path
+
+class _TimingFinder:
+    # sits first on sys.meta_path, lets the real finders do the work and then times the loader's
+    # create_module + exec_module. for extension modules create_module is the dlopen and init, often
+    # most of the cost, so one span runs from the start of create_module to the end of exec_module
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self._busy = threading.local()
+
+    def find_spec(self, fullname, path=None, target=None):
+        if getattr(self._busy, "active", False):
+            return None
+        self._busy.active = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._busy.active = False
+
+        loader = spec.loader
+        exec_module = getattr(loader, "exec_module", None)
+        attrs = getattr(loader, "__dict__", None)
+        # builtin/frozen importers are shared classes, only wrap real per-module loader instances
+        if exec_module is None or isinstance(loader, type) or attrs is None or "exec_module" in attrs:
+            return spec
+
+        profiler = self.profiler
+        create_module = getattr(loader, "create_module", None)
+        started = []  # the span create_module opened, exec_module closes it
+
+        def timed_create_module(spec):
+            span = profiler.begin(fullname, "import")
+            try:
+                module = create_module(spec)
+            except BaseException:
+                profiler.end(span)
+                raise
+            started.append(span)
+            return module
+
+        def timed_exec_module(module):
+            span = started.pop() if started else profiler.begin(fullname, "import")
+            try:
+                exec_module(module)
+            finally:
+                profiler.end(span)
+
+        if create_module is not None and "create_module" not in attrs:
+            loader.create_module = timed_create_module
+        loader.exec_module = timed_exec_module
+        return spec
+
+_active = None
+
+def start():
+    global _active
+    if _active is None:
+        _active = StartupProfiler()
+        _active.install()
+    return _active
+
+def active():
+    return _active
+
+def span(name, category="phase"):
+    # no-op unless the launcher was started with --profile-startup
+    if _active is None:
+        return contextlib.nullcontext()
+    return _active.span(name, category)
+
+def mark(name):
+    if _active is not None:
+        _active.mark(name)
+
+def profile_cold_start(sort="cumulative", timeout=120):
+    # start a fresh launcher that quits after its first paint, return its report
+    import subprocess
+    directory = os.path.dirname(os.path.abspath(__file__))
+    if getattr(sys, 'frozen', False):
+        cmd = [sys.executable]
+        directory = os.path.dirname(sys.executable)
+    else:
+        cmd = [sys.executable, os.path.join(directory, "launcher.py")]
+    cmd += ["--profile-startup", "--profile-exit", "--profile-sort", sort]
+    began = time.perf_counter()
+    subprocess.run(cmd, check=True, timeout=timeout, stdin=subprocess.DEVNULL,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    wall = time.perf_counter() - began
+    with open(os.path.join(directory, REPORT_NAME), "r", encoding="utf-8") as f:
+        report = f.read()
+    return report, wall, os.path.join(directory, REPORT_NAME), os.path.join(directory, TRACE_NAME)
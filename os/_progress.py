@@ -0,0 +1,83 @@
+# live numbers for the long commands (/compress, /decompress): bytes done, current and average MB/s,
+# ETA and the ratio so far. they go into the job's progress note (/jobs shows it) a few times a
+# second, and every PRINT_EVERY seconds as a line in the shell, so a 20 GB file doesn't look hung.
+#
+# a Meter is a drop-in for the progress(done, total) callbacks the commands already take.
+
+import os, time
+
+NOTE_EVERY = 0.25   # progress notes cross a pipe from the worker process, no point doing more
+PRINT_EVERY = 5.0
+SMOOTHING = 0.3     # weight of the latest interval in the current rate
+
+def _mb(n):
+    return f"{n / 1e6:,.1f}"
+
+def _clock(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds // 60 % 60:02}:{seconds % 60:02}"
+    return f"{seconds // 60:02}:{seconds % 60:02}"
+
+class Meter:
+    def __init__(self, app, label, total=None, ratio=None):
+        # ratio(done) -> the output/input ratio so far, None when there's nothing to say
+        self.app = app
+        self.label = label
+        self.total = total
+        self.ratio = ratio
+        self.done = 0
+        self.start = time.monotonic()
+        self._progress = getattr(app, 'progress', None)  # only there when running as a launcher job
+        self._last = self.start
+        self._last_done = 0
+        self._last_print = self.start
+        self._rate = None
+
+    def __call__(self, done, total=None):
+        self.done = done
+        if total:
+            self.total = total
+        now = time.monotonic()
+        finished = bool(self.total) and done >= self.total
+        if now - self._last < NOTE_EVERY and not finished:
+            return
+        if now - self._last >= NOTE_EVERY:  # the forced last update can be a few ms after the one before
+            rate = (done - self._last_done) / 1e6 / (now - self._last)
+            self._rate = rate if self._rate is None else SMOOTHING * rate + (1 - SMOOTHING) * self._rate
+        self._last, self._last_done = now, done
+        note = self.describe(now)
+        if self._progress:
+            self._progress(done, self.total, note)
+        if now - self._last_print >= PRINT_EVERY and not finished:
+            self._last_print = now
+            percent = f" {done / self.total:.1%}" if self.total else ""
+            self.app.print_text(f"{self.label}{percent}: {note}\n", 'info')
+
+    def average(self, now=None):
+        return self.done / 1e6 / max((now or time.monotonic()) - self.start, 1e-9)
+
+    def describe(self, now=None):
+        now = now or time.monotonic()
+        average = self.average(now)
+        parts = [f"{_mb(self.done)}/{_mb(self.total)} MB" if self.total else f"{_mb(self.done)} MB",
+                 f"{self._rate or 0:.1f} MB/s now, {average:.1f} avg"]
+        speed = self._rate or average
+        if self.total and speed > 0:
+            parts.append(f"ETA {_clock(max(self.total - self.done, 0) / 1e6 / speed)}")
+        ratio = self.ratio(self.done) if self.ratio and self.done else None
+        if ratio is not None:
+            parts.append(f"ratio {ratio:.1%}")
+        return ", ".join(parts)
+
+    def summary(self):
+        # for the final message
+        elapsed = time.monotonic() - self.start
+        return f"{_mb(self.done)} MB in {elapsed:.2f}s, {self.average():.1f} MB/s"
+
+def discard(path):
+    # partial output of a cancelled or failed run, gone if it's there
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,242 @@
+# command registry - figures out what every script in this folder offers WITHOUT importing it
+# (importing means pygame.mixer.init(), cv2, taichi, ... which is what made startup slow)
+
+import ast, importlib, json, os, sys, threading, time
+from _reload import ModuleCache
+
+MANIFEST_NAME = ".command_manifest.json"
+MANIFEST_VERSION = 3
+
+# files that live next to the commands but aren't commands
+EXCLUDED = ("launcher.py", "config.py")
+
+# third party stuff that is slow to import, the idle prefetcher warms these up
+HEAVY_MODULES = ("cv2", "numpy", "taichi", "pyopencl", "zstandard", "PIL", "pygame", "psutil")
+
+IDLE_SECONDS = 2.0
+
+# where a command runs: the Tk thread, a job thread, or a warm worker process
+EXECUTION_POLICIES = ("main", "thread", "process")
+
+def base_dir():
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.abspath(__file__))
+
+def _usage_from_tree(tree):
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            text = node.value.strip()
+        elif isinstance(node, ast.JoinedStr):
+            text = "".join(v.value for v in node.values
+                           if isinstance(v, ast.Constant) and isinstance(v.value, str)).strip()
+        else:
+            continue
+        if text.startswith("Usage:"):
+            return text[len("Usage:"):].strip()
+    return None
+
+def _imports_from_tree(tree):
+    names = set()
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                names.add(alias.name.split(".")[0])
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split(".")[0])
+    return names
+
+def _uses_display(tree):
+    # pygame.display windows have to stay on the main thread just like tkinter ones
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Attribute) and node.attr == "display"
+                and isinstance(node.value, ast.Name) and node.value.id == "pygame"):
+            return True
+    return False
+
+def _execution_from_tree(tree):
+    # a module can ask for its own policy with a top level EXECUTION = "process" / "thread" / "main"
+    for node in tree.body:
+        if (isinstance(node, ast.Assign) and len(node.targets) == 1
+                and isinstance(node.targets[0], ast.Name) and node.targets[0].id == "EXECUTION"
+                and isinstance(node.value, ast.Constant) and node.value.value in EXECUTION_POLICIES):
+            return node.value.value
+    return None
+
+def scan_file(path):
+    with open(path, "r", encoding="utf-8") as f:
+        source = f.read()
+    tree = ast.parse(source, filename=path)
+
+    functions = {node.name for node in tree.body if isinstance(node, ast.FunctionDef)}
+    # same priority as the launcher used to have: runarg wins over run
+    if "runarg" in functions:
+        entry = "runarg"
+    elif "run" in functions:
+        entry = "run"
+    else:
+        entry = None
+
+    imports = _imports_from_tree(tree)
+    main_thread = "tkinter" in imports or _uses_display(tree)
+    execution = "main" if main_thread else (_execution_from_tree(tree) or "thread")
+    return {
+        "entry": entry,
+        "usage": _usage_from_tree(tree),
+        "heavy": sorted(m for m in imports if m in HEAVY_MODULES),
+        "main_thread": execution == "main",
+        "execution": execution,
+    }
+
+class CommandRegistry:
+    def __init__(self, directory=None):
+        self.directory = directory or base_dir()
+        self.manifest_path = os.path.join(self.directory, MANIFEST_NAME)
+        self.entries = {}
+        self._lock = threading.Lock()
+        self._last_activity = time.monotonic()
+        self._prefetcher = None
+        self.modules = ModuleCache(self.directory)
+        # the launcher imports config itself, stamp it here so live edits to presets get noticed
+        self.modules.load("config")
+
+    # --- manifest ---
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != MANIFEST_VERSION:
+            return {}
+        return data.get("commands", {})
+
+    def _save_manifest(self):
+        data = {"version": MANIFEST_VERSION, "commands": self.entries}
+        tmp = self.manifest_path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=1, sort_keys=True)
+            os.replace(tmp, self.manifest_path)
+        except OSError as e:
+            # read-only install, just rebuild next time
+            print(f"Could not save command manifest: {e}")
+
+    def refresh(self):
+        cached = self._load_manifest()
+        entries = {}
+        dirty = False
+
+        with os.scandir(self.directory) as it:
+            for dirent in it:
+                filename = dirent.name
+                if not filename.endswith(".py") or filename.lower() in EXCLUDED or filename.startswith("_"):
+                    continue
+                if not dirent.is_file():
+                    continue
+                st = dirent.stat()
+                name = filename[:-3].lower()  # store lowercase keys
+                old = cached.get(name)
+                if old and old.get("mtime_ns") == st.st_mtime_ns and old.get("size") == st.st_size:
+                    entries[name] = old
+                    continue
+
+                try:
+                    info = scan_file(dirent.path)
+                except (OSError, SyntaxError, ValueError) as e:
+                    # still list it, the import error will show up when someone runs it
+                    print(f"Could not scan {filename}: {e}")
+                    info = {"entry": None, "usage": None, "heavy": [], "main_thread": True, "execution": "main"}
+                info.update(module=filename[:-3], mtime_ns=st.st_mtime_ns, size=st.st_size)
+                entries[name] = info
+                dirty = True
+
+        if set(entries) != set(cached):
+            dirty = True
+
+        with self._lock:
+            self.entries = entries
+        if dirty:
+            self._save_manifest()
+        return self
+
+    # --- lookups (never import anything) ---
+
+    def __contains__(self, name):
+        return name.lower() in self.entries
+
+    def names(self):
+        return list(self.entries.keys())
+
+    def get(self, name):
+        return self.entries.get(name.lower())
+
+    def module_name(self, name):
+        entry = self.get(name)
+        return entry["module"] if entry else None
+
+    def usage(self, name):
+        entry = self.get(name)
+        return entry.get("usage") if entry else None
+
+    def main_thread(self, name):
+        # GUI scripts can't run as background jobs
+        entry = self.get(name)
+        return entry.get("main_thread", True) if entry else True
+
+    def execution(self, name):
+        entry = self.get(name)
+        return entry.get("execution", "main") if entry else "main"
+
+    def stale(self, name):
+        # the script was edited (or removed) since the manifest entry was made
+        entry = self.get(name)
+        if entry is None:
+            return False
+        try:
+            st = os.stat(os.path.join(self.directory, entry["module"] + ".py"))
+        except OSError:
+            return True
+        return entry.get("mtime_ns") != st.st_mtime_ns or entry.get("size") != st.st_size
+
+    # --- loading ---
+
+    def load(self, name, force=False):
+        # reloads the module first if its source (or a config/script it imports) changed
+        self.note_activity()
+        return self.modules.load(self.module_name(name), force=force)
+
+    # --- idle prefetch of heavy dependencies ---
+
+    def note_activity(self):
+        self._last_activity = time.monotonic()
+
+    def pending_heavy(self):
+        wanted = set()
+        for entry in self.entries.values():
+            wanted.update(entry.get("heavy", ()))
+        return sorted(m for m in wanted if m not in sys.modules)
+
+    def start_prefetch(self, idle_seconds=IDLE_SECONDS):
+        if self._prefetcher is not None:
+            return
+        self._prefetcher = threading.Thread(target=self._prefetch, args=(idle_seconds,),
+                                            name="command-prefetch", daemon=True)
+        self._prefetcher.start()
+
+    def _prefetch(self, idle_seconds):
+        for module in self.pending_heavy():
+            # only warm things up while nobody is typing commands
+            while True:
+                idle_for = time.monotonic() - self._last_activity
+                if idle_for >= idle_seconds:
+                    break
+                time.sleep(idle_seconds - idle_for)
+            if module in sys.modules:
+                continue
+            try:
+                importlib.import_module(module)
+            except Exception:
+                # missing optional dependency, the command will report it when run
+                pass
@@ -0,0 +1,132 @@
+# hot reload for command modules - edit compress.py (or config.py) while the launcher is running
+# and the next run picks it up, no restart, scrollback stays.
+#
+# every module loaded through here gets its file stamped (mtime_ns + size). on dispatch the stamp
+# is checked again and only what changed is reloaded, plus whatever imports it from this folder
+# (a `from config import PRESETS` copy would otherwise keep the old value).
+#
+# a module can keep warm state across reloads by listing global names in RELOAD_KEEP, e.g.
+#   RELOAD_KEEP = ("_ti_ready",)   # ti.init() only once per process
+# those globals are put back after the module body ran again.
+
+import ast, importlib, os, sys, threading
+
+# infrastructure, reloading these would orphan their threads/singletons
+NOT_RELOADABLE = ("launcher",)
+
+def _local_imports(path):
+    # top level imports only - imports inside functions look the module up again on every call anyway
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=path)
+    except (OSError, SyntaxError, ValueError):
+        return set()
+    names = set()
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split(".")[0])
+    return names
+
+class ModuleCache:
+    def __init__(self, directory):
+        self.directory = directory
+        self._stamps = {}  # module name -> (mtime_ns, size) of the source it was loaded from
+        self._deps = {}    # module name -> modules from this folder it imports at the top
+        self._lock = threading.RLock()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name + ".py")
+
+    def _stamp(self, name):
+        try:
+            st = os.stat(self._path(name))
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def reloadable(self, name):
+        return not name.startswith("_") and name not in NOT_RELOADABLE and os.path.isfile(self._path(name))
+
+    def _track(self, name, stamp=None):
+        # remember what we just imported (and the local modules it pulled in)
+        self._stamps[name] = stamp or self._stamp(name)
+        deps = [dep for dep in _local_imports(self._path(name)) if dep != name and self.reloadable(dep)]
+        self._deps[name] = deps
+        for dep in deps:
+            if dep not in self._stamps and dep in sys.modules:
+                self._track(dep)
+
+    def load(self, name, force=False):
+        with self._lock:
+            if name in sys.modules and name in self._stamps:
+                self._refresh(name, {}, force)
+                return sys.modules[name]
+            stamp = self._stamp(name)
+            module = importlib.import_module(name)
+            if self.reloadable(name):
+                self._track(name, stamp)
+            return module
+
+    def changed(self):
+        # loaded modules whose source is different from what is running
+        with self._lock:
+            return sorted(name for name, stamp in self._stamps.items()
+                          if name in sys.modules and self._stamp(name) != stamp)
+
+    def reload_changed(self, names=None, force=False):
+        # returns the modules that were actually reloaded, in reload order. whatever imports a
+        # reloaded module gets reloaded too, even when it isn't in `names` - after
+        # reload_changed(["config"]) a module that did `from config import X` would otherwise
+        # never see config as changed again and keep the old X
+        with self._lock:
+            seen = {}
+            reloaded = []
+            for name in (names if names is not None else list(self._stamps)):
+                if name in sys.modules and name in self._stamps:
+                    self._refresh(name, seen, force, reloaded)
+            for name in self._dependents(reloaded):
+                if name in sys.modules and name in self._stamps:
+                    self._refresh(name, seen, False, reloaded)  # its deps go first, seen has them already
+            return reloaded
+
+    def _dependents(self, names):
+        # loaded modules importing any of `names`, directly or through each other
+        found = set()
+        todo = list(names)
+        while todo:
+            name = todo.pop()
+            for other, deps in self._deps.items():
+                if name in deps and other not in found and other not in names:
+                    found.add(other)
+                    todo.append(other)
+        return sorted(found)
+
+    def _refresh(self, name, seen, force=False, reloaded=None):
+        # True when `name` got reloaded, because it changed or something it imports did
+        if name in seen:
+            return seen[name]
+        seen[name] = False
+        deps_reloaded = False
+        for dep in self._deps.get(name, ()):
+            if dep in sys.modules and dep in self._stamps and self._refresh(dep, seen, False, reloaded):
+                deps_reloaded = True
+        stamp = self._stamp(name)
+        if force or deps_reloaded or stamp != self._stamps.get(name):
+            self._reload(sys.modules[name], stamp)
+            seen[name] = True
+            if reloaded is not None:
+                reloaded.append(name)
+        return seen[name]
+
+    def _reload(self, module, stamp):
+        name = module.__name__
+        keep = getattr(module, "RELOAD_KEEP", ())
+        saved = {attr: module.__dict__[attr] for attr in keep if attr in module.__dict__}
+        try:
+            importlib.reload(module)
+        finally:
+            # also on a failed reload, half a module body ran and may have reset them
+            module.__dict__.update(saved)
+        self._track(name, stamp)
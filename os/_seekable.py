@@ -0,0 +1,162 @@
+# zstd seekable format (contrib/seekable_format in the zstd repo): the data is cut into independent
+# frames and a seek table with every frame's sizes (and checksum) goes into a skippable frame at the
+# end. readers can jump straight to the frame holding an offset, and plain zstd decoders just skip
+# the table, so a seekable .zst still decompresses with any zstd tool.
+#
+#   [frame 0][frame 1]...[frame n-1][skippable frame: entries..., footer]
+#   entry  = compressed size (u32 le), decompressed size (u32 le), [xxh64 low 32 bits (u32 le)]
+#   footer = number of frames (u32 le), descriptor (u8, bit 7 = checksums present), magic 0x8F92EAB1
+
+import bisect, os, struct
+import zstandard as zstd
+
+SKIPPABLE_MAGIC = 0x184D2A5E
+SEEKABLE_MAGIC = 0x8F92EAB1
+FOOTER_SIZE = 9
+CHECKSUM_FLAG = 0x80
+
+DEFAULT_FRAME_SIZE = 4 << 20
+MAX_FRAME_SIZE = 1 << 30  # sizes have to fit the table's u32 fields, and a frame is held in memory
+
+class SeekTable:
+    def __init__(self, checksums=True):
+        self.checksums = checksums
+        self.frames = []         # (compressed size, decompressed size, checksum or None)
+        self.c_offsets = [0]     # where frame i starts in the file / in the decompressed data
+        self.d_offsets = [0]
+
+    def add(self, c_size, d_size, checksum=None):
+        self.frames.append((c_size, d_size, checksum))
+        self.c_offsets.append(self.c_offsets[-1] + c_size)
+        self.d_offsets.append(self.d_offsets[-1] + d_size)
+
+    def __len__(self):
+        return len(self.frames)
+
+    @property
+    def compressed_size(self):
+        return self.c_offsets[-1]
+
+    @property
+    def decompressed_size(self):
+        return self.d_offsets[-1]
+
+    def frame_for(self, offset):
+        # index of the frame holding decompressed byte `offset`
+        return max(0, bisect.bisect_right(self.d_offsets, offset) - 1)
+
+    def to_bytes(self):
+        entry = "<III" if self.checksums else "<II"
+        body = bytearray()
+        for c_size, d_size, checksum in self.frames:
+            if self.checksums:
+                body += struct.pack(entry, c_size, d_size, checksum or 0)
+            else:
+                body += struct.pack(entry, c_size, d_size)
+        body += struct.pack("<IBI", len(self.frames), CHECKSUM_FLAG if self.checksums else 0, SEEKABLE_MAGIC)
+        return struct.pack("<II", SKIPPABLE_MAGIC, len(body)) + bytes(body)
+
+    @classmethod
+    def read(cls, f, end=None):
+        # the table at the end of an open binary file (or ending at `end`, when something else
+        # follows it), None when the file isn't in the seekable format
+        if end is None:
+            end = f.seek(0, os.SEEK_END)
+        size = end
+        if size < FOOTER_SIZE + 8:
+            return None
+        f.seek(size - FOOTER_SIZE)
+        count, descriptor, magic = struct.unpack("<IBI", f.read(FOOTER_SIZE))
+        if magic != SEEKABLE_MAGIC or descriptor & 0x7C:  # reserved bits have to be zero
+            return None
+        checksums = bool(descriptor & CHECKSUM_FLAG)
+        entry_size = 12 if checksums else 8
+        table_size = count * entry_size + FOOTER_SIZE
+        if size < table_size + 8:
+            return None
+        f.seek(size - table_size - 8)
+        magic, frame_size = struct.unpack("<II", f.read(8))
+        if magic != SKIPPABLE_MAGIC or frame_size != table_size:
+            return None
+        raw = f.read(count * entry_size)
+        table = cls(checksums)
+        for i in range(count):
+            fields = struct.unpack_from("<III" if checksums else "<II", raw, i * entry_size)
+            table.add(fields[0], fields[1], fields[2] if checksums else None)
+        if table.compressed_size + table_size + 8 != size:
+            return None
+        return table
+
+def frame_checksum(frame):
+    # a frame written with write_checksum=True ends in the low 32 bits of the content's xxh64,
+    # which is exactly what the seek table stores
+    return struct.unpack("<I", frame[-4:])[0]
+
+def parse_size(text):
+    # "4M", "512K", "1048576"
+    text = text.strip().upper().rstrip("B")
+    scale = 1
+    if text and text[-1] in "KMG":
+        scale = 1 << (10 * ("KMG".index(text[-1]) + 1))
+        text = text[:-1]
+    return int(float(text) * scale)
+
+def read_range(f, table, dctx, start, end):
+    # yields the decompressed bytes [start, end), touching only the frames that overlap it
+    end = min(end, table.decompressed_size)
+    if start >= end:
+        return
+    index = table.frame_for(start)
+    while index < len(table) and table.d_offsets[index] < end:
+        c_size, d_size, checksum = table.frames[index]
+        f.seek(table.c_offsets[index])
+        data = dctx.decompress(f.read(c_size), max_output_size=d_size)
+        lo = max(start - table.d_offsets[index], 0)
+        hi = min(end - table.d_offsets[index], d_size)
+        yield data[lo:hi] if (lo, hi) != (0, d_size) else data
+        index += 1
+
+ZSTD_MAGIC = 0xFD2FB528
+SKIPPABLE_MAGIC_BASE = 0x184D2A50  # skippable frames use 0x184D2A50-0x184D2A5F
+
+def scan_frames(f):
+    # walks frame and block headers (no decompression) to find where every zstd frame is: a list of
+    # (offset, compressed size, decompressed size or None when the header doesn't say), skippable
+    # frames left out. None when the file isn't whole frames end to end, a cut off download or an
+    # interrupted write fails here
+    size = f.seek(0, os.SEEK_END)
+    frames = []
+    position = 0
+    while position < size:
+        f.seek(position)
+        head = f.read(18)
+        if len(head) < 8:
+            return None
+        magic = struct.unpack_from("<I", head)[0]
+        if magic & 0xFFFFFFF0 == SKIPPABLE_MAGIC_BASE:  # skippable frame (seek table, member index, ...)
+            position += 8 + struct.unpack_from("<I", head, 4)[0]
+            continue
+        if magic != ZSTD_MAGIC:
+            return None
+        try:
+            params = zstd.get_frame_parameters(head)
+            start, position = position, position + zstd.frame_header_size(head)
+        except zstd.ZstdError:
+            return None
+        while True:
+            f.seek(position)
+            block = f.read(3)
+            if len(block) < 3:
+                return None
+            header = int.from_bytes(block, "little")
+            kind = (header >> 1) & 3
+            if kind == 3:  # reserved block type
+                return None
+            position += 3 + (1 if kind == 1 else header >> 3)  # rle blocks store one byte
+            if header & 1:
+                break
+        if params.has_checksum:
+            position += 4
+        known = params.content_size != zstd.CONTENTSIZE_UNKNOWN  # streamed without a size
+        frames.append((start, position - start, params.content_size if known else None))
+    return frames if position == size else None
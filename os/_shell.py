@@ -0,0 +1,402 @@
+# command dispatch shared by the Tk launcher (MiniCMD) and the headless batch runner
+# a front end mixes in CommandShell and provides:
+#   print_text(text, tag), clear_output(), apply_preset(name), set_scrollback(args),
+#   wait_for_job(job), request_exit()
+# plus self.commands (a CommandRegistry), self.jobs (a JobScheduler or None), self.stats (a StatsRecorder),
+# self.processes (a ProcessRunner or None) and self.colors
+
+import config, os, platform, traceback, _pipeline, _profile
+from _sound import ding, nuh_uh
+
+BUILTINS = ["info", "jobs", "kill <id>", "wait <id>", "scrollback <lines>", "stats [reset | export <file>]",
+            "profile startup|imports [sort]", "reload [command]", "cmd [args] | cmd [args]", "help", "exit", "clear"]
+
+# what run_builtin handles ("preset" only with exactly one argument)
+BUILTIN_COMMANDS = ("exit", "jobs", "kill", "wait", "calculator", "help", "info", "preset", "clear", "scrollback",
+                    "taskmanager", "stats", "profile", "reload")
+
+class CommandShell:
+    has_display = True
+
+    def execute(self, cmd):
+        # returns False when the command failed (for background jobs: failed to start)
+        if not cmd.startswith(config.COMMAND_PREFIX):
+            self.print_text(f"Use prefix '{config.COMMAND_PREFIX}'\n", 'error')
+            nuh_uh()
+            return False
+
+        if _pipeline.is_pipeline(cmd):
+            return self.run_pipeline(cmd)
+
+        parts = cmd[len(config.COMMAND_PREFIX):].split()
+        if not parts:
+            return True
+
+        command = parts[0].lower()
+        args = parts[1:]
+
+        # presets get patched live, pick up an edited config.py before anything reads it
+        self.reload_modules(["config"], quiet=True)
+
+        if self.is_builtin(command, args):
+            # measured only once something actually runs, recorded even when it raises
+            with self.stats.measure(command) as sample:
+                sample.ok = self.run_builtin(command, args)
+            return sample.ok
+
+        if command not in self.commands or self.commands.stale(command):
+            # new or edited script, rescan so usage/execution policy are current
+            self.commands.refresh()
+        if command in self.commands:
+            # here was supposed to be a ding() function tho if the script errors inside itself the ding will play but the error will appear so idk ill put the sounds inside the scripts and only the necessary ones will be in this launcher.py
+            # (scripts are measured in call_script, that's where - and on which thread - they actually run)
+            return self.run_script(command, args)
+        self.print_text(f"Unknown command: {command}\n", 'error')
+        nuh_uh()
+        return False
+
+    def is_builtin(self, command, args):
+        return command in BUILTIN_COMMANDS and (command != "preset" or len(args) == 1)
+
+    def run_builtin(self, command, args):
+        # True/False = built-in ran ok/failed, None = not a built-in
+        commands = self.commands
+
+        if command == "exit":
+            self.print_text("Bye!\n", 'info')
+            if self.jobs is not None:
+                self.jobs.shutdown()
+            if self.processes is not None:
+                self.processes.shutdown()
+            self.request_exit()
+        elif command == "jobs":
+            self.show_jobs()
+        elif command in ("kill", "wait"):
+            job = self.find_job(command, args)
+            if job is None:
+                nuh_uh()
+                return False
+            elif command == "kill":
+                self.jobs.cancel(job.id)
+                self.print_text(f"[{job.id}] cancelling {job.command}...\n", 'info')
+            else:
+                self.wait_for_job(job)
+        elif command == "calculator":
+            if not self.require_display(command):
+                return False
+            try:
+                calculator = self.commands.modules.load("calculator")
+                calculator.run(self, preset=self.colors)
+                ding()
+            except Exception as e:
+                self.print_text(f"Failed to launch calculator: {e}\n", 'error')
+                traceback.print_exc()
+                nuh_uh()
+                return False
+        elif command == "help":
+            cmds_list = [self.help_line(name) for name in commands.names()] + \
+                        BUILTINS + \
+                        [f"preset {preset}" for preset in config.ALL_PRESETS]
+
+            self.print_text("Available commands:\n" + "\n".join(sorted(cmds_list)) + "\n")
+            ding()
+        elif command == "info":
+            self.show_info()
+            ding()
+        elif command == "preset" and len(args) == 1:
+            if args[0] not in config.PRESETS:
+                self.print_text(f"Preset '{args[0]}' not found.\n", 'error')
+                nuh_uh()
+                return False
+            self.apply_preset(args[0])
+            ding()
+        elif command == "clear":
+            self.clear_output()
+            ding()
+        elif command == "scrollback":
+            if not self.set_scrollback(args):
+                nuh_uh()
+                return False
+            ding()
+        elif command == "taskmanager":
+            if not self.require_display(command):
+                return False
+            try:
+                taskmanager = self.commands.modules.load("taskmanager")
+                taskmanager.TaskManager(self, self.colors)
+                ding()
+            except Exception as e:
+                self.print_text(f"Error launching taskmanager: {e}\n", 'error')
+                traceback.print_exc()
+                nuh_uh()
+                return False
+        elif command == "stats":
+            return self.show_stats(args)
+        elif command == "profile":
+            return self.profile(args)
+        elif command == "reload":
+            return self.reload(args)
+        else:
+            return None
+        return True
+
+    def profile(self, args):
+        what = args[0] if args else None
+        sort = args[1] if len(args) > 1 else "cumulative"
+        if what not in ("startup", "imports") or sort not in _profile.SORT_KEYS or len(args) > 2:
+            self.print_text(f"Usage: {config.COMMAND_PREFIX}profile startup|imports [{'|'.join(_profile.SORT_KEYS)}]\n", 'info')
+            return False
+
+        if what == "imports":
+            # everything recorded in this process, including command modules imported since startup
+            profiler = _profile.active()
+            if profiler is None:
+                self.print_text("Not profiling, start the launcher with --profile-startup.\n", 'error')
+                return False
+            report, trace = profiler.save(self.commands.directory, sort=sort)
+            self.print_text(profiler.format_report(sort, limit=40))
+            self.print_text(f"Full report: {report}\nChrome trace: {trace}\n", 'info')
+            return True
+
+        if not self.require_display("profile startup"):
+            return False
+
+        def _cold_start(app):
+            app.print_text("Profiling a cold start...\n", 'info')
+            try:
+                report, wall, report_path, trace_path = _profile.profile_cold_start(sort)
+            except Exception as e:
+                app.print_text(f"Startup profile failed: {e}\n", 'error')
+                return False
+            lines = report.splitlines()
+            app.print_text("\n".join(lines[:42]) + "\n")
+            app.print_text(f"Process wall time {wall * 1000:.0f} ms\nFull report: {report_path}\n"
+                           f"Chrome trace: {trace_path}\n", 'info')
+            return True
+
+        if self.jobs is None:
+            return _cold_start(self)
+        # a whole second launcher starting up - don't freeze this one meanwhile
+        self.jobs.submit("profile", args, _cold_start)
+        return True
+
+    def reload(self, args):
+        if len(args) > 1:
+            self.print_text(f"Usage: {config.COMMAND_PREFIX}reload [command]\n", 'info')
+            return False
+        self.commands.refresh()
+        if not args:
+            # everything that changed on disk, plus what imports it
+            return self.reload_modules()
+        module_name = self.commands.module_name(args[0])
+        if module_name is None and args[0] != "config":
+            self.print_text(f"Command '{args[0]}' not found.\n", 'error')
+            nuh_uh()
+            return False
+        module_name = module_name or "config"
+        try:
+            # forced, even when the file looks unchanged
+            self.commands.modules.load(module_name, force=True)
+        except Exception as e:
+            self.print_text(f"Reloading {module_name} failed: {e}\n", 'error')
+            nuh_uh()
+            return False
+        self.print_text(f"Reloaded {module_name}.\n", 'info')
+        return True
+
+    def reload_modules(self, names=None, quiet=False):
+        try:
+            reloaded = self.commands.modules.reload_changed(names)
+        except Exception as e:
+            # a half-saved file, keep running the old code and try again next time
+            self.print_text(f"Reload failed: {e}\n", 'error')
+            return False
+        if reloaded:
+            self.print_text(f"Reloaded {', '.join(reloaded)}.\n", 'info')
+            if "config" in reloaded and self.current_preset_name in config.PRESETS:
+                # repaint with the edited colours
+                self.apply_preset(self.current_preset_name)
+        elif not quiet:
+            self.print_text("Nothing changed.\n", 'info')
+        return True
+
+    def show_stats(self, args):
+        if not args:
+            self.print_text(self.stats.format_table())
+            return True
+        if args[0] == "reset" and len(args) == 1:
+            self.stats.reset()
+            self.print_text("Stats cleared.\n", 'info')
+            return True
+        if args[0] == "export" and len(args) == 2:
+            path = os.path.join(os.path.dirname(os.path.abspath(__file__)), args[1].strip('"').strip("'"))
+            try:
+                count = self.stats.export(path)
+            except OSError as e:
+                self.print_text(f"Export failed: {e}\n", 'error')
+                return False
+            self.print_text(f"Exported {count} commands to {path}\n", 'info')
+            return True
+        self.print_text(f"Usage: {config.COMMAND_PREFIX}stats [reset | export <file.csv/.json>]\n", 'info')
+        return False
+
+    def require_display(self, command):
+        if self.has_display:
+            return True
+        self.print_text(f"'{command}' opens a window and needs a display.\n", 'error')
+        nuh_uh()
+        return False
+
+    def show_info(self):
+        import psutil
+        uname = platform.uname()
+        information = [
+            f"System    : {uname.system}",
+            f"Node      : {uname.node}",
+            f"Release   : {uname.release}",
+            f"Version   : {uname.version}",
+            f"Machine   : {uname.machine}",
+            f"Processor : {uname.processor}",
+            f"RAM       : {round(psutil.virtual_memory().total / (1024 ** 3), 2)} GB",
+            f"Disk      : {round(psutil.disk_usage('/').total / (1024 ** 3), 2)} GB"
+        ]
+
+        smiley = [
+            "     _______  ",
+            "    /       \\ ",
+            "   | (•) (•) |",
+            "   |    ^    |",
+            "   |  \\___/  |",
+            "    \\_______/ ",
+            ""
+        ]
+
+        self.print_text("\n".join(information) + "\n" + "\n".join(smiley))
+
+    def show_jobs(self):
+        if self.jobs is not None:
+            self.jobs.prune()
+        if not self.jobs or not self.jobs.jobs:
+            self.print_text("No jobs.\n", 'info')
+            return
+        lines = []
+        for job in self.jobs.jobs.values():
+            line = f"[{job.id}] {job.state:<9} {job.elapsed():7.1f}s  {' '.join([job.command] + job.args)}"
+            progress = job.describe_progress()
+            if progress and job.active:
+                line += f"  ({progress})"
+            lines.append(line)
+        self.print_text("\n".join(lines) + "\n")
+
+    def find_job(self, command, args):
+        if len(args) != 1 or not args[0].isdigit():
+            self.print_text(f"Usage: {config.COMMAND_PREFIX}{command} <job id>\n", 'info')
+            return None
+        job = self.jobs.get(int(args[0])) if self.jobs is not None else None
+        if job is None:
+            self.print_text(f"No job with id {args[0]}.\n", 'error')
+        return job
+
+    def help_line(self, name):
+        usage = self.commands.usage(name)
+        if not usage:
+            return name
+        return f"{name:<16}{usage}"
+
+    def run_script(self, command, args):
+        commands = self.commands
+        module_name = commands.module_name(command)
+        if not module_name:
+            self.print_text(f"Command '{command}' not found.\n", 'error')
+            nuh_uh()
+            return False
+
+        if commands.main_thread(command):
+            # tkinter/pygame windows have to be created on this thread
+            if not self.require_display(command):
+                return False
+            return self.call_script(self, command, args)
+        if self.jobs is None:
+            return self.call_script(self, command, args)
+        if commands.execution(command) == "process" and self.processes is not None:
+            # own interpreter = own GIL, numpy/zstd crunching can't make the window stutter
+            self.jobs.submit(command, args, lambda job_app: self.call_script_in_process(job_app, command, args))
+        else:
+            self.jobs.submit(command, args, lambda job_app: self.call_script(job_app, command, args))
+        return True
+
+    def run_pipeline(self, cmd):
+        self.reload_modules(["config"], quiet=True)
+        try:
+            stages = _pipeline.split_stages(cmd, config.COMMAND_PREFIX)
+        except ValueError as e:
+            self.print_text(f"Bad pipeline: {e}\n", 'error')
+            nuh_uh()
+            return False
+
+        for command, args in stages:
+            if command not in self.commands or self.commands.stale(command):
+                self.commands.refresh()
+            if command not in self.commands:
+                self.print_text(f"Unknown command: {command}\n", 'error')
+                nuh_uh()
+                return False
+            if self.commands.main_thread(command):
+                self.print_text(f"'{command}' opens a window and can't be part of a pipeline.\n", 'error')
+                nuh_uh()
+                return False
+
+        # every stage runs in this process (generators don't cross process boundaries), on one job
+        name = " | ".join(command for command, args in stages)
+        if self.jobs is None:
+            return self.call_pipeline(self, name, stages)
+        self.jobs.submit(name, [], lambda job_app: self.call_pipeline(job_app, name, stages))
+        return True
+
+    def call_pipeline(self, app, name, stages):
+        with self.stats.measure(name) as sample:
+            errors_before = getattr(app, 'errors', 0)
+            ok = _pipeline.run(app, self.commands, stages)
+            sample.ok = ok and getattr(app, 'errors', 0) == errors_before
+        return sample.ok
+
+    def call_script_in_process(self, app, command, args):
+        with self.stats.measure(command) as sample:
+            errors_before = getattr(app, 'errors', 0)
+            ok, sample.cpu, sample.rss = self.processes.run(app, self.commands.module_name(command), args)
+            sample.ok = ok and getattr(app, 'errors', 0) == errors_before
+        return sample.ok
+
+    def call_script(self, app, command, args):
+        with self.stats.measure(command) as sample:
+            # modules mostly report failure by printing with the 'error' tag, not by raising
+            errors_before = getattr(app, 'errors', 0)
+            ok = self._call_script(app, command, args)
+            sample.ok = ok and getattr(app, 'errors', 0) == errors_before
+        return sample.ok
+
+    def _call_script(self, app, command, args):
+        commands = self.commands
+        module_name = commands.module_name(command)
+        try:
+            module = commands.load(command)
+            if hasattr(module, 'runarg'):
+                module.runarg(app, args)
+                # again here
+            elif hasattr(module, 'run'):
+                module.run(app)
+                # and again here aswell
+            else:
+                app.print_text(f"No `run()` or `runarg()` in '{module_name}'.\n", 'error')
+                nuh_uh()
+                return False
+        except ImportError as e:
+            app.print_text(f"Import error: {e}\n", 'error')
+            nuh_uh()
+            return False
+        except Exception as e:
+            app.print_text(f"Error running command '{module_name}': {e}\n", 'error')
+            traceback.print_exc()
+            nuh_uh()
+            return False
+        return True
@@ -0,0 +1,130 @@
+# shared sound service - every command used to have its own copy of ding()/nuh_uh() that started a
+# new thread and re-loaded the mp3 from disk on every call. now the sounds are decoded once and played
+# from a single worker thread over a small pool of mixer channels.
+#
+#   from _sound import ding, nuh_uh
+
+import os, queue, threading, time
+import _profile
+
+SOUNDS = ("ding", "nuh_uh")
+CHANNELS = 4
+MIN_INTERVAL = 0.12  # the same sound again within this many seconds gets dropped (list_dir used to ding per file)
+
+def _sounds_dir():
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sounds')
+
+def _audio_disabled():
+    # headless/batch runs and servers without a sound card never touch pygame.mixer at all
+    if os.environ.get("BABABOI_NO_SOUND"):
+        return True
+    return os.environ.get("SDL_AUDIODRIVER") == "dummy"
+
+class NullSoundService:
+    enabled = False
+
+    def play(self, name):
+        pass
+
+    def close(self):
+        pass
+
+class SoundService:
+    enabled = True
+
+    def __init__(self, directory=None, channels=CHANNELS, min_interval=MIN_INTERVAL):
+        self.directory = directory or _sounds_dir()
+        self.channels = channels
+        self.min_interval = min_interval
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._sounds = {}
+        self._last_played = {}
+        self._mixer = None
+
+    def play(self, name):
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._thread is None:
+                # mixer init + decoding happens on the worker, the first ding never blocks the caller
+                self._thread = threading.Thread(target=self._worker, name="sound", daemon=True)
+                self._thread.start()
+        self._queue.put(name)
+
+    def close(self):
+        self._queue.put(None)
+
+    def _start_mixer(self):
+        try:
+            with _profile.span("mixer init"):
+                import pygame
+                pygame.mixer.init()
+                pygame.mixer.set_num_channels(self.channels)
+                self._mixer = pygame.mixer
+                for name in SOUNDS:
+                    self._sounds[name] = pygame.mixer.Sound(os.path.join(self.directory, name + '.mp3'))
+            return True
+        except Exception as e:
+            # no audio device / no pygame -> behave like NullSoundService from now on
+            print(f"Sound disabled: {e}")
+            self.enabled = False
+            return False
+
+    def _worker(self):
+        if not self._start_mixer():
+            return
+        while True:
+            names = [self._queue.get()]
+            # coalesce whatever piled up meanwhile, one burst = at most one play per sound
+            try:
+                while True:
+                    names.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            if None in names:
+                return
+            now = time.monotonic()
+            for name in dict.fromkeys(names):
+                sound = self._sounds.get(name)
+                if sound is None:
+                    print(f"Error playing sound: unknown sound '{name}'")
+                    continue
+                if now - self._last_played.get(name, -self.min_interval) < self.min_interval:
+                    continue
+                self._last_played[name] = now
+                try:
+                    # find_channel(True) steals the oldest channel when all of them are busy
+                    channel = self._mixer.find_channel(True)
+                    if channel is not None:
+                        channel.play(sound)
+                except Exception as e:
+                    print(f"Error playing sound: {e}")
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_service():
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = NullSoundService() if _audio_disabled() else SoundService()
+        return _service
+
+def set_service(service):
+    global _service
+    with _service_lock:
+        _service = service
+
+def disable():
+    set_service(NullSoundService())
+
+def play(name):
+    get_service().play(name)
+
+def ding():
+    play("ding")
+
+def nuh_uh():
+    play("nuh_uh")
@@ -0,0 +1,221 @@
+# per-command instrumentation for /stats
+# every invocation records wall time, cpu time, peak rss growth and ok/fail into fixed-size
+# log-bucket histograms, so memory stays flat no matter how long the launcher runs
+#
+# peak rss is a high-water mark of a whole process. commands in the process pool get their worker's
+# (one command per worker at a time, so that's theirs alone). everything else is measured on the
+# launcher process, where jobs running at the same time share one peak: the growth goes to
+# whichever finishes after it, and once the peak is reached later runs show 0. /stats says which
+
+import csv, json, math, sys, threading, time
+
+try:
+    import resource  # not on windows
+except ImportError:
+    resource = None
+
+class Histogram:
+    # buckets grow by `growth` each, from `low` to `high` - percentiles are accurate to ~growth/2
+    def __init__(self, low, high, growth=1.1):
+        self.low = low
+        self.growth = growth
+        self._log_growth = math.log(growth)
+        self.size = int(math.ceil(math.log(high / low) / self._log_growth)) + 2
+        self.counts = [0] * self.size  # [0] = below low, [-1] = above high
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def _bucket(self, value):
+        if value < self.low:
+            return 0
+        return min(self.size - 1, 1 + int(math.log(value / self.low) / self._log_growth))
+
+    def add(self, value):
+        self.counts[self._bucket(value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, p):
+        if not self.count:
+            return None
+        rank = max(1, int(math.ceil(self.count * p / 100.0)))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                break
+        if index == 0:
+            value = self.min  # everything down there is below `low`, the smallest one seen is the best guess
+        elif index == self.size - 1:
+            value = self.max  # same above `high`
+        else:
+            # geometric middle of the bucket
+            value = self.low * self.growth ** (index - 1) * math.sqrt(self.growth)
+        return min(max(value, self.min), self.max)
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+def _rss_and_peak(proc):
+    info = proc.memory_info()
+    peak = getattr(info, 'peak_wset', None)  # windows keeps a real high-water mark
+    if peak is None and resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # linux reports KiB, macOS bytes
+        peak = peak if sys.platform == "darwin" else peak * 1024
+    return info.rss, peak if peak is not None else info.rss
+
+class CommandStats:
+    def __init__(self, name):
+        self.name = name
+        self.wall = Histogram(1e-5, 1e5)
+        self.cpu = Histogram(1e-5, 1e5)
+        self.rss = Histogram(1024, 1 << 40, growth=1.25)
+        self.shared_rss = 0  # runs measured on the launcher's process-wide peak
+        self.ok = 0
+        self.failed = 0
+
+class Sample:
+    def __init__(self, recorder, command):
+        self.recorder = recorder
+        self.command = command
+        self.ok = True
+        self.cpu = None
+        self.rss = None
+        self._rss, self._peak = recorder._memory()
+        self._cpu = time.thread_time()
+        self._wall = time.perf_counter()
+
+    def finish(self, ok=None):
+        if ok is not None:
+            self.ok = ok
+        wall = time.perf_counter() - self._wall
+        # cpu of the thread that ran the command (jobs run on their own worker thread)
+        cpu = time.thread_time() - self._cpu
+        rss, peak = self.recorder._memory()
+        # how much the command pushed the high-water mark up, or the rss growth if that's bigger
+        grew = max(peak - self._peak, rss - self._rss, 0)
+        # commands that ran in a worker process report their own numbers
+        if self.cpu is not None:
+            cpu = self.cpu
+        shared = self.rss is None
+        if not shared:
+            grew = self.rss
+        self.recorder.record(self.command, wall, cpu, grew, bool(self.ok), shared)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.ok = False
+        self.finish()
+        return False
+
+class StatsRecorder:
+    def __init__(self):
+        self.commands = {}
+        self._lock = threading.Lock()
+        self._proc = None
+
+    def _memory(self):
+        if self._proc is None:
+            import psutil
+            self._proc = psutil.Process()
+        return _rss_and_peak(self._proc)
+
+    def measure(self, command):
+        return Sample(self, command)
+
+    def record(self, command, wall, cpu, rss_delta, ok, shared_rss=False):
+        with self._lock:
+            stats = self.commands.get(command)
+            if stats is None:
+                stats = self.commands[command] = CommandStats(command)
+            stats.wall.add(wall)
+            stats.cpu.add(cpu)
+            stats.rss.add(rss_delta)
+            stats.shared_rss += bool(shared_rss)
+            if ok:
+                stats.ok += 1
+            else:
+                stats.failed += 1
+
+    def reset(self):
+        with self._lock:
+            self.commands = {}
+
+    def rows(self):
+        with self._lock:
+            stats_list = sorted(self.commands.values(), key=lambda s: s.name)
+            rows = []
+            for stats in stats_list:
+                rows.append({
+                    "command": stats.name,
+                    "runs": stats.ok + stats.failed,
+                    "ok": stats.ok,
+                    "failed": stats.failed,
+                    "wall_p50": stats.wall.percentile(50),
+                    "wall_p95": stats.wall.percentile(95),
+                    "wall_p99": stats.wall.percentile(99),
+                    "wall_max": stats.wall.max,
+                    "cpu_p50": stats.cpu.percentile(50),
+                    "cpu_p95": stats.cpu.percentile(95),
+                    "cpu_p99": stats.cpu.percentile(99),
+                    "rss_p50": stats.rss.percentile(50),
+                    "rss_p95": stats.rss.percentile(95),
+                    "rss_p99": stats.rss.percentile(99),
+                    "rss_process_wide": stats.shared_rss,  # runs whose rss is the launcher's shared peak
+                })
+            return rows
+
+    def format_table(self):
+        rows = self.rows()
+        if not rows:
+            return "No stats yet.\n"
+        lines = [f"{'command':<16}{'runs':>6}{'fail':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'cpu p50':>10}{'peak+ p95':>11}"]
+        for row in rows:
+            # * = measured on the launcher's process-wide peak, shared with whatever else was running
+            mark = "*" if row['rss_process_wide'] else " "
+            lines.append(
+                f"{row['command']:<16}{row['runs']:>6}{row['failed']:>6}"
+                f"{_seconds(row['wall_p50']):>10}{_seconds(row['wall_p95']):>10}{_seconds(row['wall_p99']):>10}"
+                f"{_seconds(row['cpu_p50']):>10}{_size(row['rss_p95']):>10}{mark}"
+            )
+        if any(row['rss_process_wide'] for row in rows):
+            lines.append("peak+ = growth of the peak RSS. * = launcher process-wide peak, shared by jobs running "
+                         "at the same time; the others are their own worker process's")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        rows = self.rows()
+        if path.lower().endswith(".json"):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"time": time.time(), "commands": rows}, f, indent=2)
+        else:
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                fields = list(rows[0].keys()) if rows else ["command"]
+                writer = csv.DictWriter(f, fieldnames=fields)
+                writer.writeheader()
+                writer.writerows(rows)
+        return len(rows)
+
+def _seconds(value):
+    if value is None:
+        return "-"
+    if value < 1:
+        return f"{value * 1000:.1f}ms"
+    return f"{value:.2f}s"
+
+def _size(value):
+    if value is None:
+        return "-"
+    for unit in ("B", "K", "M", "G"):
+        if value < 1024:
+            return f"{value:.0f}{unit}"
+        value /= 1024
+    return f"{value:.0f}T"
@@ -0,0 +1,109 @@
+# picks a compression level for /compress --auto / --target-mbps
+#
+# a few blocks spread over the input are compressed at increasing levels (and with long distance
+# matching for big inputs); the best ratio that still makes the throughput target wins. the choice
+# is cached per file extension and target in .compress_tuning.json, so the next .wav or .txt skips
+# the probing.
+
+import json, os, time
+import zstandard as zstd
+
+DEFAULT_TARGET_MBPS = 100        # --auto without a budget
+LEVELS = (1, 3, 5, 7, 9, 12, 15, 19)
+LONG_WINDOW_LOG = 27             # 128 MiB, what zstd --long uses and what decoders accept by default
+LONG_MIN_SIZE = 64 << 20         # long matching only pays off on big inputs
+SAMPLE_BLOCKS = 8
+SAMPLE_BLOCK = 256 << 10
+MIN_GAIN = 0.01                  # a slower setting has to make the output at least 1% smaller
+PARALLEL_UNIT = 4 << 20          # zstd threads / seekable frames split the input in pieces about this big
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".compress_tuning.json")
+CACHE_TTL = 30 * 24 * 3600
+
+def compressor(level, long=False, **params):
+    # ZstdCompressor that can also do long distance matching, which needs full compression params
+    if not long:
+        return zstd.ZstdCompressor(level=level, **params)
+    dict_data = params.pop("dict_data", None)
+    for name in ("write_checksum", "write_content_size", "write_dict_id"):
+        if name in params:
+            params[name] = int(params[name])
+    cp = zstd.ZstdCompressionParameters.from_level(level, enable_ldm=True, window_log=LONG_WINDOW_LOG, **params)
+    return zstd.ZstdCompressor(compression_params=cp, dict_data=dict_data)
+
+def sample(files):
+    # SAMPLE_BLOCKS blocks evenly spread over [(path, size)], glued together so long matching
+    # has something far away to find
+    total = sum(size for _, size in files)
+    if not total:
+        return b""
+    step = max(total // SAMPLE_BLOCKS, 1)
+    blocks = []
+    wanted = 0
+    position = 0
+    for path, size in files:
+        while wanted < position + size and len(blocks) < SAMPLE_BLOCKS:
+            with open(path, 'rb') as f:
+                f.seek(wanted - position)
+                blocks.append(f.read(SAMPLE_BLOCK))
+            wanted += step
+        position += size
+    return b"".join(blocks)
+
+def _probe(data, level, long):
+    start = time.perf_counter()
+    size = len(compressor(level, long).compress(data))
+    return size / len(data), len(data) / 1e6 / max(time.perf_counter() - start, 1e-9)
+
+def choose(data, total, target_mbps):
+    # (level, long, ratio, estimated MB/s) for the input of `total` bytes sampled as `data`
+    parallel = min(os.cpu_count() or 1, max(1, total // PARALLEL_UNIT))
+    variants = (False, True) if total >= LONG_MIN_SIZE else (False,)
+    fastest = best = None
+    for level in LEVELS:
+        in_time = False
+        for long in variants:
+            ratio, mbps = _probe(data, level, long)
+            mbps *= parallel
+            result = (level, long, ratio, mbps)
+            if fastest is None or mbps > fastest[3]:
+                fastest = result
+            if mbps >= target_mbps:
+                in_time = True
+                if best is None or ratio < best[2] * (1 - MIN_GAIN):
+                    best = result
+        if not in_time:
+            break  # higher levels only get slower
+    return best or fastest
+
+def _load_cache():
+    try:
+        with open(CACHE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_cache(cache):
+    tmp = CACHE_PATH + f".{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=1, sort_keys=True)
+        os.replace(tmp, CACHE_PATH)
+    except OSError:
+        pass  # only a cache
+
+def tune(files, kind, target_mbps, retune=False):
+    # cached choice for this kind of input (".txt", "folder", ...), probing when there is none.
+    # returns (level, long, ratio, mbps, cached)
+    total = sum(size for _, size in files)
+    key = f"{kind}|{max(round(target_mbps), 1)}|{'long' if total >= LONG_MIN_SIZE else 'short'}"
+    cache = _load_cache()
+    entry = cache.get(key)
+    if entry and not retune and time.time() - entry["time"] < CACHE_TTL:
+        return entry["level"], entry["long"], entry["ratio"], entry["mbps"], True
+    data = sample(files)
+    if not data:
+        return 3, False, 1.0, 0.0, False  # nothing to measure, zstd's default
+    level, long, ratio, mbps = choose(data, total, target_mbps)
+    cache[key] = {"level": level, "long": long, "ratio": ratio, "mbps": mbps, "time": time.time()}
+    _save_cache(cache)
+    return level, long, ratio, mbps, False
@@ -1,34 +1,47 @@
 from PIL import Image, ImageEnhance
 import numpy as np
-import os, pygame, threading
+import io
+import os
+from _sound import ding, nuh_uh
+
+# pixels_to_ascii is pure python loops, keep it off the launcher's GIL
+EXECUTION = "process"
 
 NEW_WIDTH = 150
 BRIGHTNESS_FACTOR = 1.25
 ASCII_CHARS = "@%#*+=-:. "
 
-pygame.mixer.init()
-
-def ding():
-    def _play():
-        try:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            sounds_dir = os.path.join(script_dir, 'sounds/ding.mp3')
-            pygame.mixer.music.load(sounds_dir)
-            pygame.mixer.music.play()
-        except Exception as e:
-            print(f"Error playing sound: {e}")
-    threading.Thread(target=_play).start()
-
-def nuh_uh():
-    def _play():
-        try:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            sounds_dir = os.path.join(script_dir, 'sounds/nuh_uh.mp3')
-            pygame.mixer.music.load(sounds_dir)
-            pygame.mixer.music.play()
-        except Exception as e:
-            print(f"Error playing sound: {e}")
-    threading.Thread(target=_play).start()
+def resize_image(image, new_width=100):
+    width, height = image.size
+    aspect_ratio = height / width
+    new_height = int(new_width * aspect_ratio * 0.55)
+    return image.resize((new_width, new_height))
+
+def grayscale(image):
+    return image.convert("L")
+
+def pixels_to_ascii(image):
+    pixels = np.array(image, dtype=np.uint16)
+    ascii_str = ""
+    for row in pixels:
+        for pixel in row:
+            index = pixel * (len(ASCII_CHARS) - 1) // 255
+            ascii_str += ASCII_CHARS[index]
+        ascii_str += "\n"
+    return ascii_str
+
+def image_to_ascii(path, new_width=100):
+    try:
+        image = Image.open(path)
+    except Exception as e:
+        print(f"Could not open image: {e}")
+        nuh_uh()
+        return None
+
+    image = ImageEnhance.Brightness(image).enhance(BRIGHTNESS_FACTOR)
+    image = resize_image(image, new_width)
+    gray_image = grayscale(image)
+    return pixels_to_ascii(gray_image)
 
 def runarg(app=None, args=None):
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -54,38 +67,6 @@ def runarg(app=None, args=None):
 
     app.print_text(f"Converting image '{input_path}' to ASCII...\n", 'info')
 
-    def resize_image(image, new_width=100):
-        width, height = image.size
-        aspect_ratio = height / width
-        new_height = int(new_width * aspect_ratio * 0.55)
-        return image.resize((new_width, new_height))
-
-    def grayscale(image):
-        return image.convert("L")
-
-    def pixels_to_ascii(image):
-        pixels = np.array(image, dtype=np.uint16)
-        ascii_str = ""
-        for row in pixels:
-            for pixel in row:
-                index = pixel * (len(ASCII_CHARS) - 1) // 255
-                ascii_str += ASCII_CHARS[index]
-            ascii_str += "\n"
-        return ascii_str
-
-    def image_to_ascii(path, new_width=100):
-        try:
-            image = Image.open(path)
-        except Exception as e:
-            print(f"Could not open image: {e}")
-            nuh_uh()
-            return None
-
-        image = ImageEnhance.Brightness(image).enhance(BRIGHTNESS_FACTOR)
-        image = resize_image(image, new_width)
-        gray_image = grayscale(image)
-        return pixels_to_ascii(gray_image)
-
     ascii_output = image_to_ascii(input_path, NEW_WIDTH)
 
     if ascii_output:
@@ -93,3 +74,21 @@ def runarg(app=None, args=None):
             f.write(ascii_output)
         print(f"ASCII art saved to: {output_path}")
         ding()
+
+def stream(app, args, chunks):
+    # pipeline version: `/ascii_image cat.png | /open`, or the image bytes come down the pipe
+    if chunks is not None:
+        # PIL wants to seek, an image is small anyway. text from the stage before is encoded like
+        # everywhere else in a pipeline, PIL then says it isn't an image
+        source = io.BytesIO(b"".join(chunk.encode("utf-8") if isinstance(chunk, str) else chunk for chunk in chunks))
+    elif args:
+        source = os.path.join(os.path.dirname(os.path.abspath(__file__)), args[0])
+    else:
+        app.print_text("Usage: /ascii_image <input_image_name> | ...\n", 'info')
+        nuh_uh()
+        return
+    ascii_output = image_to_ascii(source, NEW_WIDTH)
+    if ascii_output:
+        yield ascii_output
+    else:
+        app.print_text("Could not convert the image.\n", 'error')
@@ -13,21 +13,28 @@ ASCII_CHARS = "@#%"
 
 NUM_CHARS = len(ASCII_CHARS)
 
-def setup_opencl():
-    platforms = cl.get_platforms()
-    devices = []
-    for p in platforms:
-        for d in p.get_devices(device_type=cl.device_type.GPU):
-            devices.append(d)
-            print(f"Found GPU device: {d.name} (Vendor: {d.vendor})")
-
-    if len(devices) == 0:
-        raise RuntimeError("No GPU devices found.")
-    device = devices[1]
-    print(f"Using GPU device: {device.name} (Vendor: {device.vendor})")
+# the OpenCL context is expensive to create, keep it across runs and /reload
+RELOAD_KEEP = ("_cl",)
+_cl = None
 
-    ctx = cl.Context([device])
-    queue_ = cl.CommandQueue(ctx)
+def setup_opencl():
+    global _cl
+    if _cl is None:
+        platforms = cl.get_platforms()
+        devices = []
+        for p in platforms:
+            for d in p.get_devices(device_type=cl.device_type.GPU):
+                devices.append(d)
+                print(f"Found GPU device: {d.name} (Vendor: {d.vendor})")
+
+        if len(devices) == 0:
+            raise RuntimeError("No GPU devices found.")
+        device = devices[1]
+        print(f"Using GPU device: {device.name} (Vendor: {device.vendor})")
+
+        ctx = cl.Context([device])
+        _cl = (ctx, cl.CommandQueue(ctx))
+    ctx, queue_ = _cl
 
     kernel_code = """
     __kernel void render_ascii_color_batch(
@@ -141,11 +148,14 @@ def video_to_ascii_color(app, input_path, output_path,
 
     frames_queue = queue.Queue(maxsize=batch_size * 2)
     write_queue = queue.Queue()
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or None
+    progress = getattr(app, 'progress', None)
+    cancelled = getattr(app, 'cancelled', lambda: False)
 
     def reader_worker():
         nonlocal ret, frame
         try:
-            while ret:
+            while ret and not cancelled():
                 frames_queue.put(frame)
                 ret, frame = cap.read()
         finally:
@@ -206,6 +216,8 @@ def video_to_ascii_color(app, input_path, output_path,
                 out.write(frames_np[i])
                 frame_count += 1
             buffer_pool.append(buffers)
+            if progress:
+                progress(frame_count, total_frames, "frames")
 
     reader_thread = concurrent.futures.ThreadPoolExecutor(max_workers=1)
     reader_future = reader_thread.submit(reader_worker)
@@ -224,6 +236,13 @@ def video_to_ascii_color(app, input_path, output_path,
     cap.release()
     out.release()
 
+    if cancelled():
+        # only the start of the video got written, same as compress/crt: nothing half done stays behind
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        app.print_text(f"Cancelled after {frame_count} frames, removed '{output_path}'\n", 'info')
+        return
+
     elapsed = time.time() - start_time
     app.print_text(f"Processing complete!\n"
                    f"Total frames processed: {frame_count}\n", 'info')
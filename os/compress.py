@@ -1,71 +1,388 @@
 import zstandard as zstd
-import os, threading, pygame, time, tarfile
+import os, time, threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from _sound import ding, nuh_uh
+import _archive, _dedup, _dicts, _fastio, _tuning
+from _progress import Meter, discard
+from _seekable import SeekTable, DEFAULT_FRAME_SIZE, MAX_FRAME_SIZE, frame_checksum, parse_size
 
-pygame.mixer.init()
+# zstd work runs in a launcher worker process (see _procpool.py)
+EXECUTION = "process"
 
-def ding():
-    def _play():
-        try:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            sounds_dir = os.path.join(script_dir, 'sounds/ding.mp3')
-            pygame.mixer.music.load(sounds_dir)
-            pygame.mixer.music.play()
-        except Exception as e:
-            print(f"Error playing sound: {e}")
-    threading.Thread(target=_play).start()
+def compress_stream(chunks, fout, level, total, progress, cancelled, exact=True, dict_data=None, long=False,
+                    write_size=_fastio.DEFAULT_BUFFER, threads=-1):
+    # one frame for the whole input, zstd's own worker threads do the parallel part. chunks can be
+    # memoryviews (mmap slices, a reused buffer), zstd copies what it needs before the next one.
+    # exact=False when total is only an estimate (tar stream), then no content size goes in the header.
+    # long = long distance matching with a 128 MiB window, what --auto picks for big repetitive input
+    cctx = _tuning.compressor(level, long, threads=threads, dict_data=dict_data)
+    writer = cctx.stream_writer(fout, size=total if exact else -1, write_size=write_size, closefd=False)
+    done = 0
+    for chunk in chunks:
+        if cancelled():
+            return
+        writer.write(chunk)
+        done += len(chunk)
+        if progress:
+            progress(done, total)
+    writer.flush(zstd.FLUSH_FRAME)
+
+def compress_seekable(chunks, fout, level, frame_size, total, progress, cancelled, dict_data=None, long=False,
+                      workers=None):
+    # independent frames of frame_size bytes + a seek table (see _seekable.py). frames are compressed
+    # on a thread pool (zstd lets go of the GIL) and written back in order. chunks are the frames'
+    # input and sit in the queue for a while, so they can't share a buffer
+    table = SeekTable()
+    local = threading.local()
+    workers = workers or os.cpu_count() or 2
+
+    def compress_frame(chunk):
+        cctx = getattr(local, 'cctx', None)
+        if cctx is None:
+            cctx = local.cctx = _tuning.compressor(level, long, write_checksum=True, dict_data=dict_data)
+        return cctx.compress(chunk), len(chunk)
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+
+        def write_oldest():
+            nonlocal done
+            frame, size = pending.popleft().result()
+            fout.write(frame)
+            table.add(len(frame), size, frame_checksum(frame))
+            done += size
+            if progress:
+                progress(done, total)
+
+        for chunk in chunks:
+            if cancelled():
+                return None
+            pending.append(pool.submit(compress_frame, chunk))
+            # a couple of frames per thread in flight, memory stays around 2 * workers * frame_size
+            if len(pending) >= 2 * workers:
+                write_oldest()
+        while pending:
+            if cancelled():
+                return None
+            write_oldest()
+    fout.write(table.to_bytes())
+    return table
 
-def nuh_uh():
-    def _play():
+def compress_file(input_path, fout, level, frame_size, total, progress, cancelled, settings,
+                  dict_data=None, long=False, threads=None):
+    # the input goes in through the --io backend (see _fastio.py), the table comes back for --seekable.
+    # threads = zstd worker threads (or frame pool size for --seekable), None = one per cpu
+    size = frame_size or settings["buffer"]
+    with _fastio.input_chunks(input_path, settings["io"], size, reuse=not frame_size) as chunks:
+        if frame_size:
+            return compress_seekable(chunks, fout, level, frame_size, total, progress, cancelled, dict_data, long,
+                                     workers=None if threads is None else max(threads, 1))
+        compress_stream(chunks, fout, level, total, progress, cancelled, dict_data=dict_data, long=long,
+                        write_size=settings["buffer"], threads=-1 if threads is None else threads)
+        return None
+
+def compress_folder(folder, fout, level, frame_size, progress, cancelled, long=False, settings=None):
+    # folder -> .tar.zst, reading and tar framing run on their own threads (see _archive.py)
+    members, size = _archive.scan(folder)
+    index = []
+    fin = _archive.tar_reader(members, index, cancelled)
+    # progress is counted in tar bytes, headers and padding make that a bit more than the file sizes
+    total = size + 1024 * len(members)
+    table = None
+    buffer = (settings or _fastio.defaults())["buffer"]
+    try:
+        if frame_size:
+            chunks = _fastio.read_chunks(fin, frame_size, reuse=False)
+            table = compress_seekable(chunks, fout, level, frame_size, total, progress, cancelled, long=long)
+        else:
+            chunks = _fastio.read_chunks(fin, buffer, reuse=True)
+            compress_stream(chunks, fout, level, total, progress, cancelled, exact=False, long=long, write_size=buffer)
+    finally:
+        fin.close()
+    if not cancelled():
+        fout.write(_archive.index_bytes(index))
+    return table, len(members), size
+
+def compress_batch(paths, level, dict_id, progress, cancelled):
+    # every file to its own .zst next to it, all with the same dictionary and the same compressor
+    cctx = _dicts.compressor(dict_id, level, write_checksum=True)
+    sizes = [os.path.getsize(path) for path in paths]
+    total = sum(sizes)
+    done = comp = 0
+    for path, size in zip(paths, sizes):
+        if cancelled():
+            break
         try:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            sounds_dir = os.path.join(script_dir, 'sounds/nuh_uh.mp3')
-            pygame.mixer.music.load(sounds_dir)
-            pygame.mixer.music.play()
-        except Exception as e:
-            print(f"Error playing sound: {e}")
-    threading.Thread(target=_play).start()
+            with open(path, 'rb') as fin, open(path + '.zst', 'wb') as fout:
+                comp += cctx.copy_stream(fin, fout, size=size)[1]
+        except BaseException:
+            discard(path + '.zst')  # no half written .zst next to the files that did make it
+            raise
+        done += size
+        if progress:
+            progress(done, total)
+    return done, comp
+
+def batch_files(folder):
+    # what a dictionary batch compresses / trains on: every regular file that isn't an archive already
+    paths = []
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        paths.extend(os.path.join(root, name) for name in sorted(files)
+                     if not name.endswith('.zst') and os.path.isfile(os.path.join(root, name)))
+    return paths
 
 def runarg(app, args):
-    if not args:
-        app.print_text("Usage: /compress <file> <compression_level (1-22 [11 - best speed/compression])>\n", 'info')
-        nuh_uh()
-        return
-    elif len(args) < 2:
-        app.print_text("Usage: /compress <file> <compression_level (1-22 [11 - best for speed and compression])>\n", 'info')
+    # --seekable[=4M] cuts the output into independently decompressable frames with an index at the end.
+    # a folder becomes a .tar.zst with a member list at the end (/decompress <file.tar.zst> --list).
+    # --dict=ID compresses with a stored dictionary; on a folder, --dict trains one from its files
+    # first and every file gets its own .zst (for lots of small, similar files).
+    # --auto[=SECONDS] / --target-mbps=N replace the level: the best ratio that's still fast enough
+    # (see _tuning.py), --retune ignores what was picked for this file type before.
+    # --dedup[=STORE] stores content defined chunks once in a shared store and writes a .zdd manifest.
+    # --io=auto|mmap|read and --buffer=SIZE pick how the input is read (see _fastio.py)
+    options = [arg for arg in args if arg.startswith("--")]
+    args = [arg for arg in args if not arg.startswith("--")]
+
+    frame_size = None
+    dict_option = None  # "" = train one from the folder
+    target = None       # MB/s, or ("seconds", n) until the input size is known
+    retune = False
+    dedup = None        # store folder
+    settings = _fastio.defaults()
+    for option in options:
+        name, _, value = option.partition("=")
+        try:
+            if _fastio.parse_option(name, value, settings):
+                continue
+        except ValueError as e:
+            app.print_text(f"{e}\n", 'error')
+            nuh_uh()
+            return
+        if name == "--dict" and (not value or value.isdigit()):
+            dict_option = value
+            continue
+        if name in ("--auto", "--target-mbps") and (name == "--auto" or value):
+            try:
+                number = float(value) if value else _tuning.DEFAULT_TARGET_MBPS
+            except ValueError:
+                number = 0
+            if number <= 0:
+                app.print_text(f"{name} needs a positive number\n", 'error')
+                nuh_uh()
+                return
+            target = ("seconds", number) if name == "--auto" and value else number
+            continue
+        if name == "--retune" and not value:
+            retune = True
+            continue
+        if name == "--dedup":
+            dedup = os.path.join(os.path.dirname(os.path.abspath(__file__)), value) if value else _dedup.STORE_DIR
+            continue
+        if name != "--seekable":
+            app.print_text(f"Unknown option {option}\n", 'error')
+            nuh_uh()
+            return
+        try:
+            frame_size = parse_size(value) if value else DEFAULT_FRAME_SIZE
+        except ValueError:
+            frame_size = 0
+        if not 0 < frame_size <= MAX_FRAME_SIZE:
+            app.print_text(f"Frame size has to be between 1 byte and {MAX_FRAME_SIZE >> 20}M\n", 'error')
+            nuh_uh()
+            return
+
+    if target is not None and len(args) >= 2 and args[-1].isdigit():
+        args = args[:-1]  # a level next to --auto, the tuned one wins
+    if not args or (target is None and len(args) < 2):
+        app.print_text("Usage: /compress <file or folder> <compression_level (1-22 [11 - best for speed and compression])> "
+                       "[--seekable[=frame size]] [--dict[=ID]] [--dedup[=store]] [--io=auto|mmap|read] [--buffer=size]\n"
+                       "       /compress <file or folder> --auto[=seconds] | --target-mbps=N [--retune]\n", 'info')
         nuh_uh()
         return
 
-    input_path = " ".join(args[:-1]).strip('"').strip("'")
+    input_path = " ".join(args if target is not None else args[:-1]).strip('"').strip("'")
     script_dir = os.path.dirname(os.path.abspath(__file__))
     input_path1 = os.path.join(script_dir, input_path)
 
-    if not os.path.isfile(input_path1):
+    folder = os.path.isdir(input_path1)
+    if not folder and not os.path.isfile(input_path1):
         app.print_text(f"File not found: {input_path1}\n", 'error')
         nuh_uh()
         return
 
-    output_path = input_path1 + '.zst'
-    level = int(args[-1])
-    READ_SZ  = 1 << 20
+    output_path = os.path.normpath(input_path1) + ('.tar.zst' if folder else '.zst')
+    long = False
+    if target is None:
+        level = int(args[-1])
+    else:
+        try:
+            level, long = auto_level(app, input_path1, folder, target, retune)
+        except Exception as e:
+            app.print_text(f"Tuning failed: {e}\n", 'error')
+            nuh_uh()
+            return
+
+    # only there when running as a launcher job
+    cancelled = getattr(app, 'cancelled', lambda: False)
+
+    if dedup is not None:
+        if frame_size or dict_option is not None:
+            app.print_text("--dedup doesn't mix with --seekable or --dict\n", 'error')
+            nuh_uh()
+            return
+        compress_dedup(app, input_path1, folder, level, dedup, cancelled)
+        return
+    if dict_option is not None and (folder or dict_option):
+        compress_with_dict(app, input_path1, folder, level, dict_option, frame_size, cancelled, settings)
+        return
+    if dict_option == "":
+        app.print_text("--dict trains on a folder of samples, use --dict=ID for a single file\n", 'error')
+        nuh_uh()
+        return
 
     try:
-        cctx = zstd.ZstdCompressor(level=level, threads=-1)
         start = time.time()
-        with open(input_path1, 'rb') as fin, open(output_path, 'wb') as fout:
-            writer = cctx.stream_writer(fout)
-            for chunk in iter(lambda: fin.read(READ_SZ), b''):
-                writer.write(chunk)
-                writer.flush(zstd.FLUSH_FRAME)
+        if folder:
+            with open(output_path, 'wb', buffering=settings["buffer"]) as fout:
+                meter = Meter(app, "Compressing", ratio=lambda done: fout.tell() / done)
+                table, count, orig = compress_folder(input_path1, fout, level, frame_size, meter, cancelled,
+                                                     long, settings)
+        else:
+            orig = os.path.getsize(input_path1)
+            with open(output_path, 'wb', buffering=settings["buffer"]) as fout:
+                meter = Meter(app, "Compressing", orig, lambda done: fout.tell() / done)
+                table = compress_file(input_path1, fout, level, frame_size, orig, meter, cancelled, settings,
+                                      long=long)
+        if cancelled():
+            os.remove(output_path)
+            app.print_text(f"Compression cancelled, removed {output_path}\n", 'info')
+            return
         duration = time.time() - start
-        orig = os.path.getsize(input_path1)
         comp = os.path.getsize(output_path)
-        ratio = comp / orig
+        ratio = comp / orig if orig else 1.0
         app.print_text(
             f"Compressed: {output_path}\n"
-            f"Time: {duration:.2f}s\n"
+            f"Time: {duration:.2f}s ({meter.average():.1f} MB/s)\n"
             f"Ratio: {ratio:.2%}\n", 'info'
         )
+        if folder:
+            app.print_text(f"Archived {count} entries\n", 'info')
+        if frame_size:
+            app.print_text(f"Seekable: {len(table)} frames of {frame_size >> 10} KiB\n", 'info')
         ding()
     except Exception as e:
+        discard(output_path)
         app.print_text(f"Compression failed: {e}\n", 'error')
-        nuh_uh()
\ No newline at end of file
+        nuh_uh()
+
+def compress_dedup(app, input_path, folder, level, store_path, cancelled):
+    # every file as a list of chunks in the store, see _dedup.py
+    store = _dedup.ChunkStore(store_path, level)
+    manifest_path = os.path.normpath(input_path) + '.zdd'
+    if folder:
+        base = os.path.dirname(os.path.normpath(input_path))
+        paths = batch_files(input_path)
+    else:
+        base = os.path.dirname(input_path)
+        paths = [input_path]
+    try:
+        start = time.time()
+        total = sum(os.path.getsize(path) for path in paths)
+        files = []
+        done = added = 0
+        meter = Meter(app, "Deduplicating", total, lambda done: added / done)
+        with _dedup.thread_pool() as pool:
+            for path in paths:
+                st = os.stat(path)
+                with open(path, 'rb') as fin:
+                    refs, written = _dedup.store_file(store, fin, pool, cancelled)
+                added += written
+                if refs is None:
+                    app.print_text("Compression cancelled, chunks stored so far stay in the store\n", 'info')
+                    return
+                files.append({"name": os.path.relpath(path, base).replace(os.sep, "/"),
+                              "size": st.st_size, "mode": st.st_mode & 0o777, "mtime": st.st_mtime, "chunks": refs})
+                done += st.st_size
+                meter(done)
+        _dedup.write_manifest(manifest_path, store_path, files)
+        refs = [key for entry in files for key, _ in entry["chunks"]]
+        comp = added + os.path.getsize(manifest_path)
+        ratio = comp / total if total else 1.0
+        app.print_text(
+            f"Deduplicated: {manifest_path}\n"
+            f"Time: {time.time() - start:.2f}s ({meter.average():.1f} MB/s)\n"
+            f"Chunks: {len(refs)}, {len(set(refs))} distinct, {added >> 10} KiB new in {store_path}\n"
+            f"Ratio: {ratio:.2%}\n", 'info'
+        )
+        ding()
+    except Exception as e:
+        app.print_text(f"Compression failed: {e}\n", 'error')
+        nuh_uh()
+
+def auto_level(app, path, folder, target, retune):
+    # (level, long) from _tuning for this input, cached per extension
+    if folder:
+        files = [(p, os.path.getsize(p)) for p in batch_files(path)]
+        kind = "folder"
+    else:
+        files = [(path, os.path.getsize(path))]
+        kind = os.path.splitext(path)[1].lower() or "no extension"
+    total = sum(size for _, size in files)
+    if isinstance(target, tuple):
+        target = max(total / 1e6 / target[1], 1.0)  # time budget -> throughput
+    level, long, ratio, mbps, cached = _tuning.tune(files, kind, target, retune)
+    app.print_text(
+        f"Auto: level {level}{' with long matching' if long else ''} for {kind} "
+        f"(~{mbps:.0f} MB/s, {ratio:.1%} on samples{', cached' if cached else ''}; target {target:.0f} MB/s)\n", 'info')
+    return level, long
+
+def compress_with_dict(app, input_path, folder, level, dict_option, frame_size, cancelled, settings):
+    if folder and frame_size:
+        app.print_text("--seekable and --dict don't mix on a folder, every file is its own .zst there\n", 'error')
+        nuh_uh()
+        return
+    output_path = None
+    try:
+        start = time.time()
+        paths = batch_files(input_path) if folder else [input_path]
+        if dict_option:
+            dict_id = int(dict_option)
+        else:
+            samples = _dicts.collect_samples(paths)
+            dict_id = _dicts.train(samples)
+            app.print_text(f"Trained dictionary {dict_id} from {len(samples)} files\n", 'info')
+        if folder:
+            meter = Meter(app, "Compressing")
+            orig, comp = compress_batch(paths, level, dict_id, meter, cancelled)
+            count = len(paths)
+        else:
+            output_path = input_path + '.zst'
+            orig = os.path.getsize(input_path)
+            with open(output_path, 'wb', buffering=settings["buffer"]) as fout:
+                meter = Meter(app, "Compressing", orig, lambda done: fout.tell() / done)
+                compress_file(input_path, fout, level, frame_size, orig, meter, cancelled, settings,
+                              dict_data=_dicts.prepared(dict_id, level))
+            if cancelled():
+                os.remove(output_path)
+                app.print_text(f"Compression cancelled, removed {output_path}\n", 'info')
+                return
+            comp = os.path.getsize(output_path)
+            count = 1
+        if cancelled():
+            app.print_text("Compression cancelled, the files done so far keep their .zst\n", 'info')
+            return
+        ratio = comp / orig if orig else 1.0
+        app.print_text(
+            f"Compressed {count} file(s) with dictionary {dict_id}\n"
+            f"Time: {time.time() - start:.2f}s ({meter.average():.1f} MB/s)\n"
+            f"Ratio: {ratio:.2%}\n", 'info'
+        )
+        ding()
+    except Exception as e:
+        if output_path:
+            discard(output_path)
+        app.print_text(f"Compression failed: {e}\n", 'error')
+        nuh_uh()
@@ -1,5 +1,18 @@
 COMMAND_PREFIX = "/"
 
+# how many commands can run in the background at once
+JOB_WORKERS = 4
+
+# warm worker processes for CPU-heavy commands (EXECUTION = "process" in the script)
+PROCESS_WORKERS = 2
+
+# output window: lines kept in scrollback and how often queued text gets drawn
+SCROLLBACK_LINES = 5000
+OUTPUT_FPS = 30
+
+# /taskmanager auto refresh interval in ms (0 = only on "Refresh List")
+TASKMANAGER_REFRESH_MS = 1000
+
 PRESETS = {
     "sunset": {
         "background": "#FF4500",
@@ -6,9 +6,22 @@ import os
 from queue import Queue
 import threading
 
-# Taichi init: OpenGL backend, disable debug for speed
-ti.init(arch=ti.opengl, debug=False)
+# numpy + taichi on every frame, runs in a worker process
+EXECUTION = "process"
+
+# /reload keeps these, ti.init() and the taichi buffers survive an edit of this file
+RELOAD_KEEP = ("_ti_ready", "brightness_map", "out_img")
+
 os.environ["TI_DEBUG"] = "0"
+_ti_ready = False
+
+def init_taichi():
+    # Taichi init: OpenGL backend, disable debug for speed
+    # done on first use instead of at import so /help and the launcher don't pay for it
+    global _ti_ready
+    if not _ti_ready:
+        ti.init(arch=ti.opengl, debug=False)
+        _ti_ready = True
 
 ASCII_CHARS = "█"  # your single glyph
 CACHE_DEPTH = 3
@@ -84,6 +97,8 @@ def frame_to_ascii_single(frame, cols, rows, frame_index):
 def video_to_ascii_gpu_threaded(app, input_path, output_path):
     global brightness_map, out_img
 
+    init_taichi()
+
     cap = cv2.VideoCapture(input_path)
     if not cap.isOpened():
         raise Exception(f"Cannot open video: {input_path}")
@@ -124,8 +139,11 @@ def video_to_ascii_gpu_threaded(app, input_path, output_path):
     frame_count = 0
     start_time = time.time()
     prev_ascii = None
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or None
+    progress = getattr(app, 'progress', None)
+    cancelled = getattr(app, 'cancelled', lambda: False)
 
-    while ret:
+    while ret and not cancelled():
         ascii_frame = frame_to_ascii_single(frame, cols, rows, frame_count)
 
         if ascii_frame is not None:
@@ -138,14 +156,24 @@ def video_to_ascii_gpu_threaded(app, input_path, output_path):
 
         ret, frame = cap.read()
         frame_count += 1
+        if progress:
+            progress(frame_count, total_frames, "frames")
 
     cap.release()
     frame_queue.put(None)
     enc_thread.join()
     out.release()
 
+    if ret:
+        # stopped by /kill before the last frame, what got written is only the start of the video
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        app.print_text(f"Conversion cancelled after {frame_count} frames, removed '{output_path}'\n", 'info')
+        return False
+
     elapsed = time.time() - start_time
     app.print_text(f"Processed {frame_count} frames in {elapsed:.2f}s, avg {elapsed/frame_count:.3f}s/frame\n")
+    return True
 
 def runarg(app, args=None):
     if not args or len(args) < 2:
@@ -158,8 +186,8 @@ def runarg(app, args=None):
     app.print_text(f"Converting video '{input_path}' to ASCII and saving as '{output_path}'...\n", 'info')
 
     try:
-        video_to_ascii_gpu_threaded(app, input_path, output_path)
-        app.print_text("Conversion completed successfully!\n", 'info')
+        if video_to_ascii_gpu_threaded(app, input_path, output_path):
+            app.print_text("Conversion completed successfully!\n", 'info')
     except Exception as e:
         import traceback
         tb = traceback.format_exc()
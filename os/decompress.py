@@ -1,33 +1,137 @@
-import zstandard as zstd
-import os, threading, pygame
+import io, os, tarfile, threading, time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import _archive, _dedup, _dicts, _fastio
+from _sound import ding, nuh_uh
+from _pipeline import ChunkReader
+from _progress import Meter, discard
+from _seekable import SeekTable, parse_size, read_range, scan_frames
 
-pygame.mixer.init()
+EXECUTION = "process"  # worker process, see _procpool.py
+PARALLEL_MEMORY = 1 << 30  # decompressed frames in flight at once, on top of the 2 per thread limit
 
-def ding():
-    def _play():
-        try:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            sounds_dir = os.path.join(script_dir, 'sounds/ding.mp3')
-            pygame.mixer.music.load(sounds_dir)
-            pygame.mixer.music.play()
-        except Exception as e:
-            print(f"Error playing sound: {e}")
-    threading.Thread(target=_play).start()
+def parse_options(options):
+    # --range=START:END (sizes like 4M, either side may be left out), --list, --io and --buffer
+    span, listing = None, False
+    settings = _fastio.defaults()
+    for option in options:
+        name, _, value = option.partition("=")
+        if _fastio.parse_option(name, value, settings):
+            continue
+        if name == "--list" and not value:
+            listing = True
+        elif name == "--range" and ":" in value:
+            start, _, end = value.partition(":")
+            span = parse_size(start) if start else 0, parse_size(end) if end else float("inf")
+        else:
+            raise ValueError(f"Unknown option {option}")
+    return span, listing, settings
+
+def seek_table(f):
+    # in a folder archive the seek table ends where the member index starts
+    found = _archive.index_frame(f)
+    return SeekTable.read(f, found[0] if found else None)
+
+def check_input(path):
+    # every zstd frame in the file as (offset, compressed size, decompressed size or None), from the
+    # frame headers, before anything gets written. None when the file is cut off or isn't zstd: zstd
+    # hands back whatever a cut off file still has without complaining, this is what catches it.
+    # a seek table fills in the sizes headers leave out
+    with open(path, 'rb', buffering=0) as f:
+        frames = scan_frames(f)
+        table = seek_table(f) if frames else None
+    if table is not None and [c_size for _, c_size, _ in frames] == [c_size for c_size, _, _ in table.frames]:
+        frames = [(offset, c_size, d_size) for (offset, c_size, _), (_, d_size, _) in zip(frames, table.frames)]
+    return frames
+
+def content_size(frames):
+    # decompressed size of the whole file, None unless every frame knows its own
+    sizes = [d_size for _, _, d_size in frames]
+    return None if None in sizes else sum(sizes)
+
+def parallel(frames, workers):
+    # frames can go to a thread pool when there are several of them (frames read with pread)
+    return workers > 1 and len(frames) > 1 and _fastio.positional()
+
+def decode_frames(fd, frames, dict_id, workers, write_at=None):
+    # the frames decompressed on a thread pool (zstd lets go of the GIL), handed out in file order.
+    # with write_at(offset, data) every thread puts its frame into place itself and only the sizes
+    # come out, that needs every frame's size up front. at most 2 frames per thread (and about
+    # PARALLEL_MEMORY) are in flight
+    local = threading.local()
 
-def nuh_uh():
-    def _play():
+    def decode(offset, c_size, d_size, out_offset):
+        dctx = getattr(local, 'dctx', None)
+        if dctx is None:
+            dctx = local.dctx = _dicts.decompressor(dict_id)
+        data = os.pread(fd, c_size, offset)
+        if d_size is None:
+            # streamed frame, no size in the header: decompressobj grows its output as it goes
+            data = dctx.decompressobj().decompress(data)
+        else:
+            data = dctx.decompress(data, max_output_size=d_size) if d_size else b''
+            if len(data) != d_size:
+                raise ValueError(f"frame at {offset} gave {len(data)} bytes instead of {d_size}")
+        if write_at is None:
+            return data
+        write_at(out_offset, data)
+        return d_size
+
+    if write_at is not None and content_size(frames) is None:
+        raise ValueError("positional writes need every frame's size")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        in_flight = out_offset = 0
         try:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            sounds_dir = os.path.join(script_dir, 'sounds/nuh_uh.mp3')
-            pygame.mixer.music.load(sounds_dir)
-            pygame.mixer.music.play()
-        except Exception as e:
-            print(f"Error playing sound: {e}")
-    threading.Thread(target=_play).start()
+            for offset, c_size, d_size in frames:
+                estimate = d_size if d_size is not None else 4 * c_size  # unknown: a guess for the budget
+                while pending and (len(pending) >= 2 * workers or in_flight + estimate > PARALLEL_MEMORY):
+                    size, future = pending.popleft()
+                    in_flight -= size
+                    yield future.result()
+                pending.append((estimate, pool.submit(decode, offset, c_size, d_size, out_offset)))
+                in_flight += estimate
+                out_offset += d_size or 0
+            while pending:
+                yield pending.popleft()[1].result()
+        finally:
+            for _, future in pending:
+                future.cancel()  # stopped early (cancel, error), frames not started yet are dropped
+
+def verify_output(path, written, expected):
+    # the source only goes away once this passes
+    if expected is not None and written != expected:
+        raise ValueError(f"got {written} bytes, the frames say {expected}")
+    if os.path.getsize(path) != written:
+        raise ValueError(f"{path} has {os.path.getsize(path)} bytes on disk, {written} were written")
+
+def list_lines(f):
+    # one line per archive member, from the index when there is one
+    members = _archive.read_index(f)
+    if members is None:
+        members = _archive.scan_archive(f)
+    for name, size, mtime, kind, offset in members:
+        stamp = time.strftime("%Y-%m-%d %H:%M", time.localtime(mtime))
+        if kind == tarfile.DIRTYPE.decode():
+            name += "/"
+        yield f"{size:>12}  {stamp}  {name}\n"
 
 def runarg(app, args):
+    # --range=START:END pulls just that part of a seekable archive (compress --seekable) out,
+    # --list shows what's in a .tar.zst. a .tar.zst gets unpacked next to itself, a folder gets all
+    # its .zst files decompressed. dictionaries (compress --dict) are picked up by the id in the frame.
+    # a .zdd manifest (compress --dedup) is put back together from its chunk store.
+    # seekable files (compress --seekable) are decompressed a frame per thread on every core
+    options = [arg for arg in args if arg.startswith("--")]
+    args = [arg for arg in args if not arg.startswith("--")]
     if not args:
-        app.print_text("Usage: /decompress <file.zst>\n", 'info')
+        app.print_text("Usage: /decompress <file.zst> [--range=START:END] [--list] [--io=auto|mmap|read] [--buffer=size]\n", 'info')
+        nuh_uh()
+        return
+    try:
+        span, listing, settings = parse_options(options)
+    except ValueError as e:
+        app.print_text(f"{e}\n", 'error')
         nuh_uh()
         return
 
@@ -35,11 +139,19 @@ def runarg(app, args):
     script_dir = os.path.dirname(os.path.abspath(__file__))
     input_path1 = os.path.join(script_dir, input_path)
 
+    if os.path.isdir(input_path1) and span is None and not listing:
+        decompress_folder(app, input_path1)
+        return
+
     if not os.path.isfile(input_path1):
         app.print_text(f"File not found: {input_path1}\n", 'error')
         nuh_uh()
         return
 
+    if input_path1.endswith('.zdd') and span is None and not listing:
+        restore_dedup(app, input_path1)
+        return
+
     if not input_path1.endswith('.zst'):
         app.print_text("Expected a .zst file\n", 'error')
         nuh_uh()
@@ -47,13 +159,344 @@ def runarg(app, args):
 
     output_path = input_path1[:-4]  # remove .zst
 
+    if listing:
+        try:
+            with open(input_path1, 'rb') as fin:
+                for line in list_lines(fin):
+                    app.print_text(line)
+        except Exception as e:
+            app.print_text(f"Listing failed: {e}\n", 'error')
+            nuh_uh()
+        return
+    if span is not None:
+        extract_range(app, input_path1, output_path, span)
+        return
+    if input_path1.endswith('.tar.zst'):
+        extract_archive(app, input_path1)
+        return
+
+    # only there when running as a launcher job
+    cancelled = getattr(app, 'cancelled', lambda: False)
+
+    try:
+        frames = check_input(input_path1)
+        if frames is None:
+            app.print_text(f"{input_path1} is cut off or not zstd, nothing was written\n", 'error')
+            nuh_uh()
+            return
+        expected = content_size(frames)
+        packed = os.path.getsize(input_path1)
+        meter = Meter(app, "Decompressing", expected, lambda done: packed / meter.total if meter.total else None)
+        written = decompress_file(input_path1, output_path, settings, meter, cancelled, frames)
+        if cancelled():
+            discard(output_path)
+            app.print_text(f"Decompression cancelled, removed {output_path}\n", 'info')
+            return
+        verify_output(output_path, written, expected)
+    except Exception as e:
+        discard(output_path)
+        app.print_text(f"Decompression failed: {e}, {input_path1} is untouched\n", 'error')
+        nuh_uh()
+        return
+    app.print_text(f"Decompressed: {output_path} ({meter.summary()})\n", 'info')
+    ding()
+    os.remove(input_path1)
+
+def decompress_file(input_path, output_path, settings, progress=None, cancelled=lambda: False, frames=None,
+                    workers=None):
+    # files of several frames (compress --seekable, concatenated streams) are decompressed on a
+    # thread pool, see decompress_frames. anything else goes through the --io backend, output straight from
+    # one reused buffer into a preallocated, unbuffered file (see _fastio.py). returns the
+    # decompressed size. frames = check_input's list when the caller has it, workers = threads
+    # for the frames, None = one per cpu
+    if frames is None:
+        frames = check_input(input_path) or []
+    workers = workers or os.cpu_count() or 1
+    if parallel(frames, workers):
+        return decompress_frames(input_path, output_path, frames, workers, progress, cancelled)
+    expected = content_size(frames) or 0
+    total = os.path.getsize(input_path)
+    with open(input_path, 'rb') as fin:
+        dctx = _dicts.decompressor_for(fin)
+        with _fastio.mapped(fin, settings["io"]) as source, open(output_path, 'wb', buffering=0) as fout:
+            preallocated = _fastio.preallocate(fout, expected)
+            reader = dctx.stream_reader(source, read_size=settings["buffer"], read_across_frames=True)
+            buf = bytearray(settings["buffer"])
+            view = memoryview(buf)
+            done = 0
+            while not cancelled():
+                n = reader.readinto(buf)
+                if not n:
+                    break
+                _fastio.write_all(fout, view[:n])
+                done += n
+                if progress:
+                    # without a size in the headers, estimated from how far into the input zstd is
+                    progress(done, expected or done * total // max(source.tell(), 1))
+            if preallocated:
+                fout.truncate(done)
+    return done
+
+def decompress_frames(input_path, output_path, frames, workers, progress=None, cancelled=lambda: False):
+    # every thread reads its frame with pread. when all the sizes are known each one also writes its
+    # frame where it belongs with pwrite, into output preallocated to its final size. otherwise
+    # (streamed frames without a size) the frames come back in order and are appended here.
+    # progress follows the frames in order
+    expected = content_size(frames)
+    total = sum(c_size for _, c_size, _ in frames)
+    with open(input_path, 'rb') as fin, open(output_path, 'wb', buffering=0) as fout:
+        dict_id = _dicts.frame_dict_id(fin)
+        if expected is not None:
+            _fastio.preallocate(fout, expected)
+            out = fout.fileno()
+            blocks = decode_frames(fin.fileno(), frames, dict_id, workers,
+                                   lambda offset, data: _fastio.write_at(out, offset, data))
+        else:
+            blocks = decode_frames(fin.fileno(), frames, dict_id, workers)
+        done = consumed = 0
+        try:
+            for (_, c_size, _), block in zip(frames, blocks):
+                if expected is None:
+                    _fastio.write_all(fout, memoryview(block))
+                    block = len(block)
+                done += block
+                consumed += c_size
+                if progress:
+                    # without sizes in the headers the total is estimated from the input done so far
+                    progress(done, expected or done * total // max(consumed, 1))
+                if cancelled():
+                    break
+        finally:
+            blocks.close()
+    return done
+
+def extract_range(app, input_path, output_path, span):
+    # only the frames overlapping the range get read and decompressed
+    start, end = span
+    try:
+        with open(input_path, 'rb') as fin:
+            dctx = _dicts.decompressor_for(fin)
+            table = seek_table(fin)
+            if table is None:
+                app.print_text("--range needs a seekable archive (/compress <file> <level> --seekable)\n", 'error')
+                nuh_uh()
+                return
+            end = min(end, table.decompressed_size)
+            part_path = f"{output_path}.{start}-{end}"
+            written = 0
+            with open(part_path, 'wb') as fout:
+                for block in read_range(fin, table, dctx, start, end):
+                    fout.write(block)
+                    written += len(block)
+        app.print_text(f"Extracted {written} bytes ({start}-{end}) to {part_path}\n", 'info')
+        ding()
+    except Exception as e:
+        app.print_text(f"Decompression failed: {e}\n", 'error')
+        nuh_uh()
+
+def restore_dedup(app, manifest_path):
+    # every file in the manifest back next to it, chunks are checked against their hash on the way
+    cancelled = getattr(app, 'cancelled', lambda: False)
+    dest = os.path.dirname(manifest_path)
+    path = None
     try:
-        dctx = zstd.ZstdDecompressor()
-        with open(input_path1, 'rb') as fin, open(output_path, 'wb') as fout:
-            dctx.copy_stream(fin, fout)
-        app.print_text(f"Decompressed: {output_path}\n", 'info')
+        store, files = _dedup.read_manifest(manifest_path)
+        total = sum(entry["size"] for entry in files)
+        meter = Meter(app, "Restoring", total)
+        done = 0
+        for entry in files:
+            path = os.path.normpath(os.path.join(dest, entry["name"]))
+            if os.path.isabs(entry["name"]) or not path.startswith(os.path.join(dest, "")):
+                path = None
+                raise ValueError(f"{entry['name']} would land outside {dest}")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as fout:
+                for key, size in entry["chunks"]:
+                    if cancelled():
+                        break
+                    fout.write(store.get(key, size))
+                    done += size
+                    meter(done)
+            if cancelled():
+                discard(path)
+                app.print_text(f"Restore cancelled, removed the half restored {path}\n", 'info')
+                return
+            verify_output(path, sum(size for _, size in entry["chunks"]), entry["size"])
+            os.chmod(path, entry["mode"])
+            os.utime(path, (entry["mtime"], entry["mtime"]))
+            path = None
+        app.print_text(f"Restored {len(files)} file(s) from {store.path} ({meter.summary()})\n", 'info')
         ding()
-        os.remove(input_path1)
+        os.remove(manifest_path)
     except Exception as e:
+        if path:
+            discard(path)
         app.print_text(f"Decompression failed: {e}\n", 'error')
-        nuh_uh()
\ No newline at end of file
+        nuh_uh()
+
+def decompress_folder(app, folder):
+    # every .zst in the folder (not .tar.zst archives), one decompressor per dictionary for all of them.
+    # all of them are checked first, a cut off one stops the command before anything is written
+    cancelled = getattr(app, 'cancelled', lambda: False)
+    paths = []
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        paths.extend(os.path.join(root, name) for name in sorted(files)
+                     if name.endswith('.zst') and not name.endswith('.tar.zst'))
+    contexts = {}
+    done = written = consumed = 0
+    output_path = None
+    try:
+        sizes = []
+        for path in paths:
+            frames = check_input(path)
+            if frames is None:
+                raise ValueError(f"{path} is cut off or not zstd")
+            sizes.append(content_size(frames))
+        total = None if None in sizes else sum(sizes)
+        meter = Meter(app, "Decompressing", total, lambda done: consumed / done if consumed else None)
+        for path, expected in zip(paths, sizes):
+            if cancelled():
+                break
+            output_path = path[:-4]
+            n = 0
+            with open(path, 'rb') as fin:
+                dict_id = _dicts.frame_dict_id(fin)
+                if dict_id not in contexts:
+                    contexts[dict_id] = _dicts.decompressor(dict_id)
+                with open(output_path, 'wb') as fout:
+                    reader = contexts[dict_id].stream_reader(fin, read_across_frames=True)
+                    for chunk in iter(lambda: reader.read(1 << 20), b''):
+                        fout.write(chunk)
+                        n += len(chunk)
+                        meter(written + n)
+                        if cancelled():
+                            break
+                consumed += fin.tell()
+            if cancelled():
+                discard(output_path)
+                break
+            verify_output(output_path, n, expected)
+            output_path = None
+            os.remove(path)
+            written += n
+            done += 1
+        if cancelled():
+            app.print_text(f"Decompression cancelled after {done} files, the one in progress was removed\n", 'info')
+            return
+        app.print_text(f"Decompressed {done} files in {folder} ({meter.summary()})\n", 'info')
+        ding()
+    except Exception as e:
+        if output_path:
+            discard(output_path)
+        app.print_text(f"Decompression failed after {done} files: {e}\n", 'error')
+        nuh_uh()
+
+def extract_archive(app, input_path):
+    # unpacks into the folder the archive is in (members start with the archived folder's name).
+    # a seekable archive's frames are decompressed on a thread pool ahead of the tar reader
+    cancelled = getattr(app, 'cancelled', lambda: False)
+    dest = os.path.dirname(input_path)
+    # refuses absolute paths, .. and links pointing out of dest where python has it
+    extract_filter = getattr(tarfile, 'data_filter', None)
+    partial = None
+    try:
+        frames = check_input(input_path)
+        if frames is None:
+            app.print_text(f"{input_path} is cut off or not zstd, nothing was extracted\n", 'error')
+            nuh_uh()
+            return
+        expected = content_size(frames)
+        workers = os.cpu_count() or 1
+        total = os.path.getsize(input_path)
+        count = 0
+        meter = Meter(app, "Extracting", expected, lambda done: total / meter.total if meter.total else None)
+        with open(input_path, 'rb') as fin:
+            listed = _archive.read_index(fin)
+            fin.seek(0)
+            dict_id = _dicts.frame_dict_id(fin)
+            if parallel(frames, workers):
+                reader = io.BufferedReader(ChunkReader(decode_frames(fin.fileno(), frames, dict_id, workers)))
+            else:
+                reader = _dicts.decompressor(dict_id).stream_reader(fin, read_across_frames=True)
+            with reader, tarfile.open(fileobj=reader, mode="r|") as tar:
+                for member in tar:
+                    if cancelled():
+                        app.print_text(f"Extraction cancelled after {count} entries, those stay\n", 'info')
+                        return
+                    # a member that fails halfway is removed again, finished ones are whole
+                    partial = os.path.join(dest, member.name) if member.isfile() else None
+                    if extract_filter:
+                        tar.extract(member, dest, filter=extract_filter)
+                    else:
+                        tar.extract(member, dest)
+                    partial = None
+                    count += 1
+                    # tar bytes; without a size in the headers the total is estimated from the input read so far
+                    meter(tar.offset, expected or tar.offset * total // max(fin.tell(), 1))
+        if listed is not None and len(listed) != count:
+            raise ValueError(f"the index lists {len(listed)} entries, the archive had {count}")
+    except Exception as e:
+        if partial:
+            discard(partial)
+        app.print_text(f"Decompression failed: {e}, {input_path} is untouched\n", 'error')
+        nuh_uh()
+        return
+    app.print_text(f"Extracted {count} entries to {dest} ({meter.summary()})\n", 'info')
+    ding()
+    os.remove(input_path)
+
+def stream(app, args, chunks):
+    # pipeline version: decompressed bytes go to the next stage, nothing is written or deleted.
+    # input is the file argument, or the compressed bytes coming down the pipe
+    options = [arg for arg in args if arg.startswith("--")]
+    args = [arg for arg in args if not arg.startswith("--")]
+    try:
+        span, listing, settings = parse_options(options)
+    except ValueError as e:
+        app.print_text(f"{e}\n", 'error')
+        nuh_uh()
+        return
+    if chunks is None:
+        if not args:
+            app.print_text("Usage: /decompress <file.zst> [--range=START:END] [--list] [--io=auto|mmap|read] [--buffer=size]\n", 'info')
+            nuh_uh()
+            return
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        path = os.path.join(script_dir, " ".join(args).strip('"').strip("'"))
+        if path.endswith('.zdd'):
+            # a manifest streams its files' chunks one after the other
+            store, files = _dedup.read_manifest(path)
+            for entry in files:
+                for key, size in entry["chunks"]:
+                    yield store.get(key, size)
+            return
+        source = open(path, 'rb')
+        if listing:
+            with source:
+                yield from list_lines(source)
+            return
+        if span is not None:
+            with source:
+                dctx = _dicts.decompressor_for(source)
+                table = seek_table(source)
+                if table is None:
+                    app.print_text("--range needs a seekable archive (/compress <file> <level> --seekable)\n", 'error')
+                    nuh_uh()
+                    return
+                yield from read_range(source, table, dctx, *span)
+            return
+    elif span is not None or listing:
+        app.print_text("--range and --list need a file, they can't seek in piped input\n", 'error')
+        nuh_uh()
+        return
+    else:
+        source = io.BufferedReader(ChunkReader(chunks))
+    with source:
+        frames = check_input(path) if chunks is None else None
+        workers = os.cpu_count() or 1
+        if frames and parallel(frames, workers):
+            yield from decode_frames(source.fileno(), frames, _dicts.frame_dict_id(source), workers)
+            return
+        reader = _dicts.decompressor_for(source).stream_reader(source, read_across_frames=True)
+        yield from iter(lambda: reader.read(settings["buffer"]), b'')
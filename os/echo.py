@@ -1,18 +1,9 @@
-import pygame, threading, os
-
-pygame.mixer.init()
-
-def ding():
-    def _play():
-        try:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            sounds_dir = os.path.join(script_dir, 'sounds/ding.mp3')
-            pygame.mixer.music.load(sounds_dir)
-            pygame.mixer.music.play()
-        except Exception as e:
-            print(f"Error playing sound: {e}")
-    threading.Thread(target=_play).start()
+from _sound import ding
 
 def runarg(app, args):
     app.print_text("Echo: " + " ".join(args) + "\n", 'info')
-    ding()
\ No newline at end of file
+    ding()
+
+def stream(app, args, chunks):
+    # pipeline version, `/echo hi | /open`
+    yield " ".join(args) + "\n"
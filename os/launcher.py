@@ -1,46 +1,33 @@
 # all scripts MUST be in the same directory
 
+import sys
+# process pool workers (spawn) import this file as __mp_main__ with the same argv, they must not profile
+if __name__ == "__main__" and "--profile-startup" in sys.argv:
+    # has to go in before every other import so those get timed too
+    import _profile
+    _profile.start()
+
 import tkinter as tk
-import importlib, config, os, sys, platform, psutil, traceback, taskmanager, threading, pygame
-
-pygame.mixer.init()
-
-def ding():
-    def _play():
-        try:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            sounds_dir = os.path.join(script_dir, 'sounds/ding.mp3')
-            pygame.mixer.music.load(sounds_dir)
-            pygame.mixer.music.play()
-        except Exception as e:
-            print(f"Error playing sound: {e}")
-    threading.Thread(target=_play).start()
-
-def nuh_uh():
-    def _play():
-        try:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            sounds_dir = os.path.join(script_dir, 'sounds/nuh_uh.mp3')
-            pygame.mixer.music.load(sounds_dir)
-            pygame.mixer.music.play()
-        except Exception as e:
-            print(f"Error playing sound: {e}")
-    threading.Thread(target=_play).start()
+import config, traceback, _profile
+from _registry import CommandRegistry
+from _jobs import JobScheduler
+from _procpool import ProcessRunner
+from _shell import CommandShell
+from _stats import StatsRecorder
+from _output import OutputBuffer
+from _sound import nuh_uh
 
 def load_commands():
-    cmds = {}
-    base_dir = os.path.dirname(__file__) if not getattr(sys, 'frozen', False) else os.path.dirname(sys.executable)
-    for filename in os.listdir(base_dir):
-        if filename.endswith(".py") and filename.lower() not in ("launcher.py", "config.py") and not filename.startswith("_"):
-            module_name = filename[:-3]
-            cmds[module_name.lower()] = module_name  # store lowercase keys
-    return cmds
-
-commands = load_commands()
-
-class MiniCMD(tk.Tk):
-    def __init__(self):
+    # builds/validates the cached manifest, nothing gets imported here. called from __main__ only:
+    # pool workers re-import this file and shouldn't scan the folder again
+    with _profile.span("command registry"):
+        return CommandRegistry().refresh()
+
+class MiniCMD(CommandShell, tk.Tk):
+    def __init__(self, commands):
         super().__init__()
+        self.commands = commands
+        self.stats = StatsRecorder()
         self.current_preset_name = config.DEFAULT_PRESET
         self.colors = config.PRESETS[self.current_preset_name]
 
@@ -52,6 +39,7 @@ class MiniCMD(tk.Tk):
                               insertbackground=self.colors['text_default'],
                               font=self.colors['font'], relief='flat', borderwidth=0, wrap='word')
         self.output.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
+        self.out = OutputBuffer(self.output, max_lines=config.SCROLLBACK_LINES, fps=config.OUTPUT_FPS)
 
         self.output.tag_config('user_cmd', foreground=self.colors['text_user_cmd'])
         self.output.tag_config('info', foreground=self.colors['text_info'])
@@ -86,16 +74,30 @@ class MiniCMD(tk.Tk):
             f"Type {config.COMMAND_PREFIX}help or {config.COMMAND_PREFIX}exit.\n", 'info'
         )
 
+        self.jobs = JobScheduler(self, max_workers=config.JOB_WORKERS)
+        self.processes = ProcessRunner(max_workers=config.PROCESS_WORKERS, directory=self.commands.directory)
+
+        # warm up cv2/numpy/zstandard/... in the background once the shell sits idle
+        self.input.bind('<Key>', lambda e: self.commands.note_activity(), add='+')
+        self.after_idle(self.commands.start_prefetch)
+
     def print_text(self, text, tag='normal'):
-        self.output.config(state='normal')
-        self.output.insert(tk.END, text, tag)
-        self.output.see(tk.END)
-        self.output.config(state='disabled')
+        # queued, the buffer draws it with the next frame (safe from job threads too)
+        self.out.write(text, tag)
 
     def clear_output(self):
-        self.output.config(state='normal')
-        self.output.delete('1.0', tk.END)
-        self.output.config(state='disabled')
+        self.out.clear()
+
+    def set_scrollback(self, args):
+        if not args:
+            self.print_text(f"Scrollback: {self.out.max_lines} lines ({self.out.line_count()} in use)\n", 'info')
+            return True
+        if len(args) != 1 or not args[0].isdigit() or int(args[0]) < 1:
+            self.print_text(f"Usage: {config.COMMAND_PREFIX}scrollback <lines>\n", 'info')
+            return False
+        self.out.set_max_lines(int(args[0]))
+        self.print_text(f"Scrollback set to {self.out.max_lines} lines.\n", 'info')
+        return True
 
     def apply_preset(self, preset_name):
         if preset_name not in config.PRESETS:
@@ -128,124 +130,89 @@ class MiniCMD(tk.Tk):
 
         self.print_text(f"Switched to preset '{preset_name}'.\n", 'info')
 
-    def show_info(self):
-        uname = platform.uname()
-        information = [
-            f"System    : {uname.system}",
-            f"Node      : {uname.node}",
-            f"Release   : {uname.release}",
-            f"Version   : {uname.version}",
-            f"Machine   : {uname.machine}",
-            f"Processor : {uname.processor}",
-            f"RAM       : {round(psutil.virtual_memory().total / (1024 ** 3), 2)} GB",
-            f"Disk      : {round(psutil.disk_usage('/').total / (1024 ** 3), 2)} GB"
-        ]
-
-        smiley = [
-            "     _______  ",
-            "    /       \\ ",
-            "   | (•) (•) |",
-            "   |    ^    |",
-            "   |  \\___/  |",
-            "    \\_______/ ",
-            ""
-        ]
-
-        self.print_text("\n".join(information) + "\n" + "\n".join(smiley))
-
     def process_command(self, event=None):
         cmd = self.input.get().strip()
+        self.commands.note_activity()
         self.print_text(f"> {cmd}\n", 'user_cmd')
         self.input.delete(0, tk.END)
+        self.execute(cmd)
 
-        if not cmd.startswith(config.COMMAND_PREFIX):
-            self.print_text(f"Use prefix '{config.COMMAND_PREFIX}'\n", 'error')
-            nuh_uh()
-            return
+    def request_exit(self):
+        self.after(1000, self.destroy)
 
-        parts = cmd[len(config.COMMAND_PREFIX):].split()
-        if not parts:
+    def wait_for_job(self, job):
+        # the shell equivalent of bringing a job to the foreground: no new commands until it ends
+        if not job.active:
+            self.print_text(f"[{job.id}] already {job.state}.\n", 'info')
             return
-
-        command = parts[0].lower()
-        args = parts[1:]
-
-        if command == "exit":
-            self.print_text("Bye!\n", 'info')
-            self.after(1000, self.destroy)
-        elif command == "calculator":
-            try:
-                import calculator
-                calculator.run(self, preset=self.colors)
-                ding()
-            except Exception as e:
-                self.print_text(f"Failed to launch calculator: {e}\n", 'error')
-                traceback.print_exc()
-                nuh_uh()
-        elif command == "help":
-            cmds_list = list(commands.keys()) + \
-                        ["info"] + \
-                        [f"preset {preset}" for preset in config.ALL_PRESETS] + \
-                        ["help", "exit", "clear"]
-
-            self.print_text("Available commands:\n" + "\n".join(sorted(cmds_list)) + "\n")
-            ding()
-        elif command == "info":
-            self.show_info()
-            ding()
-        elif command == "preset" and len(args) == 1:
-            self.apply_preset(args[0])
-            ding()
-        elif command == "clear":
-            self.clear_output()
-            ding()
-        elif command == "taskmanager":
-            try:
-                taskmanager.TaskManager(self, self.colors)
-                ding()
-            except Exception as e:
-                self.print_text(f"Error launching taskmanager: {e}\n", 'error')
-                traceback.print_exc()
-                nuh_uh()
-        elif command in commands:
-            self.run_script(command, args)
-            # here was supposed to be a ding() function tho if the script errors inside itself the ding will play but the error will appear so idk ill put the sounds inside the scripts and only the necessary ones will be in this launcher.py
+        self.print_text(f"Waiting for [{job.id}] {job.command}...\n", 'info')
+        self.input.config(state='disabled')
+
+        def _done(job):
+            self.input.config(state='normal')
+            self.input.focus()
+            self.print_text(f"[{job.id}] {job.state} after {job.elapsed():.1f}s\n", 'info')
+
+        self.jobs.when_done(job, _done)
+
+def parse_args(argv):
+    import argparse
+    parser = argparse.ArgumentParser(description="bababoiOS launcher")
+    parser.add_argument("--batch", metavar="SCRIPT",
+                        help="run the commands in SCRIPT ('-' for stdin) without a window and exit")
+    parser.add_argument("--json", action="store_true", help="batch mode: print output and results as JSON lines")
+    parser.add_argument("--fail-fast", action="store_true", help="batch mode: stop at the first failed command")
+    parser.add_argument("--repeat", type=int, default=1, help="batch mode: run the script N times (for timing)")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="time imports and startup phases, see /profile imports")
+    parser.add_argument("--profile-exit", action="store_true",
+                        help="with --profile-startup: write the report after the first paint and quit")
+    parser.add_argument("--profile-sort", choices=_profile.SORT_KEYS, default="cumulative")
+    return parser.parse_args(argv)
+
+def watch_first_paint(app, options):
+    profiler = _profile.active()
+
+    def _painted():
+        profiler.mark("first paint")
+        report, trace = profiler.save(app.commands.directory, sort=options.profile_sort)
+        if options.profile_exit:
+            app.destroy()
         else:
-            self.print_text(f"Unknown command: {command}\n", 'error')
-            nuh_uh()
-
-    def run_script(self, command, args):
-        module_name = commands.get(command.lower())
-        if not module_name:
-            self.print_text(f"Command '{command}' not found.\n", 'error')
-            nuh_uh()
-            return
+            app.print_text(f"Startup took {profiler.total() * 1000:.0f} ms, report: {report}, trace: {trace}\n", 'info')
 
-        try:
-            module = importlib.import_module(module_name)
-            if hasattr(module, 'runarg'):
-                module.runarg(self, args)
-                # again here
-            elif hasattr(module, 'run'):
-                module.run(self)
-                # and again here aswell
-            else:
-                self.print_text(f"No `run()` or `runarg()` in '{module_name}'.\n", 'error')
-                nuh_uh()
-        except ImportError as e:
-            self.print_text(f"Import error: {e}\n", 'error')
-            nuh_uh()
-        except Exception as e:
-            self.print_text(f"Error running command '{module_name}': {e}\n", 'error')
-            traceback.print_exc()
-            nuh_uh()
+    def _mapped(event):
+        if event.widget is app:
+            app.unbind('<Map>')
+            # <Map> = window is on screen, the idle callback after it = first frame drawn
+            app.after_idle(_painted)
+
+    app.bind('<Map>', _mapped)
 
 if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()  # the process pool re-launches the frozen exe
+    options = parse_args(sys.argv[1:])
+    commands = load_commands()
+    if options.batch:
+        import _batch, _sound
+        _sound.disable()
+        code = _batch.main(commands, options.batch, json_output=options.json,
+                           fail_fast=options.fail_fast, repeat=options.repeat)
+        if _profile.active():
+            report, trace = _profile.active().save(commands.directory, sort=options.profile_sort)
+            sys.stderr.write(f"Profile: {report}, trace: {trace}\n")
+        sys.exit(code)
+
     try:
-        app = MiniCMD()
+        with _profile.span("Tk construction"):
+            app = MiniCMD(commands)
+        if _profile.active():
+            watch_first_paint(app, options)
         app.mainloop()
     except Exception as e:
         print("Unhandled exception:", e)
         traceback.print_exc()
         nuh_uh()
-    input("Press Enter to exit...")
+    if not options.profile_exit:
+        input("Press Enter to exit...")
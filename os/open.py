@@ -1,28 +1,5 @@
-import os, threading, pygame
-
-pygame.mixer.init()
-
-def ding():
-    def _play():
-        try:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            sounds_dir = os.path.join(script_dir, 'sounds/ding.mp3')
-            pygame.mixer.music.load(sounds_dir)
-            pygame.mixer.music.play()
-        except Exception as e:
-            print(f"Error playing sound: {e}")
-    threading.Thread(target=_play).start()
-
-def nuh_uh():
-    def _play():
-        try:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            sounds_dir = os.path.join(script_dir, 'sounds/nuh_uh.mp3')
-            pygame.mixer.music.load(sounds_dir)
-            pygame.mixer.music.play()
-        except Exception as e:
-            print(f"Error playing sound: {e}")
-    threading.Thread(target=_play).start()
+import os
+from _sound import ding, nuh_uh
 
 def runarg(app, args):
     if not args or len(args) < 1:
@@ -43,3 +20,17 @@ def runarg(app, args):
             text = f.read()
             app.print_text(str(text) + '\n')
             ding()
+
+def stream(app, args, chunks):
+    # at the end of a pipeline /open just shows what comes in, `/decompress notes.txt.zst | /open`
+    if chunks is not None:
+        yield from chunks
+        return
+    if not args or not args[0].lower().endswith(".txt"):
+        app.print_text("Usage: /open <.txt_path>\n", 'info')
+        nuh_uh()
+        return
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(script_dir, args[0]), "r", encoding="utf-8") as f:
+        for block in iter(lambda: f.read(1 << 16), ""):
+            yield block
@@ -1,21 +1,233 @@
 import tkinter as tk
-from tkinter import messagebox
+import tkinter.font as tkfont
+from tkinter import filedialog, messagebox, simpledialog
+import re
+import threading
+import time
 import psutil
+import config
+from _procmon import ProcessSampler, ProcessView, match_processes, terminate
+
+TOP_N = 25
+
+# seconds between SIGTERM and SIGKILL when killing
+KILL_TIMEOUT = 3.0
+
+# (title, sort key or None, width in characters - 0 = whatever is left)
+COLUMNS = [
+    ("PID", "pid", 8),
+    ("CPU %", "cpu", 8),
+    ("MEM", "mem", 10),
+    ("THR", None, 6),
+    ("STATUS", None, 10),
+    ("USER", None, 11),
+    ("CPU HISTORY", None, 18),
+    ("NAME", "name", 0),
+]
+
+def _mem(rss):
+    mb = rss / (1024 * 1024)
+    return f"{mb / 1024:.2f} GB" if mb >= 1024 else f"{mb:.1f} MB"
+
+def _cells(p, spark="", cpu=None, rss=None, name=None):
+    cpu = p.cpu if cpu is None else cpu
+    rss = p.rss if rss is None else rss
+    return (str(p.pid), f"{cpu:.1f}", _mem(rss), str(p.threads), p.status, p.user[:10], spark, name or p.name)
+
+class VirtualTable(tk.Frame):
+    # a canvas with just enough text items for the rows that fit in the window, reused while
+    # scrolling - 50 000 processes cost the same to draw as 50
+    def __init__(self, master, colors, on_sort, on_toggle):
+        super().__init__(master, bg=colors['background'])
+        self.colors = colors
+        self.on_sort = on_sort
+        self.on_toggle = on_toggle  # collapse/expand a row in tree mode
+        self.font = tkfont.Font(font=colors['font'])
+        self.row_height = self.font.metrics("linespace") + 2
+        self.columns_x = []
+        x = 4
+        for title, key, width in COLUMNS:
+            self.columns_x.append(x)
+            x += width * self.font.measure("0")
+
+        self.rows = []      # pids in display order
+        self.cells = None   # pid -> tuple of column texts, None when the pid is gone
+        self.top = 0        # index of the first visible row
+        self.selected = set()  # Ctrl+click adds/removes, Shift+click selects a range
+        self.anchor = None      # last plainly clicked row, the one Enter/tree toggling acts on
+        self._lines = []    # per visible line: (background rectangle, [text item per column])
+
+        self.header = tk.Canvas(self, height=self.row_height, bg=colors['background'], highlightthickness=0)
+        self.header.pack(fill=tk.X)
+        self._header_items = [self.header.create_text(x, self.row_height // 2, anchor='w', text=title,
+                                                      font=self.font, fill=colors['text_info'])
+                              for x, (title, key, width) in zip(self.columns_x, COLUMNS)]
+        self.header.bind("<Button-1>", self._header_click)
+
+        body = tk.Frame(self, bg=colors['background'])
+        body.pack(fill=tk.BOTH, expand=True)
+        self.scrollbar = tk.Scrollbar(body, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas = tk.Canvas(body, bg=colors['background'], highlightthickness=0, takefocus=1)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.canvas.bind("<Configure>", self._layout)
+        self.canvas.bind("<Button-1>", self._click)
+        self.canvas.bind("<Double-Button-1>", lambda e: self._toggle())
+        self.canvas.bind("<Return>", lambda e: self._toggle())
+        self.canvas.bind("<Left>", lambda e: self._toggle())
+        self.canvas.bind("<Right>", lambda e: self._toggle())
+        self.canvas.bind("<MouseWheel>", lambda e: self.yview("scroll", -3 if e.delta > 0 else 3, "units"))
+        self.canvas.bind("<Button-4>", lambda e: self.yview("scroll", -3, "units"))
+        self.canvas.bind("<Button-5>", lambda e: self.yview("scroll", 3, "units"))
+        self.canvas.bind("<Up>", lambda e: self.move_selection(-1))
+        self.canvas.bind("<Down>", lambda e: self.move_selection(1))
+        self.canvas.bind("<Prior>", lambda e: self.yview("scroll", -1, "pages"))
+        self.canvas.bind("<Next>", lambda e: self.yview("scroll", 1, "pages"))
+
+    def visible(self):
+        return len(self._lines)
+
+    def _layout(self, event=None):
+        # one canvas line per row that fits, created/removed only when the window is resized
+        wanted = max(1, self.canvas.winfo_height() // self.row_height + 1)
+        width = self.canvas.winfo_width()
+        while len(self._lines) < wanted:
+            y = len(self._lines) * self.row_height
+            rect = self.canvas.create_rectangle(0, y, width, y + self.row_height, width=0,
+                                                fill=self.colors['background'])
+            texts = [self.canvas.create_text(x, y + self.row_height // 2, anchor='w', font=self.font,
+                                             fill=self.colors['text_default'])
+                     for x in self.columns_x]
+            self._lines.append((rect, texts))
+        while len(self._lines) > wanted:
+            rect, texts = self._lines.pop()
+            self.canvas.delete(rect, *texts)
+        for rect, texts in self._lines:
+            x0, y0, x1, y1 = self.canvas.coords(rect)
+            self.canvas.coords(rect, 0, y0, width, y1)
+        self.draw()
+
+    def set_headers(self, sort_key, descending):
+        for item, (title, key, width) in zip(self._header_items, COLUMNS):
+            arrow = (" v" if descending else " ^") if key == sort_key else ""
+            self.header.itemconfigure(item, text=title + arrow)
+
+    def show(self, rows, cells):
+        self.rows = rows
+        self.cells = cells
+        self.draw()
+
+    def draw(self):
+        total = len(self.rows)
+        # a partially visible last line doesn't count as a full row for scrolling
+        self.top = max(0, min(self.top, total - max(self.visible() - 1, 1)))
+        canvas = self.canvas
+        for offset, (rect, texts) in enumerate(self._lines):
+            index = self.top + offset
+            pid = self.rows[index] if index < total else None
+            values = self.cells(pid) if pid is not None else None
+            if values is None:
+                canvas.itemconfigure(rect, state='hidden')
+                for item in texts:
+                    canvas.itemconfigure(item, state='hidden')
+                continue
+            selected = pid in self.selected
+            canvas.itemconfigure(rect, state='normal',
+                                 fill=self.colors['text_user_cmd'] if selected else self.colors['background'])
+            color = self.colors['background'] if selected else self.colors['text_default']
+            for item, value in zip(texts, values):
+                canvas.itemconfigure(item, state='normal', text=value, fill=color)
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + self.visible()) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def yview(self, *args):
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * len(self.rows))
+        elif args[0] == "scroll":
+            step = max(self.visible() - 1, 1) if args[2] == "pages" else 1
+            self.top += int(args[1]) * step
+        self.draw()
+
+    def _header_click(self, event):
+        for x, (title, key, width) in reversed(list(zip(self.columns_x, COLUMNS))):
+            if event.x >= x:
+                if key:
+                    self.on_sort(key)
+                return
+
+    def _toggle(self):
+        if self.anchor is not None:
+            self.on_toggle(self.anchor)
+
+    def _click(self, event):
+        self.canvas.focus_set()
+        index = self.top + int(event.y // self.row_height)
+        if index >= len(self.rows):
+            return
+        pid = self.rows[index]
+        if event.state & 0x0004:  # Ctrl
+            self.selected ^= {pid}
+            self.anchor = pid
+        elif event.state & 0x0001 and self.anchor in self.rows:  # Shift
+            start = self.rows.index(self.anchor)
+            low, high = min(start, index), max(start, index)
+            self.selected = set(self.rows[low:high + 1])
+        else:
+            self.selected = {pid}
+            self.anchor = pid
+        self.draw()
+
+    def move_selection(self, step):
+        if not self.rows:
+            return
+        index = self.rows.index(self.anchor) + step if self.anchor in self.rows else 0
+        index = max(0, min(index, len(self.rows) - 1))
+        self.anchor = self.rows[index]
+        self.selected = {self.anchor}
+        # keep it on screen
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + self.visible() - 1:
+            self.top = index - self.visible() + 2
+        self.draw()
 
 class TaskManager(tk.Toplevel):
     def __init__(self, master, colors):
         super().__init__(master)
         self.title("Task Manager")
-        self.geometry("600x400")
+        self.geometry("900x480")
         self.colors = colors
 
         self.configure(bg=self.colors['background'])
 
-        self.proc_listbox = tk.Listbox(self, selectmode=tk.SINGLE, font=self.colors['font'],
-                                       bg=self.colors['background'], fg=self.colors['text_default'],
-                                       highlightbackground=self.colors['background'],
-                                       selectbackground=self.colors['text_user_cmd'])
-        self.proc_listbox.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        filter_frame = tk.Frame(self, bg=self.colors['background'])
+        filter_frame.pack(fill=tk.X, padx=10, pady=(10,0))
+        tk.Label(filter_frame, text="Filter (text or re:regex)", bg=self.colors['background'],
+                 fg=self.colors['text_info'], font=self.colors['font']).pack(side=tk.LEFT, padx=(0,5))
+        self.filter_text = tk.StringVar()
+        self.filter_entry = tk.Entry(filter_frame, textvariable=self.filter_text, font=self.colors['font'],
+                                     bg=self.colors['background'], fg=self.colors['text_default'],
+                                     insertbackground=self.colors['text_default'], relief='flat')
+        self.filter_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.top_only = tk.BooleanVar(value=False)
+        tk.Checkbutton(filter_frame, text=f"Top {TOP_N}", variable=self.top_only, command=self.toggle_top,
+                       bg=self.colors['background'], fg=self.colors['text_default'],
+                       selectcolor=self.colors['background'], activebackground=self.colors['background'],
+                       font=self.colors['font']).pack(side=tk.LEFT, padx=(10,0))
+        # tree: cpu/mem columns show the whole subtree, double click or Enter collapses/expands
+        self.tree_mode = tk.BooleanVar(value=False)
+        tk.Checkbutton(filter_frame, text="Tree", variable=self.tree_mode, command=self.toggle_tree,
+                       bg=self.colors['background'], fg=self.colors['text_default'],
+                       selectcolor=self.colors['background'], activebackground=self.colors['background'],
+                       font=self.colors['font']).pack(side=tk.LEFT, padx=(10,0))
+
+        self.view = ProcessView()
+        self.table = VirtualTable(self, self.colors, self.sort_by, self.toggle_row)
+        self.table.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.table.set_headers(self.view.sort_key, self.view.descending)
 
         btn_frame = tk.Frame(self, bg=self.colors['background'])
         btn_frame.pack(fill=tk.X, padx=10, pady=(0,10))
@@ -26,51 +238,246 @@ class TaskManager(tk.Toplevel):
                                   relief='flat')
         self.kill_btn.pack(side=tk.LEFT)
 
+        self.kill_tree_btn = tk.Button(btn_frame, text="Kill Tree", command=self.kill_tree,
+                                       bg=self.colors['background'], fg=self.colors['text_default'],
+                                       activebackground=self.colors['text_user_cmd'], activeforeground=self.colors['background'],
+                                       relief='flat')
+        self.kill_tree_btn.pack(side=tk.LEFT, padx=(10,0))
+
+        self.kill_match_btn = tk.Button(btn_frame, text="Kill Matching...", command=self.kill_matching,
+                                        bg=self.colors['background'], fg=self.colors['text_default'],
+                                        activebackground=self.colors['text_user_cmd'], activeforeground=self.colors['background'],
+                                        relief='flat')
+        self.kill_match_btn.pack(side=tk.LEFT, padx=(10,0))
+
         self.refresh_btn = tk.Button(btn_frame, text="Refresh List", command=self.refresh_processes,
                                      bg=self.colors['background'], fg=self.colors['text_default'],
                                      activebackground=self.colors['text_user_cmd'], activeforeground=self.colors['background'],
                                      relief='flat')
         self.refresh_btn.pack(side=tk.LEFT, padx=(10,0))
 
+        self.export_btn = tk.Button(btn_frame, text="Export History", command=self.export_history,
+                                    bg=self.colors['background'], fg=self.colors['text_default'],
+                                    activebackground=self.colors['text_user_cmd'], activeforeground=self.colors['background'],
+                                    relief='flat')
+        self.export_btn.pack(side=tk.LEFT, padx=(10,0))
+
+        # sample every N ms, 0 = only when "Refresh List" is clicked
+        self.interval = tk.IntVar(value=getattr(config, 'TASKMANAGER_REFRESH_MS', 1000))
+        self.interval_box = tk.Spinbox(btn_frame, from_=0, to=10000, increment=250, width=6,
+                                       textvariable=self.interval, font=self.colors['font'],
+                                       bg=self.colors['background'], fg=self.colors['text_default'],
+                                       buttonbackground=self.colors['background'], relief='flat')
+        self.interval_box.pack(side=tk.RIGHT)
+        tk.Label(btn_frame, text="Auto refresh (ms)", bg=self.colors['background'], fg=self.colors['text_info'],
+                 font=self.colors['font']).pack(side=tk.RIGHT, padx=(0,5))
+
         self.status_label = tk.Label(self, text="Select a process and click Kill",
                                      bg=self.colors['background'], fg=self.colors['text_info'],
                                      font=self.colors['font'])
         self.status_label.pack(side=tk.BOTTOM, fill=tk.X)
 
-        self.processes = []
+        self.snapshot = None
+        self._notice = None      # (text, until) shown next to the counters for a few seconds
+        self._killing = None     # thread running terminate()
+        self._kill_report = None
+        self.filter_text.trace_add("write", lambda *a: self.apply_filter())
+
+        # psutil runs on the sampler thread, this window only draws finished snapshots
+        self.sampler = ProcessSampler(self.interval_seconds()).start()
+        self._after_id = None
+        self._poll()
+
+    def interval_seconds(self):
+        try:
+            return max(self.interval.get(), 0) / 1000
+        except tk.TclError:
+            return self.sampler.interval  # half typed number in the spinbox
+
+    def _poll(self):
+        # cheap: just looks whether the sampler published something new
+        self.sampler.interval = self.interval_seconds()
+        snapshot = self.sampler.snapshot
+        if snapshot is not None and snapshot is not self.snapshot:
+            self.render(snapshot)
+        if self._kill_report is not None:
+            self.kill_finished(*self._kill_report)
+            self._kill_report = None
+        self._after_id = self.after(100, self._poll)
+
+    def destroy(self):
+        if self._after_id is not None:
+            self.after_cancel(self._after_id)
+            self._after_id = None
+        self.sampler.stop()
+        super().destroy()
+
+    def selected_pids(self):
+        procs = self.snapshot.procs if self.snapshot else {}
+        return [pid for pid in self.table.selected if pid in procs]
+
+    def notify(self, text, seconds=5.0):
+        self._notice = (text, time.monotonic() + seconds)
+        self.show_rows()
 
     def refresh_processes(self):
-        self.proc_listbox.delete(0, tk.END)
-        self.processes = []
+        self.sampler.wake()
 
-        psutil.cpu_percent(interval=None)  # update CPU usage cache once
+    def sort_by(self, key):
+        self.view.set_sort(key)
+        self.table.set_headers(self.view.sort_key, self.view.descending)
+        self.show_rows()
 
-        for proc in psutil.process_iter(['pid', 'name', 'memory_info']):
-            try:
-                pid = proc.info['pid']
-                name = proc.info['name']
-                cpu = proc.cpu_percent(interval=None)
-                mem = proc.info['memory_info'].rss / (1024*1024)
-                line = f"PID: {pid:<6} CPU: {cpu:5.1f}% MEM: {mem:7.1f} MB Name: {name}"
-                self.proc_listbox.insert(tk.END, line)
-                self.processes.append(proc)
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
-        self.status_label.config(text=f"Loaded {len(self.processes)} processes")
+    def toggle_tree(self):
+        self.view.set_tree(self.tree_mode.get())
+        self.show_rows()
+
+    def toggle_row(self, pid):
+        if self.view.tree_mode:
+            self.view.toggle(pid)
+            self.show_rows()
+
+    def cells(self, pid):
+        p = self.snapshot.procs.get(pid)
+        if p is None:
+            return None
+        # only ever called for the rows on screen, so the sparklines are cheap
+        spark = self.sampler.history.sparkline(pid)
+        if not self.view.tree_mode:
+            return _cells(p, spark)
+        node = self.view.tree.nodes.get(pid)
+        if node is None:
+            return _cells(p, spark)
+        marker = ("+" if pid in self.view.collapsed else "-") if node.children else " "
+        name = "  " * self.view.depth.get(pid, 0) + marker + " " + p.name
+        return _cells(p, spark, cpu=max(node.agg_cpu, 0.0), rss=max(node.agg_rss, 0), name=name)
+
+    def toggle_top(self):
+        self.view.set_top(TOP_N if self.top_only.get() else None)
+        self.show_rows()
+
+    def apply_filter(self):
+        try:
+            self.view.set_filter(self.filter_text.get())
+        except re.error as e:
+            self.status_label.config(text=f"Bad regex: {e}", fg=self.colors.get('text_error', 'red'))
+            return
+        self.show_rows()
+
+    def render(self, snapshot):
+        self.snapshot = snapshot
+        self.view.update(snapshot)
+        self.show_rows()
+
+    def show_rows(self):
+        snapshot = self.snapshot
+        if snapshot is None:
+            return
+        # forget selected processes that are gone
+        self.table.selected.intersection_update(snapshot.procs.keys())
+        self.table.show(self.view.rows, self.cells)
+        text = (f"{len(self.view.rows)} of {self.view.total()} processes  "
+                f"CPU {snapshot.cpu_total:.0f}%  RAM {snapshot.mem_percent:.0f}%  "
+                f"(sampled in {snapshot.cost * 1000:.0f} ms)")
+        if self._notice and time.monotonic() < self._notice[1]:
+            text = f"{self._notice[0]}  |  {text}"
+        if len(self.table.selected) > 1:
+            text = f"{len(self.table.selected)} selected  |  {text}"
+        self.status_label.config(text=text, fg=self.colors['text_info'])
 
     def kill_selected(self):
-        sel = self.proc_listbox.curselection()
-        if not sel:
+        pids = self.selected_pids()
+        if not pids:
             messagebox.showwarning("No selection", "Please select a process to kill.")
             return
-        index = sel[0]
-        proc = self.processes[index]
+        if len(pids) > 1 and not messagebox.askyesno("Kill", f"Kill {len(pids)} selected processes?"):
+            return
+        self.kill(pids)
+
+    def kill_matching(self):
+        if self.snapshot is None:
+            return
+        pattern = simpledialog.askstring("Kill matching",
+                                         "Process name, re:<regex> on the name, or user:<name>", parent=self)
+        if not pattern or not pattern.strip():
+            return
         try:
-            proc.kill()
-            self.status_label.config(text=f"Killed PID {proc.pid} ({proc.name()})")
-            self.refresh_processes()
-        except (psutil.NoSuchProcess, psutil.AccessDenied) as e:
-            messagebox.showerror("Error", f"Failed to kill process: {e}")
+            pids = match_processes(self.snapshot, pattern)
+        except re.error as e:
+            messagebox.showerror("Error", f"Bad regex: {e}")
+            return
+        if not pids:
+            messagebox.showinfo("Kill matching", f"Nothing matches '{pattern}'.")
+            return
+        procs = self.snapshot.procs
+        names = sorted({procs[pid].name for pid in pids})
+        preview = ", ".join(names[:5]) + (", ..." if len(names) > 5 else "")
+        if messagebox.askyesno("Kill matching", f"Kill {len(pids)} processes ({preview})?"):
+            self.kill(pids)
+
+    def kill(self, pids):
+        # terminate, wait once for the whole set, kill the stubborn ones - on a thread, _poll picks up the result
+        if self._killing is not None and self._killing.is_alive():
+            self.notify("Still killing the previous batch...")
+            return
+        self.notify(f"Stopping {len(pids)} processes...", seconds=KILL_TIMEOUT + 2)
+
+        def work():
+            report = terminate(pids, timeout=KILL_TIMEOUT)
+            self._kill_report = (len(pids), report)
+
+        self._killing = threading.Thread(target=work, name="taskmanager-kill", daemon=True)
+        self._killing.start()
+
+    def kill_finished(self, asked, report):
+        parts = [f"{len(report.terminated)} terminated"]
+        if report.killed:
+            parts.append(f"{len(report.killed)} force killed")
+        if report.gone:
+            parts.append(f"{len(report.gone)} already gone")
+        if report.denied:
+            parts.append(f"{len(report.denied)} denied")
+        if report.survivors:
+            parts.append(f"{len(report.survivors)} still alive")
+        self.table.selected.clear()
+        # one refresh for the whole batch
+        self.refresh_processes()
+        self.notify(f"Kill {asked}: " + ", ".join(parts), seconds=10)
+
+    def export_history(self):
+        path = filedialog.asksaveasfilename(parent=self, title="Export history", defaultextension=".csv",
+                                            filetypes=[("CSV", "*.csv"), ("NumPy archive", "*.npz")])
+        if not path:
+            return
+        try:
+            count = self.sampler.history.export(path)
+        except OSError as e:
+            messagebox.showerror("Error", f"Export failed: {e}")
+            return
+        self.status_label.config(text=f"Exported history of {count} processes to {path}")
+
+    def kill_tree(self):
+        # the selected processes and everything they started (ffmpeg workers and friends)
+        pids = self.selected_pids()
+        if not pids:
+            messagebox.showwarning("No selection", "Please select a process to kill.")
+            return
+        order = []
+        for pid in pids:
+            # children first, so nothing gets respawned by a parent that is still alive
+            subtree = self.view.tree.subtree(pid) or [pid]
+            # the sampler's tree can be a tick old, ask psutil for children that showed up since
+            try:
+                known = set(subtree)
+                subtree = [child.pid for child in psutil.Process(pid).children(recursive=True)
+                           if child.pid not in known] + subtree
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+            order.extend(subtree)
+        order = list(dict.fromkeys(order))
+        if not messagebox.askyesno("Kill tree", f"Kill {len(pids)} processes and {len(order) - len(pids)} children?"):
+            return
+        self.kill(order)
 
 # --- Example launcher code with a preset ---
 
@@ -105,4 +512,3 @@ class Launcher(tk.Tk):
 def run():
     launcher = Launcher()
     launcher.mainloop()
-
@@ -1,28 +1,5 @@
-import subprocess, os, shutil, pygame, threading
-
-pygame.mixer.init()
-
-def ding():
-    def _play():
-        try:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            sounds_dir = os.path.join(script_dir, 'sounds/ding.mp3')
-            pygame.mixer.music.load(sounds_dir)
-            pygame.mixer.music.play()
-        except Exception as e:
-            print(f"Error playing sound: {e}")
-    threading.Thread(target=_play).start()
-
-def nuh_uh():
-    def _play():
-        try:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            sounds_dir = os.path.join(script_dir, 'sounds/nuh_uh.mp3')
-            pygame.mixer.music.load(sounds_dir)
-            pygame.mixer.music.play()
-        except Exception as e:
-            print(f"Error playing sound: {e}")
-    threading.Thread(target=_play).start()
+import subprocess, os, shutil
+from _sound import ding, nuh_uh
 
 def runarg(app, args):
     if not args or len(args) < 1:
@@ -45,8 +22,22 @@ def runarg(app, args):
         video_path
     ]
 
+    cancelled = getattr(app, 'cancelled', lambda: False)
+
     try:
-        subprocess.run(command, check=True)
+        # Popen + poll instead of subprocess.run so /kill can close ffplay
+        proc = subprocess.Popen(command)
+        while True:
+            try:
+                returncode = proc.wait(timeout=0.25)
+                break
+            except subprocess.TimeoutExpired:
+                if cancelled():
+                    proc.terminate()
+                    proc.wait()
+                    return
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, command)
         ding()
     except subprocess.CalledProcessError as e:
         app.print_text("Error running ffplay.exe: {e}\n", 'error')
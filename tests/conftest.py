@@ -0,0 +1,5 @@
+# the launcher's modules live flat in os/ and import each other by plain name
+import os, sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "os"))
+os.environ.setdefault("BABABOI_NO_SOUND", "1")
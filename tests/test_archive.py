@@ -0,0 +1,46 @@
+import io, os, tarfile
+import zstandard as zstd
+import compress, _archive
+from _seekable import SeekTable
+
+def _tree(root):
+    (root / "sub").mkdir(parents=True)
+    (root / "small.txt").write_bytes(b"small file\n" * 10)
+    (root / "sub" / "big.bin").write_bytes(os.urandom(_archive.SMALL_FILE + 12345))
+    (root / "sub" / "empty").write_bytes(b"")
+
+def _archive_bytes(root, frame_size):
+    fout = io.BytesIO()
+    table, count, size = compress.compress_folder(str(root), fout, 3, frame_size, None, lambda: False)
+    assert count == 5 and size == 110 + _archive.SMALL_FILE + 12345
+    return fout.getvalue(), table
+
+def _check(data, root):
+    f = io.BytesIO(data)
+    index = _archive.read_index(f)
+    assert [entry[0] for entry in index] == ["tree", "tree/small.txt", "tree/sub", "tree/sub/big.bin", "tree/sub/empty"]
+    # offsets point at each member's data in the tar stream, same as walking the tar finds
+    assert index == _archive.scan_archive(f)
+    tar = zstd.ZstdDecompressor().stream_reader(io.BytesIO(data), read_across_frames=True).read()
+    for name, size, mtime, kind, offset in index:
+        if kind == tarfile.REGTYPE.decode():
+            assert tar[offset:offset + size] == (root.parent / name).read_bytes()
+    return f
+
+def test_index_round_trip(tmp_path):
+    root = tmp_path / "tree"
+    _tree(root)
+    data, table = _archive_bytes(root, None)
+    assert table is None
+    f = _check(data, root)
+    start, packed_size, raw_size = _archive.index_frame(f)
+    assert start + 8 + packed_size + _archive.INDEX_FOOTER_SIZE == len(data)
+    assert _archive.index_frame(io.BytesIO(data[:-1])) is None
+
+def test_seekable_archive_keeps_the_seek_table_readable(tmp_path):
+    root = tmp_path / "tree"
+    _tree(root)
+    data, table = _archive_bytes(root, 64 << 10)
+    f = _check(data, root)
+    start = _archive.index_frame(f)[0]
+    assert SeekTable.read(f, end=start).frames == table.frames
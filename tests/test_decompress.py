@@ -0,0 +1,80 @@
+import io, os
+import zstandard as zstd
+import compress, decompress, _fastio
+from _seekable import scan_frames
+
+class App:
+    def __init__(self):
+        self.errors = []
+
+    def print_text(self, text, tag=None):
+        if tag == 'error':
+            self.errors.append(text)
+
+def _spy(monkeypatch):
+    calls = []
+    real = decompress.decompress_frames
+
+    def spy(*args, **kwargs):
+        calls.append(args[2])
+        return real(*args, **kwargs)
+    monkeypatch.setattr(decompress, "decompress_frames", spy)
+    return calls
+
+def test_multi_frame_compress_output_decodes_in_parallel(tmp_path, monkeypatch):
+    data = os.urandom(50_000) * 40
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+    app = App()
+    compress.runarg(app, [str(path), "3", "--seekable=64K"])
+    assert not app.errors
+    calls = _spy(monkeypatch)
+    out = tmp_path / "out.bin"
+    assert decompress.decompress_file(str(path) + ".zst", str(out), _fastio.defaults(), workers=4) == len(data)
+    assert len(calls) == 1 and len(calls[0]) > 1
+    assert out.read_bytes() == data
+
+def test_frames_without_sizes_decode_in_parallel_in_order(tmp_path, monkeypatch):
+    # streamed frames (zstd reading a pipe, concatenated .zst files) carry no content size
+    parts = [os.urandom(1000) * (i + 1) for i in range(6)]
+    packed = io.BytesIO()
+    for part in parts:
+        writer = zstd.ZstdCompressor(write_checksum=True).stream_writer(packed, closefd=False)
+        writer.write(part)
+        writer.flush(zstd.FLUSH_FRAME)
+    path = tmp_path / "joined.zst"
+    path.write_bytes(packed.getvalue())
+    frames = decompress.check_input(str(path))
+    assert len(frames) == len(parts) and decompress.content_size(frames) is None
+    calls = _spy(monkeypatch)
+    out = tmp_path / "joined"
+    written = decompress.decompress_file(str(path), str(out), _fastio.defaults(), workers=3)
+    assert calls and written == sum(map(len, parts))
+    assert out.read_bytes() == b"".join(parts)
+
+def test_cut_off_input_is_caught(tmp_path):
+    data = os.urandom(40_000) * 10
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+    compress.runarg(App(), [str(path), "3", "--seekable=64K"])
+    packed = (tmp_path / "data.bin.zst").read_bytes()
+    with open(tmp_path / "data.bin.zst", 'rb') as f:
+        frames = scan_frames(f)
+    assert decompress.content_size(frames) == len(data)
+    # anywhere inside a frame, a block header or the seek table
+    for cut in (5, 20, len(packed) // 2, frames[-1][0] + frames[-1][1] + 3, len(packed) - 1):
+        assert scan_frames(io.BytesIO(packed[:cut])) is None, cut
+    assert scan_frames(io.BytesIO(b"not zstd at all")) is None
+
+def test_cut_off_input_keeps_the_source(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(os.urandom(200_000))
+    compress.runarg(App(), [str(path), "3"])
+    os.remove(path)
+    packed = tmp_path / "data.bin.zst"
+    cut = packed.read_bytes()[:-1000]
+    packed.write_bytes(cut)
+    app = App()
+    decompress.runarg(app, [str(packed)])
+    assert app.errors and "cut off" in app.errors[0]
+    assert packed.read_bytes() == cut and not path.exists()
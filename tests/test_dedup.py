@@ -0,0 +1,42 @@
+import io, os, random
+import _dedup
+
+def _data(size, seed):
+    return random.Random(seed).randbytes(size)
+
+def _chunks(data):
+    return list(_dedup.chunks(io.BytesIO(data)))
+
+def test_cut_points_survive_an_insertion():
+    data = _data(4 << 20, 21)
+    edited = data[:1 << 20] + b"inserted bytes" + data[1 << 20:]
+    before, after = _chunks(data), _chunks(edited)
+    assert b"".join(before) == data and b"".join(after) == edited
+    assert all(_dedup.MIN_CHUNK <= len(c) <= _dedup.MAX_CHUNK for c in before[:-1])
+    # only the chunk holding the edit changes (plus maybe the next, if the edit ate a cut)
+    changed = set(after) - set(before)
+    assert 1 <= len(changed) <= 2
+    assert len(set(before) - set(after)) <= 2
+
+def test_chunks_do_not_depend_on_read_size(monkeypatch):
+    data = _data(3 << 20, 22)
+    whole = _dedup.cut_points(data, final=True)
+    monkeypatch.setattr(_dedup, "READ_SIZE", 300_000)
+    ends = []
+    for chunk in _chunks(data):
+        ends.append((ends[-1] if ends else 0) + len(chunk))
+    assert ends == whole
+
+def test_store_and_manifest_round_trip(tmp_path):
+    store = _dedup.ChunkStore(str(tmp_path / "store"))
+    data = _data(1 << 20, 23)
+    with _dedup.thread_pool() as pool:
+        refs, added = _dedup.store_file(store, io.BytesIO(data), pool, lambda: False)
+        again, added_again = _dedup.store_file(store, io.BytesIO(data), pool, lambda: False)
+    assert refs == again and added > 0 and added_again == 0
+    manifest = str(tmp_path / "out" / "data.zdd")
+    os.makedirs(os.path.dirname(manifest))
+    _dedup.write_manifest(manifest, store.path, [{"name": "data.bin", "size": len(data), "chunks": refs}])
+    loaded, files = _dedup.read_manifest(manifest)
+    assert os.path.samefile(loaded.path, store.path)
+    assert b"".join(loaded.get(key, size) for key, size in files[0]["chunks"]) == data
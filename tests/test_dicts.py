@@ -0,0 +1,32 @@
+import io, random
+import pytest
+import _dicts
+
+@pytest.fixture
+def dict_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(_dicts, "DICT_DIR", str(tmp_path / "dicts"))
+    monkeypatch.setattr(_dicts, "_prepared", {})
+    return tmp_path / "dicts"
+
+def _samples():
+    rng = random.Random(19)
+    words = ["frame", "width", "height", "palette", "charset", "brightness", "contrast", "dither"]
+    return [("{" + ",".join(f'"{rng.choice(words)}_{i}": {rng.randint(0, 999)}' for i in range(rng.randint(5, 30)))
+             + "}\n").encode() for _ in range(2000)]
+
+def test_dictionary_round_trip(dict_dir):
+    samples = _samples()
+    dict_id = _dicts.train(samples, size=8 << 10)
+    assert _dicts.cached() == [(dict_id, (dict_dir / f"{dict_id}.dict").stat().st_size)]
+    data = samples[7]
+    frame = _dicts.compressor(dict_id, 3, write_checksum=True).compress(data)
+    f = io.BufferedReader(io.BytesIO(frame))
+    assert _dicts.frame_dict_id(f) == dict_id and f.tell() == 0
+    assert _dicts.decompressor_for(f).decompress(f.read()) == data
+    # digested once per level and reused
+    assert _dicts.prepared(dict_id, 3) is _dicts.prepared(dict_id, 3)
+
+def test_missing_dictionary(dict_dir):
+    assert _dicts.cached() == []
+    with pytest.raises(LookupError):
+        _dicts.decompressor(12345)
@@ -0,0 +1,49 @@
+import os
+import pytest
+import _fastio, compress
+
+class App:
+    def __init__(self):
+        self.errors = []
+
+    def print_text(self, text, tag=None):
+        if tag == 'error':
+            self.errors.append(text)
+
+def _chunks(path, backend, size, reuse):
+    with _fastio.input_chunks(str(path), backend, size, reuse) as chunks:
+        return [bytes(chunk) for chunk in chunks]
+
+def test_backends_give_the_same_chunks(tmp_path):
+    path = tmp_path / "data.bin"
+    data = os.urandom(1_000_003)
+    path.write_bytes(data)
+    expected = [data[i:i + 65536] for i in range(0, len(data), 65536)]
+    for backend in ("mmap", "read"):
+        for reuse in (True, False):
+            assert _chunks(path, backend, 65536, reuse) == expected
+    # nothing to map in an empty file, mmap falls back to reading
+    empty = tmp_path / "empty.bin"
+    empty.write_bytes(b"")
+    assert _chunks(empty, "mmap", 65536, True) == []
+
+def test_backends_compress_the_same(tmp_path):
+    data = os.urandom(50_000) * 20
+    outputs = []
+    for backend in ("mmap", "read"):
+        path = tmp_path / backend
+        path.write_bytes(data)
+        app = App()
+        compress.runarg(app, [str(path), "3", f"--io={backend}", "--buffer=64K"])
+        assert not app.errors
+        outputs.append((tmp_path / f"{backend}.zst").read_bytes())
+    assert outputs[0] == outputs[1]
+
+def test_options():
+    settings = _fastio.defaults()
+    assert _fastio.parse_option("--io", "mmap", settings) and settings["io"] == "mmap"
+    assert _fastio.parse_option("--buffer", "256K", settings) and settings["buffer"] == 256 << 10
+    assert not _fastio.parse_option("--seekable", "4M", settings)
+    for name, value in (("--io", "fast"), ("--buffer", "1"), ("--buffer", "lots")):
+        with pytest.raises(ValueError):
+            _fastio.parse_option(name, value, settings)
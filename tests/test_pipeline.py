@@ -0,0 +1,9 @@
+from _pipeline import is_pipeline, split_stages
+
+def test_quoted_bar_is_not_a_pipeline():
+    assert not is_pipeline('/echo "a|b"')
+    assert not is_pipeline("/grep 'x|y' notes.txt")
+
+def test_unquoted_bar_splits_stages():
+    assert is_pipeline("/echo don't | /open")
+    assert split_stages('/echo "a|b" | /open -', "/") == [("echo", ['"a|b"']), ("open", ["-"])]
@@ -0,0 +1,46 @@
+import math, time
+from _procmon import History, ProcessSampler, ProcInfo, Snapshot
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+def test_turning_auto_refresh_back_on_wakes_the_sampler():
+    sampler = ProcessSampler(0).start()
+    try:
+        assert _wait_for(lambda: sampler.snapshot is not None)
+        first = sampler.snapshot
+        time.sleep(0.3)
+        assert sampler.snapshot is first  # refresh is off, nothing new without wake()
+
+        sampler.interval = 0.1
+        assert _wait_for(lambda: sampler.snapshot is not first, timeout=2.0)
+    finally:
+        sampler.stop()
+
+def _snapshot(tick, pids):
+    procs = {pid: ProcInfo(pid, 1, f"proc{pid}", "me", "running", float(tick), 1000 * pid, 1,
+                           0, 0, None, None, 0.0) for pid in pids}
+    return Snapshot(tick, float(tick), procs, 10.0, 50.0, 0.0)
+
+def test_history_grows_with_the_process_list():
+    history = History(length=4, capacity=16, first=2)
+    assert len(history.data) == 2
+    history.record(_snapshot(0, range(1, 4)))
+    assert len(history.data) == 4
+    history.record(_snapshot(1, range(1, 30)))
+    assert len(history.data) == 16 and len(history.slots) == 16  # capped, the rest go without
+    assert list(history.series(1, "cpu")) == [0.0, 1.0]
+    assert list(history.series(3, "rss")) == [3000.0, 3000.0]
+    assert [math.isnan(v) for v in history.series(10, "cpu")] == [True, False]  # new slot, no stale values
+    # dead ones free their slot once their last sample scrolled out, and a new pid reuses it
+    for tick in range(2, 7):
+        history.record(_snapshot(tick, [1]))
+    assert sorted(history.slots) == [1]
+    history.record(_snapshot(7, [1, 500]))
+    assert len(history.data) == 16 and list(history.series(500, "cpu")[-1:]) == [7.0]
+    assert math.isnan(history.series(500, "cpu")[0])
@@ -0,0 +1,33 @@
+import importlib, importlib.abc, importlib.util, sys, time
+import _profile
+
+class SlowLoader(importlib.abc.Loader):
+    # stands in for an extension module, where create_module is the dlopen
+    def create_module(self, spec):
+        time.sleep(0.05)
+        return None
+
+    def exec_module(self, module):
+        time.sleep(0.02)
+
+class SlowFinder(importlib.abc.MetaPathFinder):
+    def find_spec(self, fullname, path=None, target=None):
+        if fullname == "slow_test_module":
+            return importlib.util.spec_from_loader(fullname, SlowLoader())
+        return None
+
+def test_import_span_covers_create_and_exec_module():
+    profiler = _profile.StartupProfiler()
+    finder = SlowFinder()
+    sys.meta_path.append(finder)
+    profiler.install()
+    try:
+        importlib.import_module("slow_test_module")
+    finally:
+        profiler.uninstall()
+        sys.meta_path.remove(finder)
+        sys.modules.pop("slow_test_module", None)
+    spans = [span for span in profiler.spans if span.name == "slow_test_module"]
+    assert len(spans) == 1 and spans[0].category == "import"
+    assert spans[0].duration >= 0.07
+    assert not profiler._stack()
@@ -0,0 +1,27 @@
+import importlib, os, sys
+from _reload import ModuleCache
+
+def _write(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    # a stamp is (mtime_ns, size), make sure the rewrite can't look unchanged
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+def test_config_change_reaches_from_import_dependents(tmp_path, monkeypatch):
+    _write(tmp_path / "config.py", "X = 1\n")
+    _write(tmp_path / "dep.py", "from config import X\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    for name in ("config", "dep"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    importlib.invalidate_caches()
+
+    cache = ModuleCache(str(tmp_path))
+    dep = cache.load("dep")
+    assert dep.X == 1
+
+    _write(tmp_path / "config.py", "X = 22\n")
+    # what the shell does before every dispatch: config alone, then the command itself
+    assert cache.reload_changed(["config"]) == ["config", "dep"]
+    assert cache.load("dep").X == 22
+    assert cache.reload_changed() == []
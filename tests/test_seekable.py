@@ -0,0 +1,69 @@
+import io, os
+import zstandard as zstd
+import compress, decompress
+from _seekable import SeekTable, read_range
+
+class App:
+    def __init__(self):
+        self.errors = []
+
+    def print_text(self, text, tag=None):
+        if tag == 'error':
+            self.errors.append(text)
+
+def _round_trip(path, *options):
+    app = App()
+    compress.runarg(app, [str(path), "3", *options])
+    assert not app.errors
+    os.remove(path)
+    decompress.runarg(app, [str(path) + ".zst"])
+    assert not app.errors
+    assert not os.path.exists(str(path) + ".zst")
+    with open(path, 'rb') as f:
+        return f.read()
+
+def test_empty_file_seekable_round_trip(tmp_path):
+    # nothing but a seek table, which starts with a skippable frame
+    path = tmp_path / "empty.bin"
+    path.write_bytes(b"")
+    assert _round_trip(path, "--seekable") == b""
+
+def test_seekable_round_trip(tmp_path):
+    data = os.urandom(100_000) * 5
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+    assert _round_trip(path, "--seekable=64K") == data
+
+def test_seek_table_bytes_round_trip():
+    for checksums in (True, False):
+        table = SeekTable(checksums)
+        table.add(100, 4096, 0xDEADBEEF if checksums else None)
+        table.add(7, 1, 0x12345678 if checksums else None)
+        f = io.BytesIO(b"\0" * table.compressed_size + table.to_bytes())
+        read = SeekTable.read(f)
+        assert read.frames == table.frames
+        assert read.d_offsets == [0, 4096, 4097]
+        assert read.frame_for(4095) == 0 and read.frame_for(4096) == 1
+        # a table has to account for every byte in front of it
+        assert SeekTable.read(io.BytesIO(b"\0" + f.getvalue())) is None
+
+def test_read_range_touches_only_the_range(tmp_path):
+    data = os.urandom(300_000)
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+    app = App()
+    compress.runarg(app, [str(path), "3", "--seekable=64K"])
+    assert not app.errors
+    with open(str(path) + ".zst", 'rb') as f:
+        table = SeekTable.read(f)
+        assert len(table) == 5 and table.decompressed_size == len(data)
+        dctx = zstd.ZstdDecompressor()
+        for start, end in ((0, 10), (65530, 65540), (100_000, 300_000), (299_999, 400_000), (5, 5)):
+            assert b"".join(read_range(f, table, dctx, start, end)) == data[start:end]
+
+def test_plain_zst_has_no_seek_table(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"hello" * 1000)
+    compress.runarg(App(), [str(path), "3"])
+    with open(str(path) + ".zst", 'rb') as f:
+        assert SeekTable.read(f) is None
@@ -0,0 +1,34 @@
+import random
+from _stats import Histogram, StatsRecorder
+
+def test_percentiles_within_bucket_accuracy():
+    h = Histogram(0.001, 100.0)
+    values = [random.Random(6).uniform(0.01, 10.0) for _ in range(5000)]
+    for value in values:
+        h.add(value)
+    ordered = sorted(values)
+    for p in (50, 90, 99):
+        exact = ordered[int(len(ordered) * p / 100) - 1]
+        assert abs(h.percentile(p) - exact) / exact < 0.1  # buckets grow by 10%
+    assert h.count == len(values)
+    assert h.min == min(values) and h.max == max(values)
+
+def test_percentiles_clamped_to_seen_values():
+    h = Histogram(0.001, 100.0)
+    assert h.percentile(50) is None and h.mean() is None
+    h.add(0.0001)   # below low
+    h.add(1000.0)   # above high
+    assert h.percentile(1) == 0.0001
+    assert h.percentile(100) == 1000.0
+
+def test_process_wide_rss_is_marked():
+    recorder = StatsRecorder()
+    recorder.record("/worker", 0.1, 0.1, 4096, True)
+    recorder.record("/inproc", 0.1, 0.1, 4096, True, shared_rss=True)
+    rows = {row["command"]: row for row in recorder.rows()}
+    assert rows["/worker"]["rss_process_wide"] == 0
+    assert rows["/inproc"]["rss_process_wide"] == 1
+    table = recorder.format_table().splitlines()
+    assert table[-1].startswith("peak+ =")
+    assert next(line for line in table if line.startswith("/inproc")).endswith("*")
+    assert not next(line for line in table if line.startswith("/worker")).endswith("*")
@@ -0,0 +1,39 @@
+import json, time
+import pytest
+import _tuning
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    path = tmp_path / "tuning.json"
+    monkeypatch.setattr(_tuning, "CACHE_PATH", str(path))
+    monkeypatch.setattr(_tuning, "LEVELS", (1, 3))
+    return path
+
+def _file(tmp_path):
+    path = tmp_path / "data.txt"
+    path.write_bytes(b"".join(b"line %d of some fairly repetitive text\n" % i for i in range(50_000)))
+    return [(str(path), path.stat().st_size)]
+
+def test_choice_is_cached_per_kind(cache, tmp_path):
+    files = _file(tmp_path)
+    level, long, ratio, mbps, cached = _tuning.tune(files, ".txt", 0.001)
+    assert level in (1, 3) and not long and 0 < ratio < 1 and not cached
+    assert _tuning.tune(files, ".txt", 0.001) == (level, long, ratio, mbps, True)
+    assert not _tuning.tune(files, ".txt", 0.001, retune=True)[4]
+    assert not _tuning.tune(files, ".log", 0.001)[4]
+    assert sorted(json.loads(cache.read_text())) == [".log|1|short", ".txt|1|short"]
+
+def test_stale_or_broken_cache_probes_again(cache, tmp_path):
+    files = _file(tmp_path)
+    cache.write_text("{not json")
+    assert not _tuning.tune(files, ".txt", 0.001)[4]
+    entries = json.loads(cache.read_text())
+    entries[".txt|1|short"]["time"] = time.time() - _tuning.CACHE_TTL - 1
+    cache.write_text(json.dumps(entries))
+    assert not _tuning.tune(files, ".txt", 0.001)[4]
+    assert _tuning.tune(files, ".txt", 0.001)[4]
+
+def test_nothing_to_sample(cache, tmp_path):
+    empty = tmp_path / "empty.txt"
+    empty.write_bytes(b"")
+    assert _tuning.tune([(str(empty), 0)], ".txt", 100) == (3, False, 1.0, 0.0, False)